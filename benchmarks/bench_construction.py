@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+'''
+Name: bench_construction.py
+Summary: Measure construction time and per-instance memory of VerifyTypes and Timer
+
+Description:
+
+   LegacyVerifyTypes below reproduces the per-instance initialization
+   VerifyTypes and Constants used to do (recompiling regexes, rebuilding
+   frozensets, ranges and lists on every instance) so the saving from
+   shared class-level state can be seen side by side.
+
+Synopsis:
+
+   cd general-python
+   PYTHONPATH=lib ./benchmarks/bench_construction.py [count]
+
+   count - number of objects to construct.  Default 100000
+'''
+import gc
+import logging
+import re
+import sys
+import time
+import tracemalloc
+from general_python.general.util import Timer
+from general_python.general.verify_types import VerifyTypes
+
+class LegacyVerifyTypes(object):
+    '''per-instance state, as previously built by Constants/VerifyTypes __init__()'''
+    def __init__(self, log):
+        self.lib_version = 102
+        self.lib_name = "Constants"
+        self.na_bool = False
+        self.na_str = 'na'
+        self.na_int = -1
+        self.DEFAULT_LOGLEVEL = "INFO"
+        self.VALID_LOGLEVELS = ["INFO", "WARNING", "DEBUG", "ERROR", "CRITICAL"]
+        self.HEX_DIGITS = frozenset('0123456789ABCDEFabcdef')
+        self.lib_version = 136
+        self.lib_name = "VerifyTypes"
+        self.log = log
+        self.DEFAULT_LOGLEVEL = 'INFO'
+        self.ipv4_mask_range = range(0, 33)
+        self.ipv6_mask_range = range(0, 129)
+        self.re_digits = re.compile(r'^(\d+)$')
+        self.re_mac_address = re.compile(r'([0-9A-F]{2}[:-]){5}([0-9A-F]{2}$)', re.I)
+
+def measure(label, factory, count):
+    gc.collect()
+    start = time.perf_counter()
+    objects = [factory() for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    del objects
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory() for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    print(f"{label:<20} {elapsed:8.3f}s  {elapsed / count * 1e6:8.2f}us/object  {current / count:8.0f} bytes/object")
+
+def main():
+    count = 100000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    log = logging.getLogger('bench_construction')
+    print(f"constructing {count} objects")
+    measure('LegacyVerifyTypes', lambda: LegacyVerifyTypes(log), count)
+    measure('VerifyTypes', lambda: VerifyTypes(log), count)
+    measure('Timer', lambda: Timer(log), count)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+'''
+Name: bench_log_aggregate.py
+Summary: Measure LogAggregator throughput with several worker processes logging to one logfile
+
+Description:
+
+   Starts a LogAggregator writing to a logfile in a temporary directory,
+   then workers processes, each of which logs count DEBUG records via
+   get_logger(..., _aggregate=aggregator).  The parent process, which
+   started the aggregator, then logs count // 10 + 1 records (not a
+   multiple of the 500 record batch) and stops the aggregator at once,
+   so its last partial batch is only written if stop() sends it.
+
+   Reports records/second from the first record sent until the last
+   record was written, checks that every record was written, and counts
+   adjacent lines out of timestamp order.  The writer orders records which reach it within its delay
+   (0.5s) of being logged, so a few inversions are possible when the
+   machine is overloaded e.g. more workers than CPUs.
+
+   Exits with status 1 if records were lost, or throughput is below
+   target records/second.
+
+Synopsis:
+
+   cd general-python
+   PYTHONPATH=lib ./benchmarks/bench_log_aggregate.py [workers] [count] [target]
+
+   workers - number of worker processes.  Default 4
+   count   - records per worker.  Default 25000
+   target  - minimum acceptable records/second.  Default 20000
+'''
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from general_python.general.log import LogAggregator, get_logger
+
+def worker(aggregator, index, count):
+    log = get_logger('bench_log_aggregate', 'CRITICAL', 'DEBUG', _aggregate=aggregator, _profile='fast')
+    debug = log.debug
+    for sequence in range(count):
+        debug('worker %d record %d', index, sequence)
+
+def main():
+    workers = 4
+    count = 25000
+    target = 20000
+    if len(sys.argv) > 1:
+        workers = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        count = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        target = int(sys.argv[3])
+    with tempfile.TemporaryDirectory() as directory:
+        logfile = os.path.join(directory, 'bench_log_aggregate.log')
+        aggregator = LogAggregator(logfile, profile='fast', rotation={'max_bytes': 0})
+        aggregator.start()
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=worker, args=(aggregator, index, count)) for index in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        parent = count // 10 + 1
+        worker(aggregator, workers, parent)
+        aggregator.stop()
+        elapsed = time.perf_counter() - start
+        total = workers * count + parent
+        with open(logfile) as fd:
+            lines = [line for line in fd if ' record ' in line]
+        stamps = [line[:23] for line in lines]
+        inversions = sum(1 for a, b in zip(stamps, stamps[1:]) if a > b)
+    rate = total / elapsed
+    print(f"{workers} workers x {count} + parent {parent} records: {len(lines)}/{total} written in {elapsed:.3f}s, {rate:.0f} records/s, out of timestamp order {inversions}")
+    if len(lines) != total:
+        print("FAIL: records lost")
+        sys.exit(1)
+    if rate < target:
+        print(f"FAIL: below target of {target} records/s")
+        sys.exit(1)
+    print(f"PASS: target {target} records/s")
+
+if __name__ == '__main__':
+    main()
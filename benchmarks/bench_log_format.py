@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+'''
+Name: bench_log_format.py
+Summary: Compare records/second of the 'default' and 'fast' log profiles
+
+Description:
+
+   Each profile logs count INFO records to its own logfile in a
+   temporary directory, with console output disabled (console level
+   CRITICAL), so the numbers include formatting and file I/O, as in a
+   script's hot loop.  Each profile is then timed again with the file
+   handler replaced by one which formats and discards each record, to
+   separate the cost of record creation and formatting from disk I/O.
+
+Synopsis:
+
+   cd general-python
+   PYTHONPATH=lib ./benchmarks/bench_log_format.py [count]
+
+   count - number of records per profile.  Default 200000
+'''
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+from general_python.general.log import Logger, remove_logger
+
+class DiscardHandler(logging.Handler):
+    '''formats each record, then discards it'''
+    def emit(self, record):
+        self.format(record)
+
+def best_of(repeat, function):
+    '''return the fastest time of repeat calls to function, with gc disabled'''
+    best = None
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        gc.enable()
+    return best
+
+def make_logger(directory, profile):
+    logger = Logger()
+    logger.logfile = os.path.join(directory, f"{profile}.log")
+    log = logger.new(f"bench_log_format_{profile}", _profile=profile)
+    logger.file_loglevel = 'INFO'
+    logger.console_loglevel = 'CRITICAL'
+    return logger, log
+
+def run(log, count):
+    info = log.info
+    for index in range(count):
+        info('iteration %d of %d', index, count)
+
+def main():
+    count = 200000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    with tempfile.TemporaryDirectory() as directory:
+        results = dict()
+        for profile in ('default', 'fast'):
+            logger, log = make_logger(directory, profile)
+            file_time = best_of(3, lambda: run(log, count))
+            discard = DiscardHandler()
+            discard.setFormatter(logger.formatter)
+            log.removeHandler(logger.fh)
+            log.addHandler(discard)
+            format_time = best_of(3, lambda: run(log, count))
+            log.removeHandler(discard)
+            log.addHandler(logger.fh)
+            remove_logger(log.name)
+            results[profile] = (file_time, format_time)
+    print(f"{count} records per profile")
+    print(f"{'profile':8} {'file records/s':>16} {'format-only records/s':>22}")
+    for profile, (file_time, format_time) in results.items():
+        print(f"{profile:8} {count / file_time:16.0f} {count / format_time:22.0f}")
+    default_file, default_format = results['default']
+    fast_file, fast_format = results['fast']
+    print(f"speedup  {default_file / fast_file:15.2f}x {default_format / fast_format:21.2f}x")
+
+if __name__ == '__main__':
+    main()
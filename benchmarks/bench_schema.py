@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+'''
+Name: bench_schema.py
+Summary: Compare a compiled Schema against equivalent hand-written VerifyTypes checks
+
+Synopsis:
+
+   cd general-python
+   PYTHONPATH=lib ./benchmarks/bench_schema.py [count]
+
+   count - number of result records to validate.  Default 100000
+'''
+import gc
+import logging
+import sys
+import time
+from general_python.general.schema import Schema, ListOf, Optional
+from general_python.general.verify_types import VerifyTypes
+
+def make_records(count):
+    records = list()
+    for index in range(count):
+        record = {
+            'run_id': index,
+            'build': 'iplus_dev_654',
+            'tg': f"10.1.{index % 256}.{index % 254 + 1}",
+            'meta': {
+                'underlay': 'ipv4',
+                'vpc': index % 2 == 0,
+                'nve_sids': [1, 2, 3, 4],
+                'duts': [
+                    {'ip': f"172.22.{index % 256}.1", 'mac': '00:11:22:33:44:55'},
+                    {'ip': f"172.22.{index % 256}.2", 'mac': '00:11:22:33:44:56'}
+                ]
+            }
+        }
+        if index % 100 == 0:
+            record['meta']['duts'][1]['ip'] = '172.22.1'
+        records.append(record)
+    return records
+
+def hand_written(verify, record):
+    errors = list()
+    if not verify.is_dict(record):
+        errors.append(('', 'is_dict'))
+        return errors
+    if 'run_id' not in record:
+        errors.append(('run_id', 'missing'))
+    elif not verify.is_int(record['run_id']):
+        errors.append(('run_id', 'is_int'))
+    if 'tg' not in record:
+        errors.append(('tg', 'missing'))
+    elif not verify.is_ipv4_unicast_address(record['tg']):
+        errors.append(('tg', 'is_ipv4_unicast_address'))
+    if 'meta' not in record:
+        errors.append(('meta', 'missing'))
+        return errors
+    meta = record['meta']
+    if not verify.is_dict(meta):
+        errors.append(('meta', 'is_dict'))
+        return errors
+    if 'underlay' not in meta:
+        errors.append(('meta.underlay', 'missing'))
+    elif meta['underlay'] not in ['ipv4', 'ipv6']:
+        errors.append(('meta.underlay', 'underlay'))
+    if 'vpc' not in meta:
+        errors.append(('meta.vpc', 'missing'))
+    elif not verify.is_boolean(meta['vpc']):
+        errors.append(('meta.vpc', 'is_boolean'))
+    if 'nve_sids' in meta:
+        if not verify.is_list(meta['nve_sids']):
+            errors.append(('meta.nve_sids', 'is_list'))
+        else:
+            for index, sid in enumerate(meta['nve_sids']):
+                if not verify.is_int(sid):
+                    errors.append((f"meta.nve_sids[{index}]", 'is_int'))
+    if 'duts' not in meta:
+        errors.append(('meta.duts', 'missing'))
+    elif not verify.is_list(meta['duts']):
+        errors.append(('meta.duts', 'is_list'))
+    else:
+        for index, dut in enumerate(meta['duts']):
+            if not verify.is_dict(dut):
+                errors.append((f"meta.duts[{index}]", 'is_dict'))
+                continue
+            if 'ip' not in dut:
+                errors.append((f"meta.duts[{index}].ip", 'missing'))
+            elif not verify.is_ipv4_address(dut['ip']):
+                errors.append((f"meta.duts[{index}].ip", 'is_ipv4_address'))
+            if 'mac' not in dut:
+                errors.append((f"meta.duts[{index}].mac", 'missing'))
+            elif not verify.is_mac_address(dut['mac']):
+                errors.append((f"meta.duts[{index}].mac", 'is_mac_address'))
+    return errors
+
+def best_of(repeat, function):
+    '''return (fastest time, result) of repeat calls to function, with gc disabled'''
+    best = None
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        gc.enable()
+    return best, result
+
+def underlay(x):
+    return x in ['ipv4', 'ipv6']
+
+def main():
+    count = 100000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    log = logging.getLogger('bench_schema')
+    log.setLevel(logging.INFO)
+    verify = VerifyTypes(log)
+    records = make_records(count)
+
+    start = time.perf_counter()
+    schema = Schema(log, {
+        'run_id': 'is_int',
+        'tg': 'is_ipv4_unicast_address',
+        'meta': {
+            'underlay': underlay,
+            'vpc': 'is_boolean',
+            'nve_sids': Optional(ListOf('is_int')),
+            'duts': ListOf({'ip': 'is_ipv4_address', 'mac': 'is_mac_address'})
+        }
+    }, verify=verify)
+    compile_time = time.perf_counter() - start
+
+    validate = schema.validate
+    hand_time, hand_errors = best_of(3, lambda: [hand_written(verify, record) for record in records])
+    schema_time, schema_errors = best_of(3, lambda: [validate(record) for record in records])
+
+    if hand_errors != schema_errors:
+        print("WARNING: hand-written and compiled results differ")
+    violations = sum(len(errors) for errors in schema_errors)
+    print(f"{count} records, {violations} violations, schema compiled in {compile_time * 1000:.2f}ms")
+    print(f"hand-written {hand_time:8.3f}s  {count / hand_time:12.0f} records/s")
+    print(f"compiled     {schema_time:8.3f}s  {count / schema_time:12.0f} records/s  speedup {hand_time / schema_time:.2f}x")
+
+if __name__ == '__main__':
+    main()
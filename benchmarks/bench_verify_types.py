@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+'''
+Name: bench_verify_types.py
+Summary: Compare VerifyTypes scalar methods against their *_many() batch counterparts
+
+Synopsis:
+
+   cd general-python
+   PYTHONPATH=lib ./benchmarks/bench_verify_types.py [count]
+
+   count - number of values per column.  Default 200000
+'''
+import logging
+import random
+import sys
+import time
+from general_python.general.verify_types import VerifyTypes
+
+def ipv4_column(count):
+    values = list()
+    for index in range(count):
+        if index % 10 == 0:
+            values.append(f"10.{index % 300}.1.{index % 256}")
+        elif index % 10 == 1:
+            values.append(f"224.0.{index % 256}.1")
+        else:
+            values.append(f"10.{index % 256}.{(index >> 8) % 256}.{index % 254 + 1}")
+    return values
+
+def mac_column(count):
+    values = list()
+    for index in range(count):
+        octets = [random.randint(0, 255) for _ in range(6)]
+        mac = ':'.join(f"{octet:02x}" for octet in octets)
+        if index % 10 == 0:
+            mac = mac.replace(':', '.', 1)
+        values.append(mac)
+    return values
+
+def timeit(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def compare(label, scalar, many, values):
+    scalar_time = timeit(lambda: [scalar(value) for value in values])
+    many_time = timeit(lambda: many(values))
+    print(f"{label:<28} scalar {scalar_time:8.3f}s  batch {many_time:8.3f}s  speedup {scalar_time / many_time:6.2f}x")
+
+def main():
+    count = 200000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    log = logging.getLogger('bench_verify_types')
+    log.setLevel(logging.INFO)
+    verify = VerifyTypes(log)
+    ipv4 = ipv4_column(count)
+    macs = mac_column(count)
+    print(f"{count} values per column")
+    compare('is_ipv4_address', verify.is_ipv4_address, verify.is_ipv4_address_many, ipv4)
+    compare('is_ipv4_unicast_address', verify.is_ipv4_unicast_address, verify.is_ipv4_unicast_address_many, ipv4)
+    compare('is_mac_address', verify.is_mac_address, verify.is_mac_address_many, macs)
+
+if __name__ == '__main__':
+    main()
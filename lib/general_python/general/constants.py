@@ -7,18 +7,25 @@ Description:
 
 Currently, these are used mostly by general_python.general.verify_types.py
 '''
-OUR_VERSION = 102
+OUR_VERSION = 103
 
 class Constants(object):
-    def __init__(self):
-        self.lib_version = OUR_VERSION
-        self.lib_name = "Constants"
+    '''
+    Constants are class attributes, shared by all instances, so
+    instances (and subclass instances e.g. VerifyTypes) cost nothing to
+    construct.  __dict__ is a slot, so it is only allocated if an
+    attribute is assigned on an instance.
+    '''
+    __slots__ = ('__dict__',)
 
-        self.na_bool = False
-        self.na_str  = 'na'
-        self.na_int  = -1
+    lib_version = OUR_VERSION
+    lib_name = "Constants"
 
-        self.DEFAULT_LOGLEVEL = "INFO"
-        self.VALID_LOGLEVELS = ["INFO","WARNING","DEBUG","ERROR","CRITICAL"]
-        self.HEX_DIGITS = frozenset('0123456789ABCDEFabcdef')
+    na_bool = False
+    na_str  = 'na'
+    na_int  = -1
+
+    DEFAULT_LOGLEVEL = "INFO"
+    VALID_LOGLEVELS = ("INFO","WARNING","DEBUG","ERROR","CRITICAL")
+    HEX_DIGITS = frozenset('0123456789ABCDEFabcdef')
 
@@ -0,0 +1,185 @@
+'''
+histogram.py
+Summary: Log-bucketed (HDR-style) histogram with O(1) record and fixed memory
+
+Description:
+
+   Histogram counts non-negative integer values (e.g. durations in
+   nanoseconds) in buckets whose width grows with the value, so that
+   every value is kept to within a fixed relative precision, whatever
+   its magnitude.
+
+   Values below 2**sub_bucket_bits are counted exactly.  Above that,
+   each power of two is divided into 2**(sub_bucket_bits - 1) equal
+   buckets.  With the default sub_bucket_bits of 7, a value is known to
+   within 1/64 (1.6%) of itself.  Values above max_value are counted in
+   the last bucket (and in self.overflow), whose percentiles are then
+   reported as max.
+
+   record() is a few integer operations.  Memory is one array of counts,
+   allocated on the first record(), whose size depends only on
+   sub_bucket_bits and max_value (about 20KB with the defaults).
+   count, total, min and max are exact.
+
+   Histograms with the same sub_bucket_bits and max_value can be merged,
+   e.g. to combine the timers of several workers.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.histogram import Histogram
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   h = Histogram(log)
+   for ns in durations:
+       h.record(ns)
+   print(h.percentile(50), h.percentile(99), h.mean)
+   h.merge(other_histogram)
+'''
+from array import array
+
+OUR_VERSION = 100
+
+# 2**43 ns is about 2.4 hours
+DEFAULT_MAX_VALUE = 2**43
+
+class Histogram(object):
+    '''
+    Log-bucketed histogram.  See module docstring.
+
+    log             - logging instance, mandatory
+    sub_bucket_bits - precision.  Values are kept to within 1/2**(sub_bucket_bits - 1)
+                      of themselves.  Default 7
+    max_value       - largest value counted in its own bucket.  Default 2**43
+    '''
+    __slots__ = ('log', 'sub_bucket_bits', 'max_value', 'count', 'total', 'min', 'max', 'overflow',
+                 '_sub_count', '_half', '_length', '_counts')
+
+    lib_name = "Histogram"
+    lib_version = OUR_VERSION
+
+    def __init__(self, log, sub_bucket_bits=7, max_value=DEFAULT_MAX_VALUE):
+        self.log = log
+        if sub_bucket_bits < 2 or max_value < 2**sub_bucket_bits:
+            self.log.error(f"Exiting. Expected sub_bucket_bits >= 2 and max_value >= 2**sub_bucket_bits. Got {sub_bucket_bits}, {max_value}")
+            exit(1)
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value = max_value
+        self._sub_count = 1 << sub_bucket_bits
+        self._half = self._sub_count >> 1
+        self._length = self._sub_count + (max_value.bit_length() - sub_bucket_bits) * self._half
+        self._counts = None
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.overflow = 0
+        self._counts = None
+
+    def _index(self, value):
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        index = self._sub_count + (shift - 1) * self._half + (value >> shift) - self._half
+        if index >= self._length:
+            self.overflow += 1
+            return self._length - 1
+        return index
+
+    def _bounds(self, index):
+        '''return the (lowest, highest) value counted in bucket index'''
+        if index < self._sub_count:
+            return index, index
+        offset = index - self._sub_count
+        shift = offset // self._half + 1
+        sub = offset % self._half + self._half
+        return sub << shift, ((sub + 1) << shift) - 1
+
+    def record(self, value, count=1):
+        '''count int value (>= 0) count times'''
+        if value < 0:
+            value = 0
+        counts = self._counts
+        if counts is None:
+            counts = self._counts = array('Q', bytes(8 * self._length))
+        counts[self._index(value)] += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        # last, so that a merge() from another thread which sees count
+        # also sees min and max
+        self.count += count
+
+    def merge(self, other):
+        '''add the counts of Histogram other to this histogram'''
+        if other.sub_bucket_bits != self.sub_bucket_bits or other.max_value != self.max_value:
+            self.log.error(f"Exiting. Cannot merge histograms with different sub_bucket_bits or max_value. "
+                           f"Got {self.sub_bucket_bits}, {self.max_value} and {other.sub_bucket_bits}, {other.max_value}")
+            exit(1)
+        if other.count == 0:
+            return
+        if self._counts is None:
+            self._counts = array('Q', other._counts)
+        else:
+            counts = self._counts
+            for index, count in enumerate(other._counts):
+                if count:
+                    counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.overflow += other.overflow
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+
+    @property
+    def mean(self):
+        '''exact mean of the recorded values, or None if empty'''
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    def percentile(self, p):
+        '''
+        return the value below which p percent (0 <= p <= 100) of the
+        recorded values fall, to within the histogram's precision, or
+        None if empty.  percentile(0) is min, and percentile(100) is max.
+        '''
+        if self.count == 0:
+            return None
+        if p <= 0:
+            return self.min
+        if p >= 100:
+            return self.max
+        target = -(-p * self.count // 100)
+        seen = 0
+        for index, count in enumerate(self._counts):
+            if count == 0:
+                continue
+            seen += count
+            if seen >= target:
+                if index == self._length - 1 and self.overflow:
+                    # the last bucket has no upper bound once values overflow into it
+                    return self.max
+                low, high = self._bounds(index)
+                return min(max((low + high) // 2, self.min), self.max)
+        return self.max
+
+    def percentiles(self, ps=(50, 90, 99)):
+        '''return a dict mapping each p in ps to percentile(p)'''
+        return {p: self.percentile(p) for p in ps}
+
+    def buckets(self):
+        '''generator yielding (lowest value, highest value, count) for each non-empty bucket'''
+        if self._counts is None:
+            return
+        for index, count in enumerate(self._counts):
+            if count:
+                low, high = self._bounds(index)
+                yield low, high, count
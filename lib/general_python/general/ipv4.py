@@ -0,0 +1,115 @@
+'''
+ipv4.py
+Summary: Fast ipv4 address parsing and classification using 32-bit integers
+
+Description:
+
+   Parses dotted-quad strings directly to 32-bit integers, without
+   constructing ipaddress.IPv4Address objects, and classifies the
+   result (unicast, multicast, loopback, etc) using a precomputed,
+   sorted, range table.
+
+   The parser accepts exactly what ipaddress.IPv4Address() accepts for
+   str input i.e. four dot-separated decimal octets in the range 0-255,
+   without leading zeros or whitespace.
+
+   Classification matches the ipaddress properties used by
+   VerifyTypes().is_ipv4_unicast_address() i.e. is_multicast,
+   is_loopback, is_reserved, is_unspecified, is_link_local
+
+Synopsis:
+
+   from general_python.general.ipv4 import to_int, classify, UNICAST
+
+   address = to_int('10.1.1.1')    # 167837953
+   to_int('10.1.1.256')            # None
+   classify(address) == UNICAST    # True
+   CLASS_NAMES[classify(to_int('224.0.0.5'))]    # 'is_multicast'
+'''
+from bisect import bisect_right
+
+OUR_VERSION = 101
+
+# classify() return values
+UNICAST = 0
+MULTICAST = 1
+LOOPBACK = 2
+RESERVED = 3
+UNSPECIFIED = 4
+LINK_LOCAL = 5
+
+CLASS_NAMES = {
+    UNICAST: 'is_unicast',
+    MULTICAST: 'is_multicast',
+    LOOPBACK: 'is_loopback',
+    RESERVED: 'is_reserved',
+    UNSPECIFIED: 'is_unspecified',
+    LINK_LOCAL: 'is_link_local'
+}
+
+# Every valid octet string mapped to its value.  A single dict lookup
+# verifies digits-only, range 0-255, and no leading zeros.
+_OCTETS = {str(octet): octet for octet in range(256)}
+
+# Non-unicast ranges as (first, last, class).  Must be sorted and must
+# not overlap, since classify() bisects on the first address.
+_RANGES = (
+    (0x00000000, 0x00000000, UNSPECIFIED),  # 0.0.0.0
+    (0x7F000000, 0x7FFFFFFF, LOOPBACK),     # 127.0.0.0/8
+    (0xA9FE0000, 0xA9FEFFFF, LINK_LOCAL),   # 169.254.0.0/16
+    (0xE0000000, 0xEFFFFFFF, MULTICAST),    # 224.0.0.0/4
+    (0xF0000000, 0xFFFFFFFF, RESERVED)      # 240.0.0.0/4
+)
+# Regex sources matching exactly what to_int() accepts, and the unicast
+# subset of it, for validating a whole column in one re pass (see
+# VerifyTypes().is_ipv4_address_many()).  UNICAST_PATTERN's exclusions
+# must follow _RANGES
+_OCTET_PATTERN = r'(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+ADDRESS_PATTERN = r'{0}\.{0}\.{0}\.{0}'.format(_OCTET_PATTERN)
+UNICAST_PATTERN = r'(?!0\.0\.0\.0$|127\.|169\.254\.|22[4-9]\.|2[3-5][0-9]\.)' + ADDRESS_PATTERN
+
+_RANGE_FIRST = [r[0] for r in _RANGES]
+_RANGE_LAST = [r[1] for r in _RANGES]
+_RANGE_CLASS = [r[2] for r in _RANGES]
+
+def to_int(x):
+    '''
+    return dotted-quad string x as a 32-bit integer
+    return None if x is not a valid ipv4 address
+    '''
+    parts = x.split('.')
+    if len(parts) != 4:
+        return None
+    try:
+        return (_OCTETS[parts[0]] << 24 | _OCTETS[parts[1]] << 16
+                | _OCTETS[parts[2]] << 8 | _OCTETS[parts[3]])
+    except KeyError:
+        return None
+
+def to_str(x):
+    '''return 32-bit integer x as a dotted-quad string'''
+    return f"{x >> 24}.{(x >> 16) & 0xFF}.{(x >> 8) & 0xFF}.{x & 0xFF}"
+
+def classify(x):
+    '''
+    return the class (UNICAST, MULTICAST, etc) of 32-bit integer x
+    '''
+    index = bisect_right(_RANGE_FIRST, x) - 1
+    if index >= 0 and x <= _RANGE_LAST[index]:
+        return _RANGE_CLASS[index]
+    return UNICAST
+
+def is_address(x):
+    '''return True if x is a dotted-quad ipv4 address string'''
+    if not isinstance(x, str):
+        return False
+    return to_int(x) is not None
+
+def is_unicast(x):
+    '''return True if x is a dotted-quad ipv4 unicast address string'''
+    if not isinstance(x, str):
+        return False
+    address = to_int(x)
+    if address is None:
+        return False
+    return classify(address) == UNICAST
@@ -12,6 +12,74 @@ Synopsis:
    # DEBUG messages to a rotating logfile /tmp/my_logger_name.log
    log = get_logger('my_logger_name', INFO', 'DEBUG')
 
+   # same, but records are handed to a background thread which does the
+   # file and console I/O (and log rotation), so the caller never blocks
+   # on I/O.  If more than 10000 records are waiting, new records are
+   # dropped (or, with _queue_full='block', the caller waits).
+   log = get_logger('my_logger_name', 'INFO', 'DEBUG', _async=True)
+   print(dropped_records(log))
+
+   # get_logger() is idempotent.  Calling it again with the same name
+   # returns the same logger, without adding handlers.  Loggers writing
+   # to the same file share one file handler.  To see which loggers
+   # write where:
+   import pprint
+   pprint.pprint(handler_graph())
+
+   # 'fast' profile.  Same timestamp and level layout as the default, but
+   # the logger name replaces module.funcName and lineno.  The caller's
+   # stack frame is not looked up, and the date/time is formatted once
+   # per second rather than once per record.
+   log = get_logger('my_logger_name', 'INFO', 'DEBUG', _profile='fast')
+
+   # 'json' profile.  The logfile is JSON lines, one object per record.
+   # The console output is unchanged.  Context fields are bound once, and
+   # added to every record logged through the returned adapter.
+   log = get_logger('my_logger_name', 'INFO', 'DEBUG', _profile='json')
+   log = bind(log, testbed='tb1', build='iplus_dev_654', run_id=1234)
+   dut_log = log.bind(dut='leaf1')
+   dut_log.info('bgp neighbors up')
+   # {"time":1533906855.123,"level":"INFO","logger":"my_logger_name","module":"my_script","func":"main","line":42,"msg":"bgp neighbors up","testbed":"tb1","build":"iplus_dev_654","run_id":1234,"dut":"leaf1"}
+
+   # Same, with context bound by get_logger()
+   log = get_logger('my_logger_name', 'INFO', 'DEBUG', _profile='json', _context={'testbed': 'tb1', 'run_id': 1234})
+
+   # Rate limiting.  Each message template (e.g. 'Not a valid ipv4
+   # address: %s') may log a burst of 10 records, then 1 record per
+   # second.  Suppressed records are counted, and reported on the next
+   # record that passes, and at exit, as e.g.
+   # 'last message repeated 5230 times: Not a valid ipv4 address: 1.2.3'
+   log = get_logger('my_logger_name', 'INFO', 'DEBUG', _rate_limit=1, _rate_burst=10)
+
+   # Long runs.  Rotate every 100MB or every hour, whichever comes first.
+   # Rotated segments are gzipped by a background thread, and the oldest
+   # are deleted to keep the logfile plus segments under 2GB.
+   log = get_logger('my_logger_name', 'INFO', 'DEBUG', _compress=True,
+                    _max_bytes=100000000, _rotate_interval=3600,
+                    _backup_count=None, _max_total_bytes=2000000000)
+
+   # Keep the last 5000 DEBUG records in memory, unformatted, while only
+   # INFO and above are written to the logfile.  When an ERROR or CRITICAL
+   # record is logged, the buffered records are written to the logfile
+   # ahead of it.  With _ring_file, the buffer is a memory-mapped file which
+   # survives a crash.  See read_ring_file().
+   log = get_logger('my_logger_name', 'INFO', 'INFO', _ring_buffer=5000)
+   log = get_logger('my_logger_name', 'INFO', 'INFO', _ring_buffer=5000, _ring_file='/tmp/my_logger_name.ring')
+   for line in read_ring_file('/tmp/my_logger_name.ring'):
+       print(line)
+
+   # Several processes, one logfile.  Start a LogAggregator before
+   # creating worker processes.  The aggregator's writer process is the
+   # only one which writes (and rotates) the logfile.  Every process's
+   # records are sent to it over a multiprocessing queue, and written in
+   # timestamp order.
+   aggregator = LogAggregator('/tmp/args_convergence.log')
+   aggregator.start()
+   log = get_logger('args_convergence', 'INFO', 'DEBUG', _aggregate=aggregator)
+   # ... fork/start workers, which also call
+   # get_logger('args_convergence', 'INFO', 'DEBUG', _aggregate=aggregator)
+   aggregator.stop()   # also called at exit.  Writes any remaining records.
+
 
 Valid logging levels are: DEBUG, INFO, WARNING, ERROR, CRITICAL
 
@@ -19,6 +87,28 @@ TODO:
    20180810 - add option
 date      ver  engineer   comment
 -------- ----  ---------- -------------------------------------------------------------------------------------------------------------------------
+20261016  122  agent      With _async and _ring_buffer, AsyncQueueHandler() queues records below the file and console loglevels unformatted
+20261016  122  agent      read_ring_file() leaves out slots emptied mid-write, and returns '<corrupt slot>' for unreadable slots, rather than raising
+20261016  122  agent      RingBufferHandler() copies mutable arguments of buffered records, and writes _ring_file slots unformatted (RING_MAGIC LOGRING2)
+20261016  121  agent      CompressingRotatingFileHandler() counts and deletes only its own segments, skips segments pruned before compression, reports errors with handleError()
+20261016  120  agent      _backup_count None or 0 rotates with CompressingRotatingFileHandler(), not RotatingFileHandler()
+20261016  119  agent      With _async, the _ring_buffer handler runs on the AsyncQueueListener() thread, behind the queue
+20261016  118  agent      RateLimitFilter() keys non-str messages by type.  _rate_key site with _profile fast falls back to template
+20261016  117  agent      LogAggregator().stop() sends the stopping process's pending records first, and detaches its AggregateQueueHandler()s
+20261016  116  agent      get_logger(), Logger().new() add _aggregate option.  LogAggregator(), AggregateQueueHandler() new.  See benchmarks/bench_log_aggregate.py
+20261016  115  agent      get_logger(), Logger().new() add _ring_buffer, _ring_file options.  RingBufferHandler(), read_ring_file() new
+20261016  114  agent      get_logger(), Logger().new() add _max_bytes, _backup_count, _rotate_interval, _compress, _max_total_bytes options
+20261016  114  agent      CompressingRotatingFileHandler() new
+20261016  113  agent      get_logger(), Logger().new() add _rate_limit, _rate_burst, _rate_key options.  RateLimitFilter() new
+20261016  112  agent      PROFILES add 'json' (JSON-lines logfile).  JsonFormatter(), ContextAdapter(), bind() new
+20261016  112  agent      get_logger() add _context option
+20261016  111  agent      get_logger(), Logger().new() add _profile option.  PROFILES 'default' and 'fast'
+20261016  111  agent      FastFormatter() new.  See benchmarks/bench_log_format.py
+20261016  110  agent      get_logger(), Logger().new() reuse an already-created logger of the same name instead of adding duplicate handlers
+20261016  110  agent      loggers writing to the same file (or to the console) share a single handler.  ProxyHandler() new, provides per-logger levels
+20261016  110  agent      handler_graph(), remove_logger() new
+20261016  109  agent      get_logger(), Logger().new() add _async, _queue_size, _queue_full options for background (non-blocking) logging
+20261016  109  agent      AsyncQueueHandler(), AsyncQueueListener(), dropped_records() new
 20180810  108  arobel     add docstrings for get_logger() and Log()
 20180810  107  arobel     get_logger() add _capture_warnings option which defaults to True
 20180810  107  arobel     get_logger() call logging.captureWarnings() to suppress urllib3 warnings about insecure HTTPS requests
@@ -39,22 +129,1109 @@ date      ver  engineer   comment
 """
 
 import os
+import atexit
+import glob
+import gzip
+import heapq
+import multiprocessing
+import multiprocessing.util
+import weakref
+import shutil
+import queue
+import threading
+import time
+import json
+import mmap
+import marshal
+import struct
+import re
+from json.encoder import encode_basestring
 import logging
 import logging.handlers
-our_version = 108
+our_version = 122
+
+QUEUE_FULL_POLICIES = ('drop', 'block')
+PROFILES = ('default', 'fast', 'json')
+RATE_KEYS = ('template', 'site')
+DEFAULT_FORMAT = '%(asctime)s %(levelname)s %(relativeCreated)d.%(lineno)d %(module)s.%(funcName)s %(message)s'
 
-def get_logger(_name, _console_level='INFO', _file_level='DEBUG', _capture_warnings=True):
+# Process-wide registry.  See Logger().new()
+# _loggers      - logger name -> the Logger() instance which created it
+# _destinations - destination (absolute logfile path, or CONSOLE) -> {'handler': shared handler, 'profile': profile, 'loggers': set of logger names}
+CONSOLE = '<console>'
+_registry_lock = threading.RLock()
+_loggers = dict()
+_destinations = dict()
+
+def get_logger(_name, _console_level='INFO', _file_level='DEBUG', _capture_warnings=True,
+               _async=False, _queue_size=10000, _queue_full='drop', _profile='default', _context=None,
+               _rate_limit=None, _rate_burst=10, _rate_key='template',
+               _max_bytes=10000000, _backup_count=3, _rotate_interval=None, _compress=False, _max_total_bytes=None,
+               _ring_buffer=0, _ring_file=None, _aggregate=None):
     '''
     returns a logger instance i.e. an instance of <class 'logging.Logger'>
+
+    _async      - If True, records are queued to a background thread
+                  which does all handler I/O.  See Logger().new()
+    _queue_size - maximum number of queued records when _async is True
+    _queue_full - 'drop' or 'block'.  What to do with a record when the
+                  queue is full.  Dropped records are counted, see
+                  dropped_records()
+    _profile    - 'default', 'fast', or 'json'.  See Logger().new()
+    _context    - optional dict of fields to add to every record.  If
+                  given, the returned logger is bind(log, **_context),
+                  a ContextAdapter.  Fields appear only in 'json' logfiles
+    _rate_limit - optional records/second allowed per message template
+                  (or call site).  See RateLimitFilter()
+    _rate_burst - records allowed in a burst, before _rate_limit applies
+    _rate_key   - 'template' or 'site'.  See RateLimitFilter()
+    _max_bytes, _backup_count, _rotate_interval, _compress, _max_total_bytes
+                - logfile rotation.  See Logger().new()
+    _ring_buffer, _ring_file
+                - in-memory buffer of records below _file_level, written
+                  to the logfile on ERROR.  See Logger().new()
+    _aggregate  - a started LogAggregator.  Send logfile records to its
+                  writer process.  See Logger().new()
     '''
     logging.captureWarnings(_capture_warnings)
     logger = Logger()
     logger.logfile = '/tmp/{}.log'.format(_name)
-    log = logger.new(_name)
+    log = logger.new(_name, _async=_async, _queue_size=_queue_size, _queue_full=_queue_full, _profile=_profile,
+                     _rate_limit=_rate_limit, _rate_burst=_rate_burst, _rate_key=_rate_key,
+                     _max_bytes=_max_bytes, _backup_count=_backup_count, _rotate_interval=_rotate_interval,
+                     _compress=_compress, _max_total_bytes=_max_total_bytes,
+                     _ring_buffer=_ring_buffer, _ring_file=_ring_file, _aggregate=_aggregate)
     logger.file_loglevel = _file_level
     logger.console_loglevel = _console_level
+    if _context is not None:
+        return bind(log, **_context)
     return log
 
+def bind(log, **context):
+    '''
+    return a ContextAdapter for log (a logging.Logger, or a
+    ContextAdapter whose context is extended) which adds context to
+    every record.  context values must be JSON-serializable; others are
+    serialized with str().
+    '''
+    if isinstance(log, ContextAdapter):
+        return log.bind(**context)
+    return ContextAdapter(log, context)
+
+class ContextAdapter(logging.LoggerAdapter):
+    '''
+    LoggerAdapter which binds context fields to each record.  The fields
+    are encoded as a JSON fragment once, when bound, rather than per
+    record.  JsonFormatter adds the fragment to each line.  Other
+    formatters ignore it.
+
+    Use bind() to create one.
+    '''
+    def __init__(self, logger, context):
+        super().__init__(logger, dict(context))
+        self.context_json = ''.join(
+            ',{}:{}'.format(encode_basestring(str(key)), json.dumps(value, default=str))
+            for key, value in self.extra.items())
+
+    def bind(self, **context):
+        '''return a new ContextAdapter with context added to this adapter's context'''
+        merged = dict(self.extra)
+        merged.update(context)
+        return ContextAdapter(self.logger, merged)
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get('extra')
+        if extra is None:
+            kwargs['extra'] = {'context_json': self.context_json}
+        else:
+            kwargs['extra'] = dict(extra, context_json=self.context_json)
+        return msg, kwargs
+
+def handler_graph():
+    '''
+    return a dict describing every logger created by get_logger() or
+    Logger().new() in this process, and the destinations they share
+
+    {
+        'loggers': {
+            name: {'file': path, 'file_level': 'DEBUG', 'console_level': 'INFO', 'async': False, 'profile': 'default'}
+        },
+        'destinations': {
+            path or console key: {'handler': 'RotatingFileHandler', 'profile': 'default', 'loggers': [name, ...]}
+        }
+    }
+    '''
+    with _registry_lock:
+        loggers = dict()
+        for name, logger in _loggers.items():
+            loggers[name] = {
+                'file': logger.file_key,
+                'file_level': logging.getLevelName(logger.fh.level),
+                'console_level': logging.getLevelName(logger.ch.level),
+                'async': logger.qh is not None,
+                'profile': logger.profile,
+                'rate_limit': None if logger.rate_filter is None else logger.rate_filter.rate,
+                'ring_buffer': None if logger.ring is None else logger.ring.capacity
+            }
+        destinations = dict()
+        for key, destination in _destinations.items():
+            destinations[key] = {
+                'handler': type(destination['handler']).__name__,
+                'profile': destination['profile'],
+                'loggers': sorted(destination['loggers'])
+            }
+    return {'loggers': loggers, 'destinations': destinations}
+
+def remove_logger(_name):
+    '''
+    detach the handlers which get_logger() or Logger().new() added to
+    logger _name, and remove it from the registry.  Shared handlers are
+    closed when their last logger is removed.  A later get_logger(_name)
+    creates the logger afresh.
+
+    return True if _name was registered, else False.
+    '''
+    with _registry_lock:
+        logger = _loggers.pop(_name, None)
+        if logger is None:
+            return False
+        if logger.listener is not None:
+            logger.listener.stop()
+            logger.log.removeHandler(logger.qh)
+        else:
+            logger.log.removeHandler(logger.ch)
+            logger.log.removeHandler(logger.fh)
+        if logger.ring is not None:
+            logger.log.removeHandler(logger.ring)
+            logger.ring.close()
+        if logger.rate_filter is not None:
+            logger.rate_filter.flush()
+            logger.log.removeFilter(logger.rate_filter)
+        if 'findCaller' in vars(logger.log):
+            del logger.log.findCaller
+        for key in (logger.file_key, logger.console_key):
+            destination = _destinations.get(key)
+            if destination is None:
+                continue
+            destination['loggers'].discard(_name)
+            if len(destination['loggers']) == 0:
+                if key != logger.console_key:
+                    destination['handler'].close()
+                del _destinations[key]
+    return True
+
+def _shared_handler(key, _name, _profile, factory):
+    '''
+    return the handler for destination key, creating it with factory()
+    if this is the first logger to use key.  Caller holds _registry_lock.
+
+    A destination has one format, that of the first logger to use it.
+    '''
+    destination = _destinations.get(key)
+    if destination is None:
+        destination = {'handler': factory(), 'profile': _profile, 'loggers': set()}
+        _destinations[key] = destination
+    elif destination['profile'] != _profile:
+        print('{} shares {} with loggers {}, which use profile {}. Using {} rather than {}'.format(
+            _name, key, sorted(destination['loggers']), destination['profile'], destination['profile'], _profile))
+    destination['loggers'].add(_name)
+    return destination['handler']
+
+class RateLimitFilter(logging.Filter):
+    '''
+    Token bucket rate limit, per key, for the records of one logger.
+
+    rate  - records/second allowed per key, once burst is used up
+    burst - records allowed in a burst i.e. the bucket size
+    key   - 'template' (default).  Records with the same level and
+            unformatted message (e.g. 'Not a valid ipv4 address: %s')
+            share a bucket, whatever their args.  Identical messages
+            built with f-strings also share a bucket.
+            Records whose message is not a str (e.g. log.info(some_dict))
+            share a bucket per level and message type.
+            'site'.  Records from the same file and line share a bucket.
+            Note that VerifyTypes() logs all failures from one line, so
+            'template' suits it better.  'site' needs caller information,
+            which the 'fast' profile doesn't collect.
+
+    A record which passes after others with its key were suppressed gets
+    ' [N similar messages suppressed]' appended.  flush() (also called
+    at exit) logs 'last message repeated N times: <message>' for keys
+    which have suppressed records not yet reported.
+
+    self.suppressed is the total number of records suppressed.
+
+    To bound memory, when more than max_keys keys are tracked, keys with
+    nothing to report are forgotten.
+    '''
+    def __init__(self, log, rate, burst=10, key='template', max_keys=10000):
+        super().__init__()
+        self.log = log
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.key = key
+        self.max_keys = max_keys
+        self.suppressed = 0
+        # key -> [tokens, time of last update, suppressed since last pass, last suppressed record]
+        self._buckets = dict()
+        self._lock = threading.Lock()
+
+    def _key(self, record):
+        if self.key == 'site':
+            return record.pathname, record.lineno
+        msg = record.msg
+        if isinstance(msg, str):
+            return record.levelno, msg
+        # msg may be unhashable e.g. a dict
+        return record.levelno, type(msg)
+
+    def filter(self, record):
+        if getattr(record, 'rate_limit_summary', False):
+            return True
+        key = self._key(record)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._forget()
+                self._buckets[key] = [self.burst - 1, now, 0, None]
+                return True
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                bucket[3] = record
+                self.suppressed += 1
+                return False
+            bucket[0] = tokens - 1
+            count = bucket[2]
+            bucket[2] = 0
+            bucket[3] = None
+        if count != 0:
+            record.msg = '{} [{} similar messages suppressed]'.format(record.getMessage(), count)
+            record.args = None
+        return True
+
+    def _forget(self):
+        '''forget keys with nothing to report.  Caller holds self._lock'''
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] == 0]:
+            del self._buckets[key]
+
+    def flush(self):
+        '''log a summary for each key with suppressed records not yet reported'''
+        with self._lock:
+            pending = [(bucket[2], bucket[3]) for bucket in self._buckets.values() if bucket[2] != 0]
+            for bucket in self._buckets.values():
+                bucket[2] = 0
+                bucket[3] = None
+        for count, last in pending:
+            record = self.log.makeRecord(
+                last.name, last.levelno, last.pathname, last.lineno,
+                'last message repeated %d times: %s', (count, last.getMessage()),
+                None, last.funcName, {'rate_limit_summary': True})
+            self.log.handle(record)
+
+# YYYYmmdd-HHMMSS[.N][.gz], the suffix of a CompressingRotatingFileHandler segment
+_SEGMENT_SUFFIX = re.compile(r'\d{8}-\d{6}(\.\d+)?(\.gz)?$')
+
+class CompressingRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    '''
+    Rotating file handler with size and time policies, background
+    compression, and a cap on total disk usage.
+
+    filename        - logfile
+    max_bytes       - rotate when the logfile reaches max_bytes.  0 disables
+    interval        - rotate every interval seconds.  None disables
+    backup_count    - keep at most this many rotated segments.  None for no limit
+    max_total_bytes - delete the oldest segments until the logfile plus
+                      segments total at most max_total_bytes.  None for no limit
+    compress        - gzip rotated segments.  Default True
+
+    Rotation renames the logfile to filename.YYYYmmdd-HHMMSS (plus .N if
+    that exists) and reopens filename, which is fast.  Compression to
+    filename.YYYYmmdd-HHMMSS.gz, and deletion of old segments, are done
+    by a worker thread, so the thread which logged the record doesn't
+    wait for either.  close() waits for the worker to finish.
+
+    Size is checked before each record, so a segment may exceed
+    max_bytes by one record.  Only files named like this handler's
+    segments are counted, compressed or deleted, so e.g. filename.1 from
+    a RotatingFileHandler is left alone.
+    '''
+    def __init__(self, filename, max_bytes=10000000, interval=None, backup_count=None,
+                 max_total_bytes=None, compress=True):
+        super().__init__(filename, 'a', encoding=None, delay=False)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
+        self.rollover_at = None
+        if interval is not None:
+            self.rollover_at = time.time() + interval
+        self._jobs = queue.Queue()
+        self._worker = None
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and record.created >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def _segment_name(self):
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        name = '{}.{}'.format(self.baseFilename, stamp)
+        # within a second, number past the newest segment (not into a gap
+        # left by deletion) so that names sort oldest first
+        index = 0
+        for path in self.segments():
+            key = self._segment_order(path)
+            if key[0] == stamp:
+                index = max(index, key[1] + 1)
+        if index == 0:
+            return name
+        return '{}.{}'.format(name, index)
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        segment = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            segment = self._segment_name()
+            os.rename(self.baseFilename, segment)
+        if self.interval is not None:
+            now = time.time()
+            while self.rollover_at <= now:
+                self.rollover_at += self.interval
+        self.stream = self._open()
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, name='log-rotation', daemon=True)
+            self._worker.start()
+        self._jobs.put(segment)
+
+    def _work(self):
+        while True:
+            segment = self._jobs.get()
+            try:
+                if segment is False:
+                    return
+                if segment is not None and self.compress:
+                    self._compress(segment)
+                self._enforce_limits()
+            except OSError:
+                self.handleError(logging.makeLogRecord({
+                    'msg': 'Unable to compress or prune rotated segment %s', 'args': (segment,)}))
+            finally:
+                self._jobs.task_done()
+
+    def _compress(self, segment):
+        try:
+            source = open(segment, 'rb')
+        except FileNotFoundError:
+            # deleted by _enforce_limits() while waiting to be compressed
+            return
+        with source:
+            with gzip.open(segment + '.gz.tmp', 'wb', compresslevel=6) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+        os.rename(segment + '.gz.tmp', segment + '.gz')
+        os.remove(segment)
+
+    def _segment_order(self, path):
+        '''sort key for filename.YYYYmmdd-HHMMSS[.N][.gz]'''
+        fields = path[len(self.baseFilename) + 1:].split('.')
+        if len(fields) > 1 and fields[1].isdigit():
+            return fields[0], int(fields[1])
+        return fields[0], 0
+
+    def segments(self):
+        '''return rotated segments of the logfile, oldest first'''
+        paths = glob.glob(glob.escape(self.baseFilename) + '.[0-9]*')
+        start = len(self.baseFilename) + 1
+        paths = [path for path in paths if _SEGMENT_SUFFIX.match(path, start)]
+        return sorted(paths, key=self._segment_order)
+
+    def _enforce_limits(self):
+        segments = self.segments()
+        if self.backup_count is not None:
+            while len(segments) > self.backup_count:
+                os.remove(segments.pop(0))
+        if self.max_total_bytes is not None:
+            sizes = [os.path.getsize(path) for path in segments]
+            total = sum(sizes)
+            if os.path.exists(self.baseFilename):
+                total += os.path.getsize(self.baseFilename)
+            while segments and total > self.max_total_bytes:
+                os.remove(segments.pop(0))
+                total -= sizes.pop(0)
+
+    def close(self):
+        '''close the logfile, and wait for pending compression'''
+        super().close()
+        worker = self._worker
+        if worker is not None:
+            self._worker = None
+            self._jobs.put(False)
+            worker.join()
+
+RING_MAGIC = b'LOGRING2'
+# magic, capacity, slot size, number of records written
+RING_HEADER = struct.Struct('<8sIIQ')
+# the header's last field, updated on every record
+RING_COUNT = struct.Struct('<Q')
+RING_COUNT_OFFSET = RING_HEADER.size - RING_COUNT.size
+# start of each slot: length of the rest of the slot, created, levelno,
+# lineno, name length, msg length, and whether msg is already formatted
+# (else marshalled args follow it).  Then name and msg
+RING_SLOT = struct.Struct('<IdBIHH?')
+# a slot whose length is 0 is empty, or was being written
+RING_EMPTY = struct.Struct('<I')
+
+# argument types which can't change after the call, so needn't be copied
+_IMMUTABLE_TYPES = frozenset((str, int, float, bool, type(None), bytes, complex))
+_COPIERS = {list: list.copy, dict: dict.copy, set: set.copy, bytearray: bytearray}
+
+def _snapshot(value):
+    '''return a shallow copy of value if it's a list, dict, set or bytearray, else value'''
+    copy = _COPIERS.get(value.__class__)
+    if copy is None:
+        return value
+    return copy(value)
+
+def _freeze(record):
+    '''
+    snapshot the mutable builtin containers in record's msg and args, so
+    that a later dump shows their values at the time of the call.
+    Other objects are kept by reference
+    '''
+    args = record.args
+    if args:
+        if args.__class__ is tuple:
+            if not _IMMUTABLE_TYPES.issuperset(map(type, args)):
+                record.args = tuple(map(_snapshot, args))
+        elif args.__class__ is dict:
+            # log.debug('%(name)s', {'name': ...})
+            record.args = {key: _snapshot(value) for key, value in args.items()}
+    if record.msg.__class__ is not str:
+        record.msg = _snapshot(record.msg)
+
+class RingBufferHandler(logging.Handler):
+    '''
+    Keeps the last capacity records below max_level (by default, DEBUG
+    records) in a preallocated ring buffer, and writes them to target
+    when a record at or above dump_level (by default ERROR) is handled.
+
+    capacity   - number of records kept
+    target     - handler the buffered records are written to, with its
+                 own formatter, e.g. the logfile handler
+    max_level  - records below this level are buffered.  Default INFO.
+                 Records at or above it are assumed to be logged already,
+                 so are not buffered
+    dump_level - records at or above this level trigger a dump.  Default ERROR
+    path       - optional.  If given, records are also kept in a
+                 memory-mapped file at path, so they survive a crash.
+                 See read_ring_file()
+    slot_size  - bytes per record in path.  Longer records are truncated.
+                 Default 512
+
+    In memory, records are kept as LogRecord objects, and are formatted
+    only when dumped, so the success path costs a list assignment.  Lists,
+    dicts, sets and bytearrays in the record's arguments are copied
+    (shallow), so the dump shows their values at the time of the call.
+    With path, each record's time, level, logger, line, message template
+    and marshalled arguments are also written to its fixed-size slot.
+    Messages are formatted only by read_ring_file().  Arguments which
+    marshal can't serialize, or which don't fit in the slot, are
+    formatted into the message when written.
+    '''
+    def __init__(self, capacity, target, max_level=logging.INFO, dump_level=logging.ERROR, path=None, slot_size=512):
+        super().__init__()
+        self.capacity = capacity
+        self.target = target
+        self.max_level = max_level
+        self.dump_level = dump_level
+        self.dumps = 0
+        self._records = [None] * capacity
+        self._next = 0
+        self.path = path
+        self.slot_size = slot_size
+        self._mmap = None
+        if path is not None:
+            size = RING_HEADER.size + capacity * slot_size
+            with open(path, 'wb') as fd:
+                fd.truncate(size)
+            with open(path, 'r+b') as fd:
+                self._mmap = mmap.mmap(fd.fileno(), size)
+            RING_HEADER.pack_into(self._mmap, 0, RING_MAGIC, capacity, slot_size, 0)
+
+    def emit(self, record):
+        if record.levelno >= self.dump_level:
+            self.dump(record)
+            return
+        if record.levelno >= self.max_level:
+            return
+        _freeze(record)
+        index = self._next % self.capacity
+        self._records[index] = record
+        self._next += 1
+        if self._mmap is not None:
+            self._write_slot(index, record)
+
+    def _write_slot(self, index, record):
+        name = record.name.encode('utf-8', 'replace')[:self.slot_size - RING_SLOT.size]
+        room = self.slot_size - RING_SLOT.size - len(name)
+        args = None
+        if record.args and record.msg.__class__ is str:
+            try:
+                args = marshal.dumps(record.args)
+            except ValueError:
+                # an argument isn't a builtin type
+                pass
+        if args is not None:
+            msg = record.msg.encode('utf-8', 'replace')
+            if len(msg) + len(args) > room:
+                args = None
+        if args is None:
+            # no arguments, so getMessage() formats nothing, or arguments
+            # which must be formatted now
+            msg = record.getMessage().encode('utf-8', 'replace')[:room]
+            args = b''
+        data = name + msg + args
+        offset = RING_HEADER.size + index * self.slot_size
+        # empty the slot, then write the data, then the header, so that a
+        # crash part way through leaves an empty slot, not a torn one
+        RING_EMPTY.pack_into(self._mmap, offset, 0)
+        start = offset + RING_SLOT.size
+        self._mmap[start:start + len(data)] = data
+        RING_SLOT.pack_into(self._mmap, offset, RING_SLOT.size - 4 + len(data), record.created, record.levelno,
+                            record.lineno, len(name), len(msg), not args)
+        RING_COUNT.pack_into(self._mmap, RING_COUNT_OFFSET, self._next)
+
+    def buffered(self):
+        '''return the buffered records, oldest first'''
+        count = min(self._next, self.capacity)
+        start = self._next - count
+        return [self._records[i % self.capacity] for i in range(start, self._next)]
+
+    def _marker(self, trigger, message):
+        marker = logging.LogRecord(trigger.name, trigger.levelno, trigger.pathname, trigger.lineno, message, None, None, trigger.funcName)
+        # the trigger's time, so the logfile stays in time order when the dump is late (e.g. with _async)
+        marker.created = trigger.created
+        marker.msecs = trigger.msecs
+        marker.relativeCreated = trigger.relativeCreated
+        return marker
+
+    def dump(self, trigger):
+        '''
+        write the buffered records to target, between marker lines, and
+        empty the buffer.  trigger is the record which caused the dump.
+        '''
+        records = self.buffered()
+        self.clear()
+        if len(records) == 0:
+            return
+        self.dumps += 1
+        self.target.handle(self._marker(trigger, '---- {} buffered records before {} ----'.format(len(records), trigger.levelname)))
+        for record in records:
+            self.target.handle(record)
+        self.target.handle(self._marker(trigger, '---- end of buffered records ----'))
+
+    def clear(self):
+        self._records = [None] * self.capacity
+        self._next = 0
+        if self._mmap is not None:
+            RING_HEADER.pack_into(self._mmap, 0, RING_MAGIC, self.capacity, self.slot_size, 0)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        super().close()
+
+def _ring_text(data, offset, slot_size):
+    '''
+    return the text of the record written by RingBufferHandler()._write_slot()
+    at offset, None if the slot is empty, or '<corrupt slot>' if it can't
+    be read e.g. it was overwritten by another program
+    '''
+    try:
+        length, created, levelno, lineno, name_length, msg_length, formatted = RING_SLOT.unpack_from(data, offset)
+        if length == 0:
+            return None
+        start = offset + RING_SLOT.size
+        end = offset + 4 + length
+        if end > offset + slot_size or start + name_length + msg_length > end:
+            return '<corrupt slot>'
+        name = data[start:start + name_length].decode('utf-8', 'replace')
+        start += name_length
+        message = data[start:start + msg_length].decode('utf-8', 'replace')
+        if not formatted:
+            args = marshal.loads(data[start + msg_length:end])
+            try:
+                message = message % args
+            except (TypeError, ValueError, KeyError):
+                message = '{} {!r}'.format(message, args)
+        return '{:.3f} {} {} {} {}'.format(created, logging.getLevelName(levelno), name, lineno, message)
+    except (ValueError, EOFError, TypeError, struct.error):
+        return '<corrupt slot>'
+
+def read_ring_file(path):
+    '''
+    return a list of the records (as text) in a RingBufferHandler's
+    memory-mapped file, oldest first, e.g. after the process crashed.
+    A record which was being written at the crash is left out.  A slot
+    which can't be read is returned as '<corrupt slot>'
+    '''
+    with open(path, 'rb') as fd:
+        data = fd.read()
+    magic, capacity, slot_size, written = RING_HEADER.unpack_from(data, 0)
+    if magic != RING_MAGIC:
+        raise ValueError('{} is not a ring buffer file'.format(path))
+    lines = list()
+    for i in range(max(0, written - capacity), written):
+        text = _ring_text(data, RING_HEADER.size + (i % capacity) * slot_size, slot_size)
+        if text is not None:
+            lines.append(text)
+    return lines
+
+def _file_formatter(_profile):
+    '''return the logfile formatter for _profile'''
+    if _profile == 'fast':
+        return FastFormatter()
+    if _profile == 'json':
+        return JsonFormatter()
+    return logging.Formatter(DEFAULT_FORMAT)
+
+def _rotating_file_handler(logfile, rotation, formatter):
+    '''return a logfile handler for rotation, a dict.  See Logger().new()'''
+    # RotatingFileHandler only rotates with backupCount > 0.  With 0 it
+    # reopens, without truncating, the oversized logfile for every record
+    if (rotation['compress'] or rotation['interval'] is not None or rotation['max_total_bytes'] is not None
+            or not rotation['backup_count']):
+        fh = CompressingRotatingFileHandler(logfile, **rotation)
+    else:
+        fh = logging.handlers.RotatingFileHandler(
+                 logfile,
+                 maxBytes=rotation['max_bytes'],
+                 backupCount=rotation['backup_count'])
+    fh.setFormatter(formatter)
+    return fh
+
+DEFAULT_ROTATION = {'max_bytes': 10000000, 'backup_count': 3, 'interval': None, 'max_total_bytes': None, 'compress': False}
+
+class AggregateQueueHandler(logging.Handler):
+    '''
+    Sends records to a LogAggregator's writer process.
+
+    _queue   - the aggregator's queue
+    batch    - records are sent in lists of up to batch records, which
+               costs far less per record than sending each one
+    interval - a partial batch is sent after at most interval seconds
+
+    Records are made picklable first: the message is merged with its
+    args, and any traceback is rendered to text.  Formatting is left to
+    the writer.
+
+    Each process (including forked children) gets its own batch and
+    flusher thread.  Pending records are sent at exit.
+
+    LogAggregator().stop() detaches the handlers of the process which
+    stops it: their pending records are sent, and later records go to a
+    fallback handler, which appends to the logfile directly, since
+    nothing reads the queue any more.
+    '''
+    _instances = weakref.WeakSet()
+
+    def __init__(self, _queue, batch=500, interval=0.05):
+        super().__init__()
+        self.queue = _queue
+        self.batch = batch
+        self.interval = interval
+        self._exception_formatter = logging.Formatter()
+        self._fallback = None
+        self._reinit()
+        AggregateQueueHandler._instances.add(self)
+        atexit.register(self.flush)
+
+    def _reinit(self):
+        '''state which must not be shared with a forked child'''
+        self._records = list()
+        self._batch_lock = threading.Lock()
+        self._flusher = None
+        self._closed = False
+
+    @classmethod
+    def _after_fork(cls):
+        for handler in list(cls._instances):
+            handler._reinit()
+
+    def handle(self, record):
+        # _batch_lock is used instead of the handler lock
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record):
+        try:
+            record = logging.makeLogRecord(record.__dict__)
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                if not record.exc_text:
+                    record.exc_text = self._exception_formatter.formatException(record.exc_info)
+                record.exc_info = None
+            with self._batch_lock:
+                fallback = self._fallback
+                if fallback is None:
+                    if self._flusher is None:
+                        self._start_flusher()
+                    self._records.append(record)
+                    if len(self._records) >= self.batch:
+                        self._send()
+            if fallback is not None:
+                fallback.handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def _start_flusher(self):
+        # multiprocessing.Process children exit without running atexit,
+        # but do run multiprocessing finalizers.  exitpriority 11 runs this
+        # before the queue's own finalizers (priority 10) close the queue.
+        multiprocessing.util.Finalize(self, self.flush, exitpriority=11)
+        self._flusher = threading.Thread(target=self._flush_periodically, name='log-aggregate-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._closed:
+            time.sleep(self.interval)
+            self.flush()
+
+    def _send(self):
+        '''caller holds _batch_lock'''
+        if self._records:
+            self.queue.put(self._records)
+            self._records = list()
+
+    def flush(self):
+        with self._batch_lock:
+            self._send()
+
+    def detach(self, fallback):
+        '''send pending records, then send later records to handler fallback instead of the queue'''
+        with self._batch_lock:
+            self._send()
+            self._fallback = fallback
+            self._closed = True
+
+    def close(self):
+        self.flush()
+        self._closed = True
+        if self._fallback is not None:
+            self._fallback.close()
+        super().close()
+
+os.register_at_fork(after_in_child=AggregateQueueHandler._after_fork)
+
+def _aggregate_writer(_queue, logfile, _profile, rotation, delay, received, written):
+    '''
+    LogAggregator's writer process.  Records arrive in lists, and are
+    held for delay seconds in a heap ordered by (created, arrival), so
+    records from different processes are written in timestamp order.
+    None is the stop sentinel.
+    '''
+    handler = _rotating_file_handler(logfile, rotation, _file_formatter(_profile))
+    heap = list()
+    arrival = 0
+    count = 0
+    stopping = False
+    while not stopping:
+        timeout = delay if heap else None
+        try:
+            records = _queue.get(timeout=timeout)
+        except queue.Empty:
+            records = False
+        while records is not False:
+            if records is None:
+                stopping = True
+                break
+            for record in records:
+                heapq.heappush(heap, (record.created, arrival, record))
+                arrival += 1
+            try:
+                records = _queue.get_nowait()
+            except queue.Empty:
+                records = False
+        if stopping:
+            horizon = float('inf')
+        else:
+            horizon = time.time() - delay
+        while heap and heap[0][0] <= horizon:
+            handler.handle(heapq.heappop(heap)[2])
+            count += 1
+        received.value = arrival
+        written.value = count
+    handler.close()
+
+class LogAggregator(object):
+    '''
+    Single writer process for a logfile shared by several processes.
+
+    logfile    - path of the logfile
+    profile    - 'default', 'fast', or 'json'.  Format of the logfile
+    rotation   - optional dict.  Keys are those of DEFAULT_ROTATION, as
+                 with Logger().new() _max_bytes, _backup_count, etc
+    delay      - seconds records are held by the writer to be put in
+                 timestamp order.  Records arriving later than this are
+                 written late, out of order.  Default 0.5
+    queue_size - maximum number of record batches waiting for the
+                 writer.  Senders block when it is full.  Default 1000
+
+    Call start() before creating the processes which log, so that they
+    inherit the queue, and pass the aggregator to get_logger() or
+    Logger().new() as _aggregate.  stop() (also run at exit, in the
+    process which called start()) sends that process's pending records,
+    and waits for all records to be written.  Call it after the other
+    processes have exited.  Records logged after stop() are appended to
+    the logfile directly.
+
+    self.received and self.written report progress.
+    '''
+    def __init__(self, logfile, profile='default', rotation=None, delay=0.5, queue_size=1000):
+        self.lib_name = "LogAggregator"
+        self.lib_version = our_version
+        self.logfile = os.path.abspath(logfile)
+        if profile not in PROFILES:
+            print('unknown profile {}. Using default. Expected one of {}'.format(profile, PROFILES))
+            profile = 'default'
+        self.profile = profile
+        self.rotation = dict(DEFAULT_ROTATION)
+        if rotation is not None:
+            self.rotation.update(rotation)
+        self.delay = delay
+        self.queue = multiprocessing.Queue(queue_size)
+        self._received = multiprocessing.Value('Q', 0, lock=False)
+        self._written = multiprocessing.Value('Q', 0, lock=False)
+        self._process = None
+        self._pid = None
+
+    @property
+    def received(self):
+        '''records the writer has received'''
+        return self._received.value
+
+    @property
+    def written(self):
+        '''records the writer has written to the logfile'''
+        return self._written.value
+
+    def start(self):
+        if self._process is not None:
+            return
+        self._process = multiprocessing.Process(
+            target=_aggregate_writer,
+            args=(self.queue, self.logfile, self.profile, self.rotation, self.delay, self._received, self._written),
+            name='log-aggregator',
+            daemon=True)
+        self._process.start()
+        self._pid = os.getpid()
+        atexit.register(self.stop)
+
+    def stop(self):
+        '''
+        stop the writer process, after it writes all records sent so far.
+        Only the process which called start() can stop it.
+        '''
+        if self._process is None or os.getpid() != self._pid:
+            return
+        for handler in list(AggregateQueueHandler._instances):
+            if handler.queue is self.queue:
+                fallback = logging.FileHandler(self.logfile, delay=True)
+                fallback.setFormatter(_file_formatter(self.profile))
+                handler.detach(fallback)
+        self.queue.put(None)
+        self._process.join()
+        self._process = None
+
+def _no_caller(*args, **kwargs):
+    '''replaces logging.Logger.findCaller() for 'fast' profile loggers'''
+    return '(unknown file)', 0, '(unknown function)', None
+
+class JsonFormatter(logging.Formatter):
+    '''
+    Formatter for the 'json' profile's logfile.  Each record is one line
+    containing a JSON object:
+
+    {"time":1533906855.123,"level":"INFO","logger":"my_logger_name","module":"my_script","func":"main","line":42,"msg":"message"}
+
+    followed by any fields bound with bind(), and "exc" and "stack"
+    when the record has a traceback or stack info.
+
+    Only strings are escaped per record (by the C string encoder in the
+    json module); the rest of the line is assembled directly, and bound
+    context arrives pre-encoded.
+    '''
+    def format(self, record):
+        record.message = record.getMessage()
+        s = '{{"time":{:.3f},"level":"{}","logger":{},"module":{},"func":{},"line":{},"msg":{}{}'.format(
+            record.created,
+            record.levelname,
+            encode_basestring(record.name),
+            encode_basestring(record.module),
+            encode_basestring(str(record.funcName)),
+            record.lineno,
+            encode_basestring(record.message),
+            getattr(record, 'context_json', ''))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            s = s + ',"exc":' + encode_basestring(record.exc_text)
+        if record.stack_info:
+            s = s + ',"stack":' + encode_basestring(self.formatStack(record.stack_info))
+        return s + '}'
+
+class FastFormatter(logging.Formatter):
+    '''
+    Formatter for the 'fast' profile.  Output is
+
+    2018-08-10 13:14:15,123 INFO 1234 my_logger_name message
+
+    i.e. the default format with the logger name in place of
+    lineno, module and funcName, which need a stack walk per record.
+
+    Rather than interpreting a %-style template per record, the line is
+    built with a single f-string, and the date/time part (which changes
+    once per second) is cached.
+    '''
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._stamp = None
+
+    def format(self, record):
+        record.message = record.getMessage()
+        second = int(record.created)
+        if second != self._second:
+            self._stamp = time.strftime('%Y-%m-%d %H:%M:%S', self.converter(second))
+            self._second = second
+        s = f"{self._stamp},{int(record.msecs):03d} {record.levelname} {int(record.relativeCreated)} {record.name} {record.message}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            s = s + '\n' + record.exc_text
+        if record.stack_info:
+            s = s + '\n' + self.formatStack(record.stack_info)
+        return s
+
+class ProxyHandler(logging.Handler):
+    '''
+    Gives a logger its own level in front of a handler shared with
+    other loggers.  Records at or above this handler's level are passed
+    to target, which does the formatting and I/O.  Closing a
+    ProxyHandler does not close target.
+    '''
+    def __init__(self, target, level=logging.NOTSET):
+        super().__init__(level)
+        self.target = target
+
+    def handle(self, record):
+        # target takes its own lock, so none is needed here
+        if not self.filter(record):
+            return False
+        self.target.handle(record)
+        return True
+
+    def emit(self, record):
+        self.target.handle(record)
+
+    def flush(self):
+        self.target.flush()
+
+def dropped_records(log):
+    '''
+    return the number of records dropped by log's AsyncQueueHandler(s)
+    because the queue was full.  return 0 if log is not asynchronous.
+    '''
+    return sum(h.dropped for h in log.handlers if isinstance(h, AsyncQueueHandler))
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    '''
+    Hands records to an AsyncQueueListener via a bounded queue.
+
+    policy - 'drop' (default) or 'block'.  When the queue is full, drop
+             the record (and count it in self.dropped) or wait for space.
+
+    After the listener is stopped (e.g. at exit) records are handled
+    synchronously, so nothing logged late is lost or blocks forever.
+
+    self.format_level - records below this level are only ring buffered
+    (see RingBufferHandler()), so are queued unformatted, with their
+    arguments snapshotted by _freeze().  Default NOTSET
+    '''
+    def __init__(self, _queue, policy='drop'):
+        super().__init__(_queue)
+        self.policy = policy
+        self.dropped = 0
+        self.listener = None
+        self.format_level = logging.NOTSET
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Merge args into the message now, so later changes to mutable
+        # args don't change what is logged.  Everything else, including
+        # formatting, is left to the listener thread.
+        if record.levelno < self.format_level:
+            # most are never written, so don't format them on the caller's thread
+            _freeze(record)
+            return record
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def emit(self, record):
+        listener = self.listener
+        if listener is not None and listener.stopped:
+            listener.handle(record)
+            return
+        super().emit(record)
+
+class AsyncQueueListener(logging.handlers.QueueListener):
+    '''
+    Background thread which passes queued records to handlers.
+    Honors each handler's level.  stop() drains the queue, and is
+    registered to run at exit.
+    '''
+    def __init__(self, _queue, *handlers):
+        super().__init__(_queue, *handlers, respect_handler_level=True)
+        self.stopped = False
+
+    def enqueue_sentinel(self):
+        # The queue may be full, so wait for space rather than raising
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self.stopped or self._thread is None:
+            return
+        super().stop()
+        self.stopped = True
+        for handler in self.handlers:
+            handler.flush()
+
 class Logger(object):
     '''
     Synopsis:
@@ -83,26 +1260,236 @@ class Logger(object):
         self._console_loglevel = self._levels['ERROR']
 
         self.log = None
+        self.formatter = None
+        self.console_formatter = None
+        self.profile = 'default'
+        self.console_key = CONSOLE
+        self.fh = None
+        self.ch = None
+        self.qh = None
+        self.listener = None
+        self.rate_filter = None
+        self.rotation = None
+        self.ring = None
+        self.file_key = None
+
+    def new(self, _name, _async=False, _queue_size=10000, _queue_full='drop', _profile='default',
+            _rate_limit=None, _rate_burst=10, _rate_key='template',
+            _max_bytes=10000000, _backup_count=3, _rotate_interval=None, _compress=False, _max_total_bytes=None,
+            _ring_buffer=0, _ring_file=None, _aggregate=None):
+        '''
+        return a logging.Logger named _name, logging to the console and
+        to self.logfile
 
-    def new(self, _name):
+        If a logger named _name was already created (by any Logger()
+        instance in this process), it is returned as-is, and this
+        instance controls its levels.  The other arguments, and
+        self.logfile, are then ignored.
+
+        The file handler for self.logfile and the console handler are
+        shared with any other loggers using the same destination.
+        self.fh and self.ch are this logger's ProxyHandler for each,
+        which hold its levels.
+
+        _async      - If True, the console and file handlers are driven by
+                      a background thread.  The logger itself gets only an
+                      AsyncQueueHandler, so logging a record never blocks
+                      on I/O or on log rotation.  Records still queued at
+                      exit are written before the process exits.
+        _queue_size - maximum number of queued records.  Default 10000
+        _queue_full - 'drop' (default) or 'block'.  What to do with a new
+                      record when the queue is full
+        _profile    - 'default' (default), 'fast', or 'json'.  'fast' uses
+                      FastFormatter, and disables the per-record caller
+                      (file, line, function) lookup for this logger.
+                      'json' writes the logfile with JsonFormatter, and
+                      the console in the default format.
+                      Loggers with different profiles don't share the
+                      console handler.  A logfile has one profile, that of
+                      its first logger.
+        _rate_limit - If given, records/second allowed per message
+                      template (or call site), after a burst of
+                      _rate_burst records.  Excess records are dropped
+                      before reaching any handler, and summarized.  See
+                      RateLimitFilter().  Default None i.e. no limit
+        _rate_burst - Default 10
+        _rate_key   - 'template' (default) or 'site'
+
+        Logfile rotation.  These apply when this logger is the first to
+        use self.logfile.
+
+        _max_bytes       - rotate at this size.  Default 10000000
+        _backup_count    - rotated logfiles to keep.  Default 3.  None
+                           for no limit.  0 keeps none i.e. the logfile
+                           is emptied when it reaches _max_bytes
+        _rotate_interval - also rotate every _rotate_interval seconds.
+                           Default None
+        _compress        - gzip rotated logfiles.  Default False
+        _max_total_bytes - delete the oldest rotated logfiles to keep the
+                           total size at most _max_total_bytes.  Default None
+
+        With only _max_bytes and _backup_count (> 0), rotation is done by
+        logging.handlers.RotatingFileHandler, as before.  Otherwise, by
+        CompressingRotatingFileHandler, which compresses and deletes
+        rotated logfiles in a background thread.
+
+        _ring_buffer - If > 0, keep the last _ring_buffer records which
+                       are below the file loglevel (i.e. which would not
+                       otherwise be logged to the file) in memory, and
+                       write them to the logfile when an ERROR or CRITICAL
+                       record is logged.  See RingBufferHandler().
+                       With _async, the listener thread keeps the ring
+                       buffer, so every record is queued.  Records below
+                       the file and console loglevels are queued
+                       unformatted.  The caller's thread only copies
+                       their list, dict, set and bytearray arguments
+                       (shallow), as RingBufferHandler() does
+                       Default 0 i.e. disabled
+        _ring_file   - optional path.  Also keep the buffered records in a
+                       memory-mapped file, so they survive a crash
+
+        _aggregate   - optional LogAggregator, already started.  Records
+                       for the logfile are sent to the aggregator's writer
+                       process, which owns aggregator.logfile.  self.logfile,
+                       the rotation options and the logfile format of
+                       _profile are then those of the aggregator.  Use this
+                       when several processes log to one file
+        '''
+        with _registry_lock:
+            existing = _loggers.get(_name)
+            if existing is not None:
+                self._adopt(existing)
+                _loggers[_name] = self
+                return self.log
+            self.rotation = {
+                'max_bytes': _max_bytes,
+                'backup_count': _backup_count,
+                'interval': _rotate_interval,
+                'max_total_bytes': _max_total_bytes,
+                'compress': _compress
+            }
+            self._new(_name, _async, _queue_size, _queue_full, _profile, _ring_buffer, _ring_file, _aggregate)
+            self._add_rate_filter(_rate_limit, _rate_burst, _rate_key, _profile)
+            _loggers[_name] = self
+        return self.log
+
+    def _add_rate_filter(self, _rate_limit, _rate_burst, _rate_key, _profile):
+        self.rate_filter = None
+        if _rate_limit is None:
+            return
+        if _rate_key not in RATE_KEYS:
+            print('unknown _rate_key {}. Using template. Expected one of {}'.format(_rate_key, RATE_KEYS))
+            _rate_key = 'template'
+        if _rate_key == 'site' and _profile == 'fast':
+            # 'fast' loggers don't record the call site, so every record would share one bucket
+            print("_rate_key site needs the call site, which _profile fast doesn't record. Using template")
+            _rate_key = 'template'
+        self.rate_filter = RateLimitFilter(self.log, _rate_limit, _rate_burst, _rate_key)
+        self.log.addFilter(self.rate_filter)
+        # registered after the async listener's stop(), so runs before it
+        atexit.register(self.rate_filter.flush)
+
+    def _adopt(self, other):
+        '''share the handlers and state of other, a Logger() for the same logger name'''
+        self.log = other.log
+        self._logfile = other._logfile
+        self._file_loglevel = other._file_loglevel
+        self._console_loglevel = other._console_loglevel
+        self.formatter = other.formatter
+        self.console_formatter = other.console_formatter
+        self.profile = other.profile
+        self.console_key = other.console_key
+        self.fh = other.fh
+        self.ch = other.ch
+        self.qh = other.qh
+        self.listener = other.listener
+        self.rate_filter = other.rate_filter
+        self.rotation = other.rotation
+        self.file_key = other.file_key
+        self.ring = other.ring
+
+    def _file_handler(self):
+        return _rotating_file_handler(self.logfile, self.rotation, self.formatter)
+
+    def _console_handler(self):
+        ch = logging.StreamHandler()
+        ch.setFormatter(self.console_formatter)
+        return ch
+
+    def _new(self, _name, _async, _queue_size, _queue_full, _profile, _ring_buffer, _ring_file, _aggregate):
         self.log = logging.getLogger(_name)
         self.log.setLevel(logging.DEBUG)
-        self.fh = logging.handlers.RotatingFileHandler(
-                      self.logfile,
-                      maxBytes=10000000,
-                      backupCount=3)
-        self.fh.setLevel(self.file_loglevel)
+        if _profile not in PROFILES:
+            print('unknown _profile {}. Using default. Expected one of {}'.format(_profile, PROFILES))
+            _profile = 'default'
+        self.profile = _profile
+        if _profile == 'fast':
+            self.console_formatter = FastFormatter()
+            self.log.findCaller = _no_caller
+            self.console_key = '{}:{}'.format(CONSOLE, _profile)
+            console_profile = _profile
+        else:
+            self.console_formatter = logging.Formatter(DEFAULT_FORMAT)
+            self.console_key = CONSOLE
+            console_profile = 'default'
 
-        self.ch = logging.StreamHandler()
-        self.ch.setLevel(self.console_loglevel)
+        if _aggregate is None:
+            self.formatter = _file_formatter(_profile)
+            self.file_key = os.path.abspath(self.logfile)
+            file_handler = self._file_handler
+        else:
+            self._logfile = _aggregate.logfile
+            self.rotation = _aggregate.rotation
+            self.formatter = _file_formatter(_aggregate.profile)
+            self.file_key = 'aggregate:{}'.format(_aggregate.logfile)
+            file_handler = lambda: AggregateQueueHandler(_aggregate.queue)
+        self.fh = ProxyHandler(_shared_handler(self.file_key, _name, _profile, file_handler), self.file_loglevel)
+        self.ch = ProxyHandler(_shared_handler(self.console_key, _name, console_profile, self._console_handler), self.console_loglevel)
 
-        self.formatter = logging.Formatter('%(asctime)s %(levelname)s %(relativeCreated)d.%(lineno)d %(module)s.%(funcName)s %(message)s')
-        self.ch.setFormatter(self.formatter)
-        self.fh.setFormatter(self.formatter)
+        # added first, so a dump precedes the record which triggered it.
+        # With _async, the listener's thread runs it, so that dumps stay
+        # off the caller's thread and in order with the queued records
+        self.ring = None
+        handlers = [self.ch, self.fh]
+        if _ring_buffer > 0:
+            self.ring = RingBufferHandler(_ring_buffer, self.fh.target, max_level=self.file_loglevel, path=_ring_file)
+            handlers.insert(0, self.ring)
 
-        self.log.addHandler(self.ch)
-        self.log.addHandler(self.fh)
-        return self.log
+        self.qh = None
+        self.listener = None
+        if not _async:
+            for handler in handlers:
+                self.log.addHandler(handler)
+            return
+
+        if _queue_full not in QUEUE_FULL_POLICIES:
+            print('unknown _queue_full policy {}. Using drop. Expected one of {}'.format(_queue_full, QUEUE_FULL_POLICIES))
+            _queue_full = 'drop'
+        self.qh = AsyncQueueHandler(queue.Queue(maxsize=_queue_size), _queue_full)
+        self.listener = AsyncQueueListener(self.qh.queue, *handlers)
+        self.qh.listener = self.listener
+        self._set_queue_level()
+        self.log.addHandler(self.qh)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def _set_queue_level(self):
+        '''don't queue records which no handler would emit'''
+        if self.qh is None:
+            return
+        if self.ring is not None:
+            # the ring buffer keeps the records below the other handlers' levels
+            self.qh.setLevel(logging.NOTSET)
+            self.qh.format_level = min(self._file_loglevel, self._console_loglevel)
+        else:
+            self.qh.setLevel(min(self._file_loglevel, self._console_loglevel))
+
+    @property
+    def dropped(self):
+        '''number of records dropped because the async queue was full'''
+        if self.qh is None:
+            return 0
+        return self.qh.dropped
 
     @property
     def file_loglevel(self):
@@ -116,6 +1503,9 @@ class Logger(object):
             return
         self._file_loglevel = self._levels[_x.upper()]
         self.fh.setLevel(self._file_loglevel)
+        if self.ring is not None:
+            self.ring.max_level = self._file_loglevel
+        self._set_queue_level()
         self.log.debug('set file_loglevel to {}'.format(_x))
 
     @property
@@ -131,6 +1521,7 @@ class Logger(object):
             return
         self._console_loglevel = self._levels[_x.upper()]
         self.ch.setLevel(self._console_loglevel)
+        self._set_queue_level()
         self.log.debug('set console_loglevel to {}'.format(_x))
 
     @property
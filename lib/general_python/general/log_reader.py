@@ -0,0 +1,374 @@
+'''
+log_reader.py
+Summary: Indexed queries over a logfile and its rotated segments
+
+Description:
+
+   LogReader finds the records in a logfile written by log.py (and in
+   its rotated segments) within a time range and/or at given levels,
+   without reading the whole log set.
+
+   Each segment has a sparse index: one entry per block of about stride
+   bytes, holding the block's offset, the earliest and latest times of
+   its records, and a bitmask of the levels which (may) appear in it.
+   Queries skip blocks whose time range doesn't overlap the query's, or
+   which have none of the requested levels (or the requested text).
+   Segments are memory-mapped, so only the blocks actually visited are
+   read from disk.
+
+   Indexes are kept in a single file (logfile + '.idx' by default), keyed
+   by inode, so a segment's index follows it when the segment is
+   renamed by rotation.  refresh() (called by query()) extends an index
+   incrementally as its file grows, and rebuilds it if the file was
+   replaced.
+
+   The 'default', 'fast', and 'json' profiles of log.py are recognized.
+   Lines which don't start a record (e.g. tracebacks) belong to the
+   preceding record.  Records need not be in time order (a
+   RingBufferHandler dump, or a LogAggregator, writes older records after
+   newer ones).  When a segment's blocks are in time order, which is
+   usual, queries bisect its index for the start time and stop at the
+   first block after the end time; otherwise, every block's time range
+   is checked.  Gzipped segments (see CompressingRotatingFileHandler) are
+   decompressed and scanned without an index.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.log_reader import LogReader
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   reader = LogReader(log, '/tmp/args_convergence.log')
+   for entry in reader.query(start='2018-08-10 13:00:00', end='2018-08-10 13:05:00', levels=['ERROR', 'CRITICAL']):
+       print(entry.text)
+   for entry in reader.query(contains='run_id 1234'):
+       print(entry.time, entry.level, entry.segment, entry.offset)
+
+   # from the shell
+   python -m general_python.general.log_reader /tmp/args_convergence.log --start '2018-08-10 13:00:00' --levels ERROR
+'''
+import argparse
+import glob
+import gzip
+import json
+import logging
+import mmap
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+OUR_VERSION = 100
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+LEVEL_BITS = {name: 1 << index for index, name in enumerate(LEVELS)}
+ALL_LEVELS = (1 << len(LEVELS)) - 1
+INDEX_VERSION = 2
+SIGNATURE_BYTES = 64
+
+# start of a record, per format
+_RECORD = {
+    'text': re.compile(rb'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) ([A-Z]+) ', re.M),
+    'json': re.compile(rb'^\{"time":([0-9.]+),"level":"([A-Z]+)"', re.M)
+}
+# bytes which appear in a block containing a record at each level
+_LEVEL_MARKERS = {
+    'text': [(LEVEL_BITS[name], ' {} '.format(name).encode()) for name in LEVELS],
+    'json': [(LEVEL_BITS[name], '"level":"{}"'.format(name).encode()) for name in LEVELS]
+}
+
+LogEntry = namedtuple('LogEntry', ['time', 'level', 'text', 'segment', 'offset'])
+
+class LogReader(object):
+    '''
+    Query a logfile and its rotated segments.  See module docstring.
+
+    log        - logging instance, mandatory
+    logfile    - path of the (current) logfile
+    stride     - approximate bytes per index entry.  Default 65536
+    index_path - where indexes are kept.  Default logfile + '.idx'
+    '''
+    def __init__(self, log, logfile, stride=65536, index_path=None):
+        self.lib_name = "LogReader"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        self.logfile = os.path.abspath(logfile)
+        self.stride = stride
+        self.index_path = index_path or self.logfile + '.idx'
+        self._indexes = self._load_indexes()
+        self._epochs = dict()
+
+    # segments
+
+    def _segment_order(self, path):
+        '''
+        sort key, oldest first.  Timestamped segments (filename.YYYYmmdd-HHMMSS[.N][.gz])
+        precede numbered segments (filename.N, higher N is older), which
+        precede the logfile itself.
+        '''
+        if path == self.logfile:
+            return (2, '', 0)
+        fields = path[len(self.logfile) + 1:].split('.')
+        if fields[0].isdigit():
+            return (1, '', -int(fields[0]))
+        if len(fields) > 1 and fields[1].isdigit():
+            return (0, fields[0], int(fields[1]))
+        return (0, fields[0], 0)
+
+    def segments(self):
+        '''return the paths of the logfile's segments, oldest first'''
+        paths = glob.glob(glob.escape(self.logfile) + '.[0-9]*')
+        paths = [path for path in paths if not path.endswith('.tmp')]
+        if os.path.exists(self.logfile):
+            paths.append(self.logfile)
+        return sorted(paths, key=self._segment_order)
+
+    # indexing
+
+    def _load_indexes(self):
+        try:
+            with open(self.index_path) as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return dict()
+        if data.get('version') != INDEX_VERSION or data.get('stride') != self.stride:
+            return dict()
+        return data.get('segments', dict())
+
+    def _save_indexes(self):
+        data = {'version': INDEX_VERSION, 'stride': self.stride, 'segments': self._indexes}
+        temporary = self.index_path + '.tmp'
+        try:
+            with open(temporary, 'w') as fd:
+                json.dump(data, fd)
+            os.replace(temporary, self.index_path)
+        except OSError as e:
+            self.log.warning(f"Unable to save log index {self.index_path}: {e}")
+
+    def _epoch(self, stamp):
+        '''return bytes 'YYYY-mm-dd HH:MM:SS' (local time) as seconds since the epoch'''
+        epoch = self._epochs.get(stamp)
+        if epoch is None:
+            epoch = time.mktime(time.strptime(stamp.decode('ascii'), '%Y-%m-%d %H:%M:%S'))
+            self._epochs[stamp] = epoch
+        return epoch
+
+    def _header(self, fmt, match):
+        '''return (time, level) of the record matched by _RECORD[fmt]'''
+        if fmt == 'text':
+            return self._epoch(match.group(1)) + int(match.group(2)) / 1000, match.group(3).decode('ascii')
+        return float(match.group(1)), match.group(2).decode('ascii')
+
+    def _format(self, data):
+        if data[:8] == b'{"time":':
+            return 'json'
+        return 'text'
+
+    def _block_times(self, data, fmt, start, end):
+        '''return (earliest, latest) time of the records in data[start:end]'''
+        matches = _RECORD[fmt].finditer(data, start, end)
+        if fmt == 'text':
+            # 'YYYY-mm-dd HH:MM:SS' and ',mmm' sort as they read, so
+            # convert only the earliest and latest
+            stamps = [match.group(1, 2) for match in matches]
+            return tuple(self._epoch(stamp) + int(milliseconds) / 1000
+                         for stamp, milliseconds in (min(stamps), max(stamps)))
+        times = [float(match.group(1)) for match in matches]
+        return min(times), max(times)
+
+    def _index_blocks(self, data, fmt, start, index):
+        '''
+        append [offset, earliest time, latest time, level mask] to
+        index['entries'] for each block of data from offset start
+        '''
+        pattern = _RECORD[fmt]
+        markers = _LEVEL_MARKERS[fmt]
+        size = len(data)
+        entries = index['entries']
+        position = start
+        while position < size:
+            match = pattern.search(data, position)
+            if match is None:
+                break
+            block_start = match.start()
+            next_match = None
+            if block_start + self.stride < size:
+                next_match = pattern.search(data, block_start + self.stride)
+            block_end = size if next_match is None else next_match.start()
+            mask = 0
+            for bit, marker in markers:
+                if data.find(marker, block_start, block_end) != -1:
+                    mask |= bit
+            earliest, latest = self._block_times(data, fmt, block_start, block_end)
+            entries.append([block_start, earliest, latest, mask])
+            position = block_end
+        # blocks in time order (each starts no earlier than the previous
+        # ends) can be bisected
+        index['ordered'] = all(entries[position][1] >= entries[position - 1][2]
+                               for position in range(1, len(entries)))
+
+    def _index_segment(self, path, data, stat):
+        '''return the index for path, updating it if the file has grown or been replaced'''
+        key = str(stat.st_ino)
+        signature = bytes(data[:SIGNATURE_BYTES]).hex()
+        index = self._indexes.get(key)
+        if index is not None and index['signature'] == signature and index['end'] == len(data):
+            return index, False
+        fmt = self._format(data)
+        if index is None or index['signature'] != signature or index['end'] > len(data) or index['format'] != fmt or not index['entries']:
+            index = {'signature': signature, 'format': fmt, 'end': 0, 'entries': list(), 'ordered': True}
+            start = 0
+        else:
+            # the last block may have grown, so re-index it
+            start = index['entries'].pop()[0]
+        self._index_blocks(data, fmt, start, index)
+        index['end'] = len(data)
+        self._indexes[key] = index
+        self.log.debug(f"indexed {path} from offset {start}, {len(index['entries'])} entries")
+        return index, True
+
+    def refresh(self):
+        '''bring the index of every uncompressed segment up to date'''
+        changed = False
+        live = set()
+        for path in self.segments():
+            if path.endswith('.gz'):
+                continue
+            with open(path, 'rb') as fd:
+                stat = os.fstat(fd.fileno())
+                live.add(str(stat.st_ino))
+                if stat.st_size == 0:
+                    continue
+                with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    changed |= self._index_segment(path, data, stat)[1]
+        for key in [key for key in self._indexes if key not in live]:
+            del self._indexes[key]
+            changed = True
+        if changed:
+            self._save_indexes()
+
+    # queries
+
+    def _to_epoch(self, x):
+        if x is None or isinstance(x, (int, float)):
+            return x
+        return self._epoch(x.encode('ascii'))
+
+    def _level_mask(self, levels):
+        if levels is None:
+            return ALL_LEVELS
+        if isinstance(levels, str):
+            levels = [levels]
+        mask = 0
+        for level in levels:
+            if level.upper() not in LEVEL_BITS:
+                self.log.error(f"Exiting. Unknown level {level}. Expected one of {LEVELS}")
+                exit(1)
+            mask |= LEVEL_BITS[level.upper()]
+        return mask
+
+    def _records(self, data, fmt, path, start, end, first, last, mask, needle):
+        '''generator yielding the matching LogEntry in data[start:end]'''
+        pattern = _RECORD[fmt]
+        previous = None
+        for match in pattern.finditer(data, start, end):
+            if previous is not None:
+                yield from self._entry(data, fmt, path, previous, match.start(), first, last, mask, needle)
+            previous = match
+        if previous is not None:
+            yield from self._entry(data, fmt, path, previous, end, first, last, mask, needle)
+
+    def _entry(self, data, fmt, path, match, end, first, last, mask, needle):
+        created, level = self._header(fmt, match)
+        if first is not None and created < first:
+            return
+        if last is not None and created > last:
+            return
+        if not LEVEL_BITS.get(level, ALL_LEVELS) & mask:
+            return
+        text = data[match.start():end]
+        if needle is not None and needle not in text:
+            return
+        yield LogEntry(created, level, bytes(text).decode('utf-8', 'replace').rstrip('\n'), path, match.start())
+
+    def _query_indexed(self, path, index, data, first, last, mask, needle):
+        entries = index['entries']
+        ordered = index['ordered']
+        block = 0
+        if ordered and first is not None:
+            # the first block whose latest record is at or after first
+            block = bisect_left([entry[2] for entry in entries], first)
+        fmt = index['format']
+        for position in range(block, len(entries)):
+            offset, earliest, latest, block_mask = entries[position]
+            if last is not None and earliest > last:
+                if ordered:
+                    return
+                continue
+            if first is not None and latest < first:
+                continue
+            if not block_mask & mask:
+                continue
+            block_end = entries[position + 1][0] if position + 1 < len(entries) else len(data)
+            if needle is not None and data.find(needle, offset, block_end) == -1:
+                continue
+            yield from self._records(data, fmt, path, offset, block_end, first, last, mask, needle)
+
+    def query(self, start=None, end=None, levels=None, contains=None):
+        '''
+        generator yielding LogEntry(time, level, text, segment, offset)
+        for each record, oldest first, with
+
+        start    - time >= start.  Seconds since the epoch, or a local
+                   time string 'YYYY-mm-dd HH:MM:SS'.  Default None
+        end      - time <= end.  As start.  Default None
+        levels   - level in levels, a level name or list of level names.
+                   Default None i.e. all levels
+        contains - str which the record's text contains.  Default None
+        '''
+        first = self._to_epoch(start)
+        last = self._to_epoch(end)
+        mask = self._level_mask(levels)
+        needle = None if contains is None else contains.encode('utf-8')
+        self.refresh()
+        for path in self.segments():
+            if path.endswith('.gz'):
+                with gzip.open(path, 'rb') as fd:
+                    data = fd.read()
+                yield from self._records(data, self._format(data), path, 0, len(data), first, last, mask, needle)
+                continue
+            try:
+                fd = open(path, 'rb')
+            except OSError:
+                # rotated away since segments() was called
+                continue
+            with fd:
+                stat = os.fstat(fd.fileno())
+                if stat.st_size == 0:
+                    continue
+                with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    index, _ = self._index_segment(path, data, stat)
+                    yield from self._query_indexed(path, index, data, first, last, mask, needle)
+
+def main():
+    parser = argparse.ArgumentParser(description='Print records from a logfile and its rotated segments')
+    parser.add_argument('logfile')
+    parser.add_argument('--start', default=None, help="'YYYY-mm-dd HH:MM:SS' or seconds since the epoch")
+    parser.add_argument('--end', default=None, help="'YYYY-mm-dd HH:MM:SS' or seconds since the epoch")
+    parser.add_argument('--levels', nargs='+', default=None, choices=LEVELS)
+    parser.add_argument('--contains', default=None)
+    args = parser.parse_args()
+    log = logging.getLogger('log_reader')
+    reader = LogReader(log, args.logfile)
+    start = args.start
+    end = args.end
+    if start is not None and start.replace('.', '', 1).isdigit():
+        start = float(start)
+    if end is not None and end.replace('.', '', 1).isdigit():
+        end = float(end)
+    for entry in reader.query(start=start, end=end, levels=args.levels, contains=args.contains):
+        print(entry.text)
+
+if __name__ == '__main__':
+    main()
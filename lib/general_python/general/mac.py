@@ -0,0 +1,225 @@
+'''
+mac.py
+Summary: Table-driven mac address parsing, formatting, and packed storage
+
+Description:
+
+   to_int() validates and parses mac addresses in any of the following
+   notations to a 48-bit integer, without a regex.  Separator positions
+   are checked against a table of valid separator patterns, and the
+   remaining characters against a table of hex digits, before the
+   (then known-good) digits are passed to int(x, 16):
+
+      colon   00:1a:2b:3c:4d:5e
+      dash    00-1a-2b-3c-4d-5e
+      dot     001a.2b3c.4d5e      (NX-OS)
+
+   Hex digits are case-insensitive.  As with VerifyTypes().is_mac_address()
+   historically, colon and dash separators may be mixed.
+
+   to_str() formats a 48-bit integer in any of the above notations.
+
+   MacTable stores mac addresses as 48-bit integers in an array('Q'),
+   i.e. 8 bytes per address versus ~66 bytes for a str, with sorting,
+   fast membership tests, and re-formatting.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.mac import MacTable, to_int, to_str
+
+   to_int('001a.2b3c.4d5e')                     # 112394521950
+   to_str(112394521950, 'colon')                # '00:1a:2b:3c:4d:5e'
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   table = MacTable(log)
+   table.extend(['00:1a:2b:3c:4d:5e', '001a.2b3c.4d5f'])
+   '00-1A-2B-3C-4D-5E' in table                 # True
+   for mac in table.format('dot'):
+       print(mac)
+'''
+from array import array
+from bisect import bisect_left
+try:
+    import numpy as np # MacTable.sort()
+except ImportError:
+    np = None
+
+OUR_VERSION = 101
+
+STYLES = ('colon', 'dash', 'dot')
+
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+# every valid sequence of the five separators in colon/dash notation
+_SEPARATORS = frozenset(
+    a + b + c + d + e
+    for a in ':-' for b in ':-' for c in ':-' for d in ':-' for e in ':-')
+# Regex source matching exactly what to_int() accepts, for validating a
+# whole column in one re pass (see VerifyTypes().is_mac_address_many())
+ADDRESS_PATTERN = r'[0-9a-fA-F]{2}(?:[:-][0-9a-fA-F]{2}){5}|[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}'
+# 0-255 mapped to lowercase two-digit hex
+_HEX2 = [f"{value:02x}" for value in range(256)]
+
+def to_int(x):
+    '''
+    return mac address string x as a 48-bit integer
+    return None if x is not a valid mac address
+    '''
+    if not isinstance(x, str):
+        return None
+    length = len(x)
+    if length == 17:
+        # x[2::3] is the characters at the five separator positions
+        if x[2::3] not in _SEPARATORS:
+            return None
+        digits = x.replace(':', '').replace('-', '')
+    elif length == 14:
+        if x[4] != '.' or x[9] != '.':
+            return None
+        digits = x.replace('.', '')
+    else:
+        return None
+    # a separator in a digit position leaves len(digits) < 12
+    if len(digits) != 12 or not _HEX_DIGITS.issuperset(digits):
+        return None
+    return int(digits, 16)
+
+def to_str(x, style='colon'):
+    '''
+    return 48-bit integer x as a lowercase mac address string in
+    style 'colon', 'dash', or 'dot'
+    '''
+    o = [_HEX2[(x >> shift) & 0xFF] for shift in (40, 32, 24, 16, 8, 0)]
+    if style == 'colon':
+        return ':'.join(o)
+    if style == 'dash':
+        return '-'.join(o)
+    if style == 'dot':
+        return f"{o[0]}{o[1]}.{o[2]}{o[3]}.{o[4]}{o[5]}"
+    raise ValueError(f"unknown mac address style {style}. Expected one of {STYLES}")
+
+def normalize(x, style='colon'):
+    '''
+    return mac address string x, in any notation, in style
+    return None if x is not a valid mac address
+    '''
+    value = to_int(x)
+    if value is None:
+        return None
+    return to_str(value, style)
+
+def is_mac_address(x):
+    '''return True if x is a mac address string in any notation'''
+    return to_int(x) is not None
+
+class MacTable(object):
+    '''
+    Packed table of mac addresses.  See module docstring.
+
+    log - logging instance, mandatory
+
+    Addresses can be added as strings (any notation) or as integers.
+    Invalid addresses are not added, and are counted in self.invalid.
+    Duplicates are kept unless unique() is called.
+    '''
+    def __init__(self, log, macs=None):
+        self.lib_name = "MacTable"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        self.invalid = 0
+        self._data = array('Q')
+        self._sorted = True
+        if macs is not None:
+            self.extend(macs)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        '''iterate over the table as 48-bit integers'''
+        return iter(self._data)
+
+    def __contains__(self, x):
+        if not isinstance(x, int):
+            x = to_int(x)
+            if x is None:
+                return False
+        if not self._sorted:
+            self.sort()
+        index = bisect_left(self._data, x)
+        return index < len(self._data) and self._data[index] == x
+
+    def _to_int(self, x):
+        if isinstance(x, int):
+            if 0 <= x <= 0xFFFFFFFFFFFF:
+                return x
+            return None
+        return to_int(x)
+
+    def add(self, x):
+        '''
+        add mac address x (str or int) to the table.
+        return True if added, False if x is invalid.
+        '''
+        value = self._to_int(x)
+        if value is None:
+            self.invalid += 1
+            self.log.debug(f"Not a valid mac address: {x}")
+            return False
+        data = self._data
+        if self._sorted and len(data) != 0 and data[-1] > value:
+            self._sorted = False
+        data.append(value)
+        return True
+
+    def extend(self, macs):
+        '''
+        add every mac address in iterable macs to the table.
+        return the number of addresses added.
+        '''
+        before = len(self._data)
+        append = self._data.append
+        convert = self._to_int
+        invalid = 0
+        for x in macs:
+            value = convert(x)
+            if value is None:
+                invalid += 1
+                continue
+            append(value)
+        if invalid != 0:
+            self.invalid += invalid
+            self.log.debug(f"Skipped {invalid} invalid mac addresses")
+        if len(self._data) != before:
+            self._sorted = False
+        return len(self._data) - before
+
+    def sort(self):
+        '''sort the table in place, in ascending order'''
+        if np is not None:
+            np.frombuffer(self._data, dtype=np.uint64).sort()
+        else:
+            self._data = array('Q', sorted(self._data))
+        self._sorted = True
+
+    def unique(self):
+        '''sort the table and remove duplicates'''
+        self.sort()
+        data = self._data
+        result = array('Q')
+        previous = None
+        for value in data:
+            if value != previous:
+                result.append(value)
+                previous = value
+        self._data = result
+
+    def format(self, style='colon'):
+        '''generator yielding each address as a string in style'''
+        for value in self._data:
+            yield to_str(value, style)
+
+    def clear(self):
+        self._data = array('Q')
+        self._sorted = True
+        self.invalid = 0
@@ -0,0 +1,271 @@
+'''
+memprof.py
+Summary: Opt-in tracemalloc profiling of named regions, hooked into util.Timer
+
+Description:
+
+   MemoryProfiler attributes memory allocation to named regions.  For
+   each region it reports the number of calls, the net allocation
+   (memory still allocated at the end of the region), the peak
+   allocation above the level at the start of the region, and the
+   source lines which allocated the most.
+
+   Regions are entered and exited by:
+
+      - the intervals of util.Timers with a name (Timers from a
+        TimerRegistry are named): start()/stop(), `with`, and decorated
+        calls, in concurrent mode or not
+      - profiler.region(name), a context manager
+
+   Regions may nest.  A region's peak includes its nested regions.
+
+   Profiling is off by default, and costs Timer one global lookup per
+   interval when off.  Turn it on with get_memprof(log), or by
+   setting the environment variable GENERAL_PYTHON_MEMPROF to the
+   number of stack frames to keep per allocation (e.g. 1), in which case
+   the report is written at exit to GENERAL_PYTHON_MEMPROF_REPORT
+   (default /tmp/memprof_<pid>.json).
+
+   tracemalloc slows allocation-heavy code by roughly 2x or more, and
+   with snapshots=True (the default, needed for top lines) each region
+   boundary takes a snapshot, which costs time proportional to the
+   number of live allocations.  Use it to find the phase responsible
+   for memory growth, not in every run.  tracemalloc is process-wide,
+   so concurrent regions in several threads are attributed together.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.memprof import get_memprof
+   from general_python.general.timers import get_timers
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   profiler = get_memprof(log, frames=1, top=10)
+   timers = get_timers(log)
+
+   with timers('parse_results'):
+       results = parse(output)
+   with profiler.region('build_report'):
+       report = build(results)
+
+   profiler.log_report()
+   profiler.write_json('/tmp/my_script.memprof.json')
+
+   # or, without changing the script
+   GENERAL_PYTHON_MEMPROF=1 ./my_script.py
+'''
+import atexit
+import json
+import logging
+import os
+import threading
+import tracemalloc
+from collections import Counter
+
+OUR_VERSION = 101
+
+ENV_FRAMES = 'GENERAL_PYTHON_MEMPROF'
+ENV_REPORT = 'GENERAL_PYTHON_MEMPROF_REPORT'
+
+# the active MemoryProfiler, or None.  Read by util.Timer
+profiler = None
+_profiler_lock = threading.Lock()
+
+def get_memprof(log, frames=1, top=10, snapshots=True):
+    '''
+    return the active MemoryProfiler, creating and starting it (with
+    these arguments) if there is none
+    '''
+    global profiler
+    with _profiler_lock:
+        if profiler is None:
+            profiler = MemoryProfiler(log, frames, top, snapshots)
+            profiler.start()
+    return profiler
+
+def stop_memprof():
+    '''stop and deactivate the active MemoryProfiler.  return it, or None'''
+    global profiler
+    with _profiler_lock:
+        stopped = profiler
+        profiler = None
+    if stopped is not None:
+        stopped.stop()
+    return stopped
+
+class _Region(object):
+    __slots__ = ('name', 'start', 'peak', 'snapshot')
+
+    def __init__(self, name, start, snapshot):
+        self.name = name
+        self.start = start
+        self.peak = start
+        self.snapshot = snapshot
+
+class RegionStats(object):
+    '''accumulated statistics for one region name.  Sizes are bytes'''
+    __slots__ = ('name', 'calls', 'net_total', 'net_last', 'peak_max', 'lines')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.net_total = 0
+        self.net_last = 0
+        self.peak_max = 0
+        # 'file:line' -> bytes allocated (net) by that line, over all calls
+        self.lines = Counter()
+
+    def as_dict(self, top):
+        return {
+            'calls': self.calls,
+            'net_total': self.net_total,
+            'net_last': self.net_last,
+            'peak_max': self.peak_max,
+            'top_lines': [[line, size] for line, size in self.lines.most_common(top) if size > 0]
+        }
+
+class _RegionContext(object):
+    __slots__ = ('profiler', 'name', 'region')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.region = self.profiler.enter(self.name)
+        return self.region
+
+    def __exit__(self, *args):
+        self.profiler.exit(self.region)
+        return False
+
+class MemoryProfiler(object):
+    '''
+    Per-region allocation profiler.  See module docstring.
+
+    log       - logging instance, mandatory
+    frames    - stack frames kept per allocation.  Default 1
+    top       - number of top allocating lines reported per region.  Default 10
+    snapshots - take snapshots at region boundaries, for top lines.
+                Default True.  If False, only net and peak are reported
+    '''
+    def __init__(self, log, frames=1, top=10, snapshots=True):
+        self.lib_name = "MemoryProfiler"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        self.frames = frames
+        self.top = top
+        self.snapshots = snapshots
+        self.stats = dict()
+        self._stack = list()
+        self._lock = threading.RLock()
+        self._started_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _snapshot(self):
+        if not self.snapshots:
+            return None
+        snapshot = tracemalloc.take_snapshot()
+        # exclude tracemalloc's own, and this module's, allocations
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)))
+
+    def enter(self, name):
+        '''enter region name.  return a handle for exit()'''
+        if not tracemalloc.is_tracing():
+            return None
+        with self._lock:
+            _, peak = tracemalloc.get_traced_memory()
+            # the enclosing regions' peaks must survive reset_peak()
+            for region in self._stack:
+                if peak > region.peak:
+                    region.peak = peak
+            # the snapshot is taken before start, and peak is reset after
+            # it, so the snapshot counts against no region's peak
+            snapshot = self._snapshot()
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            region = _Region(name, start, snapshot)
+            self._stack.append(region)
+        return region
+
+    def exit(self, region):
+        '''exit region, a handle from enter()'''
+        if region is None or not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            if region in self._stack:
+                self._stack.remove(region)
+            if peak > region.peak:
+                region.peak = peak
+            for parent in self._stack:
+                if region.peak > parent.peak:
+                    parent.peak = region.peak
+            stats = self.stats.get(region.name)
+            if stats is None:
+                stats = self.stats[region.name] = RegionStats(region.name)
+            stats.calls += 1
+            stats.net_last = current - region.start
+            stats.net_total += stats.net_last
+            if region.peak - region.start > stats.peak_max:
+                stats.peak_max = region.peak - region.start
+            if region.snapshot is not None:
+                after = self._snapshot()
+                for difference in after.compare_to(region.snapshot, 'lineno')[:self.top]:
+                    frame = difference.traceback[0]
+                    stats.lines['{}:{}'.format(frame.filename, frame.lineno)] += difference.size_diff
+                region.snapshot = None
+                del after
+                tracemalloc.reset_peak()
+
+    def region(self, name):
+        '''return a context manager for region name'''
+        return _RegionContext(self, name)
+
+    def report(self):
+        '''return {region name: {calls, net_total, net_last, peak_max, top_lines}}'''
+        with self._lock:
+            return {name: stats.as_dict(self.top) for name, stats in sorted(self.stats.items())}
+
+    def log_report(self):
+        '''log the report, largest peak first, at INFO'''
+        report = self.report()
+        self.log.info(f"{'region':30} {'calls':>8} {'peak_max':>14} {'net_total':>14} {'net_last':>14}")
+        for name, stats in sorted(report.items(), key=lambda item: -item[1]['peak_max']):
+            self.log.info(f"{name:30} {stats['calls']:8} {stats['peak_max']:14} {stats['net_total']:14} {stats['net_last']:14}")
+            for line, size in stats['top_lines']:
+                self.log.info(f"    {size:14}  {line}")
+
+    def write_json(self, path):
+        with open(path, 'w') as fd:
+            json.dump(self.report(), fd, indent=4)
+            fd.write('\n')
+
+def _write_report_at_exit():
+    active = profiler
+    if active is None:
+        return
+    path = os.environ.get(ENV_REPORT, '/tmp/memprof_{}.json'.format(os.getpid()))
+    try:
+        active.write_json(path)
+    except OSError as e:
+        active.log.warning(f"Unable to write memory profile to {path}: {e}")
+
+if os.environ.get(ENV_FRAMES):
+    try:
+        _frames = int(os.environ[ENV_FRAMES])
+    except ValueError:
+        _frames = 1
+    get_memprof(logging.getLogger(__name__), frames=max(1, _frames))
+    atexit.register(_write_report_at_exit)
@@ -0,0 +1,131 @@
+'''
+numeric.py
+Summary: Digit, hex, and integer-power predicates for large inputs
+
+Description:
+
+   is_digits() and is_hex() check a whole string in a single C-level
+   pass (str.isdecimal(), bytes.isdigit(), bytes.translate()) rather
+   than with a regex or a per-character set comparison.
+
+   is_power() is exact for arbitrarily large integers.  Powers of two
+   are tested with bit tricks.  Other bases use int_log(), which divides
+   out b, b**2, b**4, b**8, ... so the number of big-int operations
+   grows with log(log(x)), and no floating-point log is involved.
+
+   all_digits() and all_hex() test an entire list of strings at once by
+   joining them, which lets batch callers skip per-value work when every
+   value is valid (the common case).
+
+Synopsis:
+
+   from general_python.general.numeric import is_digits, is_hex, is_power, int_log
+
+   is_digits('0123')                # True
+   is_hex('deadBEEF')               # True
+   is_power(3**1000, 3)             # True
+   is_power(3**1000 + 1, 3)         # False
+   int_log(3**1000 + 1, 3)          # 1000
+'''
+import math
+
+OUR_VERSION = 100
+
+_HEX_BYTES = b'0123456789abcdefABCDEF'
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+def is_digits(x):
+    '''
+    return True if x contains only decimal digits i.e. is a positive integer
+
+    int     - x >= 0
+    str     - x is non-empty and all characters are decimal digits
+    bytes   - x is non-empty and all bytes are ascii digits
+    other   - str(x) is checked
+    '''
+    if isinstance(x, str):
+        return x.isdecimal()
+    if isinstance(x, (bytes, bytearray)):
+        return x.isdigit()
+    if isinstance(x, int) and not isinstance(x, bool):
+        return x >= 0
+    return str(x).isdecimal()
+
+def is_hex(x):
+    '''
+    return True if x contains only hexadecimal characters.
+    As with Constants().HEX_DIGITS.issuperset(x), an empty x is True.
+    x may be str, bytes, bytearray, or an iterable of characters.
+    '''
+    if isinstance(x, str):
+        if not x.isascii():
+            return False
+        return not x.encode('ascii').translate(None, _HEX_BYTES)
+    if isinstance(x, (bytes, bytearray)):
+        return not x.translate(None, _HEX_BYTES)
+    return _HEX_DIGITS.issuperset(x)
+
+def all_digits(values):
+    '''
+    return True if every element of list values is a non-empty str
+    containing only decimal digits.  False means at least one is not.
+    '''
+    if '' in values:
+        return False
+    try:
+        return ''.join(values).isdecimal()
+    except TypeError:
+        return False
+
+def all_hex(values):
+    '''
+    return True if every element of list values is a str containing
+    only hexadecimal characters.  False means at least one is not.
+    '''
+    try:
+        return is_hex(''.join(values))
+    except TypeError:
+        return False
+
+def is_power(x, b):
+    '''
+    return True if x is a power of b (including b**0 == 1)
+
+    Exact for int x and b.  Other numeric types fall back to the
+    floating-point test historically used by VerifyTypes().is_power()
+
+    Examples:
+        is_power(8,2)  # True
+        is_power(7,2)  # False
+    '''
+    if not isinstance(x, int) or not isinstance(b, int):
+        if b == 1:
+            return x == 1
+        return b**int(math.log(x, b)+.5) == x
+    if b == 1:
+        return x == 1
+    if x < 1 or b < 2:
+        return False
+    if b & (b - 1) == 0:
+        # b is 2**n.  x must be 2**m, with m a multiple of n
+        if x & (x - 1):
+            return False
+        return (x.bit_length() - 1) % (b.bit_length() - 1) == 0
+    return b**int_log(x, b) == x
+
+def int_log(x, b):
+    '''
+    return the largest integer k such that b**k <= x, for int x >= 1
+    and int b >= 2.  Exact for arbitrarily large x.
+    '''
+    if x < 1 or b < 2:
+        raise ValueError(f"int_log() expects x >= 1 and b >= 2. Got x {x}, b {b}")
+    powers = [b]
+    while powers[-1] <= x // powers[-1]:
+        powers.append(powers[-1] * powers[-1])
+    k = 0
+    for i in range(len(powers) - 1, -1, -1):
+        if x >= powers[i]:
+            x //= powers[i]
+            k += 1 << i
+    return k
@@ -0,0 +1,313 @@
+'''
+prefix_index.py
+Summary: Longest-prefix-match index of ipv4 or ipv6 networks
+
+Description:
+
+   PrefixIndex is a path-compressed binary (Patricia) trie keyed on
+   networks packed into integers.  Insert, delete, exact-match and
+   longest-prefix-match lookups all walk at most one node per bit of
+   prefix length, and usually far fewer, since chains of single-child
+   nodes are compressed into one node.
+
+   Each network can carry a value e.g. a VRF name, vlan, or interface.
+
+   Prefixes are strings of the form A.B.C.D/M (ipv4) or X:X::X/M (ipv6).
+   Host bits, if present, are ignored e.g. 10.1.1.1/24 is stored as
+   10.1.1.0/24.  Addresses are strings without a prefix length.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.prefix_index import PrefixIndex
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   index = PrefixIndex(log, 4)
+   index.load([('10.0.0.0/8', 'default'), ('10.1.0.0/16', 'TENANT_1')])
+   index.insert('10.1.1.0/24', 'TENANT_2')
+   index.lookup('10.1.1.5')    # ('10.1.1.0/24', 'TENANT_2')
+   index.lookup('10.1.2.5')    # ('10.1.0.0/16', 'TENANT_1')
+   index.lookup('11.1.1.1')    # None
+   index.lookup_many(['10.1.1.5', '10.9.9.9'])
+   index.delete('10.1.1.0/24')
+'''
+import ipaddress
+from general_python.general import ipv4
+
+OUR_VERSION = 100
+
+# Node.value for glue nodes, which exist only to hold two children
+_EMPTY = object()
+
+class _Node(object):
+    __slots__ = ('key', 'length', 'value', 'prefix', 'children')
+    def __init__(self, key, length, value, prefix):
+        self.key = key
+        self.length = length
+        self.value = value
+        self.prefix = prefix
+        self.children = [None, None]
+
+class PrefixIndex(object):
+    '''
+    Longest-prefix-match index.  See module docstring.
+
+    log    - logging instance, mandatory
+    family - 4 or 6.  Default 4
+    '''
+    def __init__(self, log, family=4):
+        self.lib_name = "PrefixIndex"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        if family == 4:
+            self.width = 32
+        elif family == 6:
+            self.width = 128
+        else:
+            self.log.error(f"Exiting. Expected 4 or 6 for family. Got {family}")
+            exit(1)
+        self.family = family
+        self._root = None
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, prefix):
+        return self.get(prefix, _EMPTY) is not _EMPTY
+
+    def __iter__(self):
+        return self.items()
+
+    # parsing
+
+    def _address_to_int(self, x):
+        '''return address string x as an int, or None if invalid'''
+        if not isinstance(x, str):
+            return None
+        if self.family == 4:
+            return ipv4.to_int(x)
+        try:
+            return int(ipaddress.IPv6Address(x))
+        except ValueError:
+            return None
+
+    def _int_to_address(self, x):
+        if self.family == 4:
+            return ipv4.to_str(x)
+        return ipaddress.IPv6Address(x).compressed
+
+    def _prefix_to_key(self, x):
+        '''
+        return (key, length) for prefix string x, with host bits of key
+        cleared.  return (None, None) if x is invalid.
+        '''
+        if not isinstance(x, str) or x.count('/') != 1:
+            return None, None
+        address, length = x.split('/')
+        address = self._address_to_int(address)
+        if address is None or not (length.isascii() and length.isdigit()):
+            return None, None
+        length = int(length)
+        if length > self.width:
+            return None, None
+        return address & self._mask(length), length
+
+    def _mask(self, length):
+        return ((1 << length) - 1) << (self.width - length)
+
+    def _bit(self, key, index):
+        '''return bit index of key, counting from 0 at the most-significant bit'''
+        return (key >> (self.width - 1 - index)) & 1
+
+    def _common_length(self, key1, length1, key2, length2):
+        '''return the number of leading bits key1 and key2 share, up to the shorter length'''
+        length = min(length1, length2)
+        difference = key1 ^ key2
+        if difference == 0:
+            return length
+        return min(length, self.width - difference.bit_length())
+
+    # updates
+
+    def insert(self, prefix, value=None):
+        '''
+        add prefix, with value, to the index.  If prefix is already
+        present, its value is replaced.
+        return True if successful, else False.
+        '''
+        key, length = self._prefix_to_key(prefix)
+        if key is None:
+            self.log.error(f"Not a valid ipv{self.family} prefix: {prefix}")
+            return False
+        canonical = f"{self._int_to_address(key)}/{length}"
+        if self._root is None:
+            self._root = _Node(key, length, value, canonical)
+            self._count += 1
+            return True
+        parent = None
+        node = self._root
+        while True:
+            common = self._common_length(node.key, node.length, key, length)
+            if common < node.length:
+                # prefix diverges from, or is a parent of, node
+                if common == length:
+                    new = _Node(key, length, value, canonical)
+                else:
+                    new = _Node(key & self._mask(common), common, _EMPTY, None)
+                    new.children[self._bit(key, common)] = _Node(key, length, value, canonical)
+                new.children[self._bit(node.key, common)] = node
+                self._replace(parent, node, new)
+                self._count += 1
+                return True
+            if node.length == length:
+                if node.value is _EMPTY:
+                    self._count += 1
+                    node.prefix = canonical
+                node.value = value
+                return True
+            bit = self._bit(key, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(key, length, value, canonical)
+                self._count += 1
+                return True
+            parent = node
+            node = child
+
+    def load(self, prefixes):
+        '''
+        bulk-insert prefixes, an iterable of prefix strings or of
+        (prefix, value) tuples.  return the number of prefixes inserted.
+        '''
+        count = 0
+        for item in prefixes:
+            if isinstance(item, tuple):
+                if self.insert(item[0], item[1]):
+                    count += 1
+            elif self.insert(item):
+                count += 1
+        return count
+
+    def delete(self, prefix):
+        '''
+        remove prefix from the index.
+        return True if prefix was present, else False.
+        '''
+        key, length = self._prefix_to_key(prefix)
+        if key is None:
+            return False
+        grandparent = None
+        parent = None
+        node = self._root
+        while node is not None:
+            if node.length > length or self._common_length(node.key, node.length, key, length) < node.length:
+                return False
+            if node.length == length:
+                break
+            grandparent = parent
+            parent = node
+            node = node.children[self._bit(key, node.length)]
+        if node is None or node.value is _EMPTY:
+            return False
+        node.value = _EMPTY
+        node.prefix = None
+        self._count -= 1
+        children = [child for child in node.children if child is not None]
+        if len(children) == 2:
+            # keep as a glue node
+            return True
+        if len(children) == 1:
+            self._replace(parent, node, children[0])
+            return True
+        self._replace(parent, node, None)
+        if parent is not None and parent.value is _EMPTY:
+            # parent was glue, and now has only one child
+            sibling = parent.children[0] or parent.children[1]
+            self._replace(grandparent, parent, sibling)
+        return True
+
+    def _replace(self, parent, old, new):
+        if parent is None:
+            self._root = new
+        elif parent.children[0] is old:
+            parent.children[0] = new
+        else:
+            parent.children[1] = new
+
+    def clear(self):
+        self._root = None
+        self._count = 0
+
+    # queries
+
+    def get(self, prefix, default=None):
+        '''return the value of exactly prefix, else default'''
+        key, length = self._prefix_to_key(prefix)
+        if key is None:
+            return default
+        node = self._root
+        while node is not None:
+            if node.length > length or self._common_length(node.key, node.length, key, length) < node.length:
+                return default
+            if node.length == length:
+                if node.value is _EMPTY:
+                    return default
+                return node.value
+            node = node.children[self._bit(key, node.length)]
+        return default
+
+    def _lookup_int(self, address):
+        width = self.width
+        best = None
+        node = self._root
+        while node is not None:
+            if (address ^ node.key) >> (width - node.length):
+                break
+            if node.value is not _EMPTY:
+                best = node
+            if node.length == width:
+                break
+            node = node.children[(address >> (width - 1 - node.length)) & 1]
+        if best is None:
+            return None
+        return best.prefix, best.value
+
+    def lookup(self, address):
+        '''
+        return (prefix, value) for the longest prefix containing address,
+        or None if no prefix contains address, or address is invalid.
+        '''
+        address_int = self._address_to_int(address)
+        if address_int is None:
+            self.log.debug(f"Not a valid ipv{self.family} address: {address}")
+            return None
+        return self._lookup_int(address_int)
+
+    def lookup_many(self, addresses):
+        '''
+        return a list containing lookup(address) for each address in
+        iterable addresses.  Invalid addresses return None and are not logged.
+        '''
+        to_int = self._address_to_int
+        lookup = self._lookup_int
+        results = list()
+        append = results.append
+        for address in addresses:
+            address_int = to_int(address)
+            if address_int is None:
+                append(None)
+            else:
+                append(lookup(address_int))
+        return results
+
+    def items(self):
+        '''generator yielding (prefix, value) in address order'''
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.value is not _EMPTY:
+                yield node.prefix, node.value
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
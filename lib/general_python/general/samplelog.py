@@ -0,0 +1,225 @@
+'''
+samplelog.py
+Summary: Append-only binary log of every Timer sample, and a columnar reader
+
+Description:
+
+   util.Timer keeps statistics and the last qlen samples.  A SampleLog
+   given to a Timer (or to a TimerRegistry, for all of its Timers) also
+   receives every sample, and appends it to a file as a fixed 24 byte
+   record:
+
+      start_ns     int64   time.perf_counter_ns() at the start of the sample
+      duration_ns  int64   the sample
+      name_id      uint32  index of the Timer's name in the names file
+      reserved     uint32  0
+
+   little-endian, after a 32 byte header:
+
+      magic        8 bytes b'GPSAMPLE'
+      version      uint32
+      record size  uint32
+      epoch_ns     int64   time.time_ns() when the file was created
+      perf_ns      int64   time.perf_counter_ns() when the file was created
+
+   so a sample's wall-clock start is epoch_ns + (start_ns - perf_ns).
+   perf_counter is system-wide on Linux, so several runs (processes) may
+   append to the same file, at the same time or one after another.
+
+   Timer names are kept in path + '.names', one per line.  A name's id
+   is its line number, from 0.  A new name is given its id while
+   holding an exclusive lock (fcntl.flock()) on the names file, after
+   re-reading it, so processes sharing the file agree on ids.  Each
+   batch of records is likewise written under a lock on the file, so
+   batches from different processes don't interleave.
+
+   Records are buffered (buffer_records at a time) and written with one
+   write().  The buffer is written by flush(), close(), and at exit.  A
+   truncated last record (e.g. after a crash) is ignored by the reader.
+
+   read_samples() memory-maps the file.  With numpy, its columns are
+   numpy arrays backed by the map, so no samples are copied or parsed.
+   Without numpy, they are array.array('q') columns.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.samplelog import SampleLog, read_samples
+   from general_python.general.timers import TimerRegistry
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   sample_log = SampleLog(log, '/tmp/my_script.samples')
+   timers = TimerRegistry(log, sample_log=sample_log)
+   for dut in duts:
+       with timers('converge'):
+           converge(dut)
+   sample_log.close()
+
+   samples = read_samples('/tmp/my_script.samples')
+   converge = samples.names.index('converge')
+   durations = samples.duration_ns[samples.name_id == converge]   # numpy
+'''
+import atexit
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+try:
+    import numpy as np # read_samples()
+except ImportError:
+    np = None
+
+OUR_VERSION = 101
+
+SAMPLE_MAGIC = b'GPSAMPLE'
+SAMPLE_VERSION = 1
+SAMPLE_HEADER = struct.Struct('<8sIIqq')
+SAMPLE_RECORD = struct.Struct('<qqII')
+
+# columns are numpy arrays, or array.array('q'), indexed by sample
+Samples = namedtuple('Samples', ['names', 'name_id', 'start_ns', 'duration_ns', 'epoch_ns', 'perf_ns'])
+
+class SampleLog(object):
+    '''
+    Append-only binary log of Timer samples.  See module docstring.
+
+    log            - logging instance, mandatory
+    path           - file to append to, created if needed
+    buffer_records - samples buffered between writes.  Default 8192
+    '''
+    def __init__(self, log, path, buffer_records=8192):
+        self.lib_name = "SampleLog"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        self.path = path
+        self.names_path = path + '.names'
+        self.buffer_records = buffer_records
+        self._lock = threading.Lock()
+        self._buffer = list()
+        self._name_ids = dict()
+        self._fd = open(path, 'ab')
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd.fileno()).st_size == 0:
+                self._fd.write(SAMPLE_HEADER.pack(SAMPLE_MAGIC, SAMPLE_VERSION, SAMPLE_RECORD.size, time.time_ns(), time.perf_counter_ns()))
+                self._fd.flush()
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._check_header()
+        atexit.register(self.close)
+
+    def _check_header(self):
+        with open(self.path, 'rb') as fd:
+            header = fd.read(SAMPLE_HEADER.size)
+        if len(header) < SAMPLE_HEADER.size:
+            self.log.error(f"Exiting. {self.path} is not a sample log")
+            exit(1)
+        magic, version, record_size, _, _ = SAMPLE_HEADER.unpack(header)
+        if magic != SAMPLE_MAGIC or version != SAMPLE_VERSION or record_size != SAMPLE_RECORD.size:
+            self.log.error(f"Exiting. {self.path} is not a version {SAMPLE_VERSION} sample log")
+            exit(1)
+
+    def name_id(self, name):
+        '''return the id of name, adding it to the names file if new'''
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            if '\n' in name:
+                self.log.error(f"Exiting. Timer names in a sample log cannot contain newlines. Got {name!r}")
+                exit(1)
+            with self._lock:
+                name_id = self._name_ids.get(name)
+                if name_id is None:
+                    name_id = self._add_name(name)
+        return name_id
+
+    def _add_name(self, name):
+        '''
+        return the id of name, from the names file, appending it if it
+        isn't there.  Caller holds self._lock
+        '''
+        with open(self.names_path, 'a+') as fd:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # other processes may have added names since we last looked
+            fd.seek(0)
+            self._name_ids = dict()
+            for name_id, known in enumerate(fd.read().splitlines()):
+                self._name_ids.setdefault(known, name_id)
+            name_id = self._name_ids.get(name)
+            if name_id is None:
+                name_id = len(self._name_ids)
+                # written before any sample which refers to it
+                fd.write(name + '\n')
+                fd.flush()
+                self._name_ids[name] = name_id
+        return name_id
+
+    def append(self, name_id, start_ns, duration_ns):
+        '''append a sample'''
+        record = SAMPLE_RECORD.pack(start_ns, duration_ns, name_id, 0)
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.buffer_records:
+                self._write()
+
+    def _write(self):
+        # caller holds self._lock
+        if self._buffer and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._fd.write(b''.join(self._buffer))
+                self._fd.flush()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._buffer = list()
+
+    def flush(self):
+        '''write the buffered samples'''
+        with self._lock:
+            self._write()
+
+    def close(self):
+        '''write the buffered samples and close the file.  Later samples are discarded'''
+        with self._lock:
+            self._write()
+            if self._fd is not None:
+                self._fd.close()
+                self._fd = None
+
+def read_samples(path):
+    '''
+    return Samples(names, name_id, start_ns, duration_ns, epoch_ns, perf_ns)
+    for the sample log at path.  See module docstring.
+    '''
+    try:
+        with open(path + '.names') as fd:
+            names = fd.read().splitlines()
+    except FileNotFoundError:
+        names = list()
+    with open(path, 'rb') as fd:
+        header = fd.read(SAMPLE_HEADER.size)
+        if len(header) < SAMPLE_HEADER.size:
+            raise ValueError('{} is not a sample log'.format(path))
+        magic, version, record_size, epoch_ns, perf_ns = SAMPLE_HEADER.unpack(header)
+        if magic != SAMPLE_MAGIC or version != SAMPLE_VERSION or record_size != SAMPLE_RECORD.size:
+            raise ValueError('{} is not a version {} sample log'.format(path, SAMPLE_VERSION))
+        count = (os.fstat(fd.fileno()).st_size - SAMPLE_HEADER.size) // SAMPLE_RECORD.size
+        if np is not None:
+            dtype = np.dtype([('start_ns', '<i8'), ('duration_ns', '<i8'), ('name_id', '<u4'), ('reserved', '<u4')])
+            if count == 0:
+                records = np.zeros(0, dtype=dtype)
+            else:
+                records = np.memmap(fd, dtype=dtype, mode='r', offset=SAMPLE_HEADER.size, shape=(count,))
+            return Samples(names, records['name_id'], records['start_ns'], records['duration_ns'], epoch_ns, perf_ns)
+        # each record is three int64: start_ns, duration_ns, and name_id | reserved << 32 (== name_id)
+        values = array('q')
+        if count:
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                values.frombytes(data[SAMPLE_HEADER.size:SAMPLE_HEADER.size + count * SAMPLE_RECORD.size])
+            if sys.byteorder == 'big':
+                values.byteswap()
+        return Samples(names, values[2::3], values[0::3], values[1::3], epoch_ns, perf_ns)
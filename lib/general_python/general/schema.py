@@ -0,0 +1,263 @@
+'''
+schema.py
+Summary: Declarative record validation compiled from VerifyTypes predicates
+
+Description:
+
+   A schema is a dict mapping field names to one of:
+
+   - the name of a VerifyTypes method e.g. 'is_ipv4_address'
+   - any callable taking one argument and returning True/False
+   - a nested schema (dict)
+   - ListOf(x), where x is any of the above, for a list whose
+     elements must all match x
+   - Optional(x), where x is any of the above, for a field which
+     may be absent
+
+   Fields are required unless wrapped in Optional().
+
+   Schema() compiles the schema once into a single Python function
+   in which every predicate is already resolved, so validating a
+   record does at most one call per field, with no attribute lookups.
+   Predicates which are a simple isinstance() check (is_int, is_dict,
+   etc) are inlined.  Address predicates (is_ipv4_address,
+   is_ipv4_unicast_address, is_mac_address) first try a precompiled
+   regex fullmatch() equivalent to the predicate for str values, a
+   single C call.  The predicate itself is called only if that fails, so
+   failures are logged and counted in reason_counts as usual.
+
+   validate() returns a list of all violations in the record, as
+   (path, reason) tuples, where path is e.g. 'meta.duts[2].ip' and
+   reason is either the name of the predicate which failed, 'missing'
+   for a missing required field, or 'unexpected' for a field which
+   is not in the schema (strict=True only).  An empty list means the
+   record is valid.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.schema import Schema, ListOf, Optional
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   schema = Schema(log, {
+       'run_id': 'is_int',
+       'tg': 'is_ipv4_unicast_address',
+       'meta': {
+           'underlay': lambda x: x in ['ipv4', 'ipv6'],
+           'vpc_sids': Optional(ListOf('is_int'))
+       }
+   })
+   for record in records:
+       for path, reason in schema.validate(record):
+           log.error(f"run {record.get('run_id')} {path} failed {reason}")
+'''
+import builtins # inlined isinstance() types
+import re
+from general_python.general import ipv4
+from general_python.general import mac
+from general_python.general.verify_types import VerifyTypes
+
+OUR_VERSION = 100
+
+class Optional(object):
+    '''mark a schema field as optional'''
+    def __init__(self, spec):
+        self.spec = spec
+
+class ListOf(object):
+    '''schema field which is a list whose elements all match spec'''
+    def __init__(self, spec):
+        self.spec = spec
+
+_MISSING = object()
+
+# VerifyTypes predicates which are a single isinstance() check, and are
+# inlined into the generated code rather than called.
+_INLINE = {
+    'is_boolean': 'bool',
+    'is_dict': 'dict',
+    'is_float': 'float',
+    'is_int': 'int',
+    'is_list': 'list',
+    'is_tuple': 'tuple'
+}
+
+# VerifyTypes predicates which, for str values, pass exactly when the
+# regex matches in full.  The same patterns verify whole columns in the
+# VerifyTypes *_many() methods.
+_FULLMATCH = {
+    'is_ipv4_address': re.compile(ipv4.ADDRESS_PATTERN).fullmatch,
+    'is_ipv4_unicast_address': re.compile(ipv4.UNICAST_PATTERN).fullmatch,
+    'is_mac_address': re.compile(mac.ADDRESS_PATTERN).fullmatch
+}
+
+class Schema(object):
+    '''
+    Compile spec (see module docstring) into self.validate()
+
+    log    - logging instance, mandatory
+    spec   - the schema, a dict
+    verify - VerifyTypes instance whose methods are used for string
+             predicates.  Optional.  If not provided, one is created.
+    strict - If True, fields not in spec are reported as 'unexpected'.
+             Default False.
+
+    self.source contains the generated validation function, for debugging.
+    '''
+    def __init__(self, log, spec, verify=None, strict=False):
+        self.lib_name = "Schema"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        if verify is None:
+            verify = VerifyTypes(self.log)
+        self.verify = verify
+        self.strict = strict
+        # Everything the generated code references is bound as a
+        # default argument, so it's a local (rather than global or
+        # builtin) lookup inside the generated function.
+        self._namespace = {'_MISSING': _MISSING, 'isinstance': isinstance, 'enumerate': enumerate, 'str': str}
+        for name in _INLINE.values():
+            self._namespace[name] = getattr(builtins, name)
+        self._lines = list()
+        self._var_count = 0
+        if not isinstance(spec, dict):
+            self.log.error(f"Exiting. Expected dict() for schema. Got {spec}")
+            exit(1)
+        self._emit(2, "errors = []")
+        self._emit(2, "append = errors.append")
+        self._emit(2, "if not isinstance(record, dict):")
+        self._emit(3, "append(('', 'is_dict'))")
+        self._emit(3, "return errors")
+        self._compile_dict(2, spec, 'record', ('', ()))
+        self._emit(2, "return errors")
+        defaults = ', '.join(f"{name}={name}" for name in self._namespace)
+        self._lines.insert(0, f"def validate(record, *, {defaults}):")
+        self.source = "\n".join(self._lines)
+        exec(self.source, self._namespace)
+        self.validate = self._namespace['validate']
+
+    def is_valid(self, record):
+        '''return True if record has no violations'''
+        return not self.validate(record)
+
+    def _emit(self, indent, line):
+        self._lines.append("    " * (indent - 1) + line)
+
+    def _new_name(self, prefix):
+        self._var_count += 1
+        return f"{prefix}{self._var_count}"
+
+    def _builtin(self, spec, table):
+        '''
+        return True if spec names a VerifyTypes predicate which is in
+        table (_INLINE or _FULLMATCH) and is not overridden by a subclass
+        '''
+        if not isinstance(spec, str) or spec not in table:
+            return False
+        return getattr(type(self.verify), spec, None) is getattr(VerifyTypes, spec)
+
+    def _predicate(self, spec):
+        '''
+        return (namespace name, reason) for a string or callable spec
+        '''
+        if isinstance(spec, str):
+            if not spec.startswith('is_') or not callable(getattr(self.verify, spec, None)):
+                self.log.error(f"Exiting. Unknown VerifyTypes predicate in schema: {spec}")
+                exit(1)
+            function = getattr(self.verify, spec)
+            reason = spec
+        elif callable(spec):
+            function = spec
+            reason = getattr(spec, '__name__', 'predicate')
+        else:
+            self.log.error(f"Exiting. Unexpected schema value: {spec}")
+            exit(1)
+        name = self._new_name('p')
+        self._namespace[name] = function
+        return name, reason
+
+    # A path is a tuple (template, index_names).  template is a
+    # str.format() template with one {} per list index, and index_names
+    # are the generated loop variables which fill them in.
+
+    @staticmethod
+    def _join(path, key):
+        '''return path extended by dict key'''
+        template, index_names = path
+        key = key.replace('{', '{{').replace('}', '}}')
+        if template == '':
+            return (key, index_names)
+        return (f"{template}.{key}", index_names)
+
+    @staticmethod
+    def _path_expr(path):
+        '''return a python expression which evaluates to path as a str'''
+        template, index_names = path
+        if not index_names:
+            return repr(template.format())
+        return f"{template!r}.format({', '.join(index_names)})"
+
+    def _compile_dict(self, indent, spec, var, path):
+        for key in spec:
+            if not isinstance(key, str):
+                self.log.error(f"Exiting. Schema keys must be str(). Got {key}")
+                exit(1)
+        if self.strict:
+            keys = self._new_name('k')
+            self._namespace[keys] = frozenset(spec)
+            self._emit(indent, f"if not {keys}.issuperset({var}):")
+            extra = self._new_name('x')
+            self._emit(indent + 1, f"for {extra} in {var}:")
+            self._emit(indent + 2, f"if {extra} not in {keys}:")
+            if path[0] == '':
+                self._emit(indent + 3, f"append((str({extra}), 'unexpected'))")
+            else:
+                self._emit(indent + 3, f"append(({self._path_expr(path)} + '.' + str({extra}), 'unexpected'))")
+        for key, value in spec.items():
+            field_path = self._join(path, key)
+            optional = isinstance(value, Optional)
+            if optional:
+                value = value.spec
+            value_var = self._new_name('v')
+            self._emit(indent, f"{value_var} = {var}.get({key!r}, _MISSING)")
+            if optional:
+                self._emit(indent, f"if {value_var} is not _MISSING:")
+            else:
+                self._emit(indent, f"if {value_var} is _MISSING:")
+                self._emit(indent + 1, f"append(({self._path_expr(field_path)}, 'missing'))")
+                self._emit(indent, "else:")
+            self._compile_value(indent + 1, value, value_var, field_path)
+
+    def _compile_value(self, indent, spec, var, path):
+        path_expr = self._path_expr(path)
+        if isinstance(spec, Optional):
+            self.log.error(f"Exiting. Optional() is only valid for dict fields. Got {spec.spec}")
+            exit(1)
+        if isinstance(spec, dict):
+            self._emit(indent, f"if not isinstance({var}, dict):")
+            self._emit(indent + 1, f"append(({path_expr}, 'is_dict'))")
+            self._emit(indent, "else:")
+            self._compile_dict(indent + 1, spec, var, path)
+            return
+        if isinstance(spec, ListOf):
+            self._emit(indent, f"if not isinstance({var}, list):")
+            self._emit(indent + 1, f"append(({path_expr}, 'is_list'))")
+            self._emit(indent, "else:")
+            index = self._new_name('i')
+            item = self._new_name('e')
+            self._emit(indent + 1, f"for {index}, {item} in enumerate({var}):")
+            item_path = (path[0] + '[{}]', path[1] + (index,))
+            self._compile_value(indent + 2, spec.spec, item, item_path)
+            return
+        if self._builtin(spec, _INLINE):
+            self._emit(indent, f"if not isinstance({var}, {_INLINE[spec]}):")
+            self._emit(indent + 1, f"append(({path_expr}, {spec!r}))")
+            return
+        name, reason = self._predicate(spec)
+        if self._builtin(spec, _FULLMATCH):
+            match = self._new_name('m')
+            self._namespace[match] = _FULLMATCH[spec]
+            self._emit(indent, f"if not (isinstance({var}, str) and {match}({var})) and not {name}({var}):")
+        else:
+            self._emit(indent, f"if not {name}({var}):")
+        self._emit(indent + 1, f"append(({path_expr}, {reason!r}))")
@@ -0,0 +1,117 @@
+'''
+sequence.py
+Summary: Element type checks for sequences, with O(1) paths for typed containers
+
+Description:
+
+   first_not_of(x, t) returns the index of the first element of sequence
+   x which is not an instance of t (a type or tuple of types), or -1 if
+   every element is.
+
+   For containers whose element type is fixed by the container itself,
+   the answer comes from the container's type, in O(1):
+
+      range                 int
+      bytes, bytearray      int
+      array.array           int or float, per typecode
+      memoryview            int or float, per format
+      numpy.ndarray (or     int, float, bool, per dtype.kind
+      anything with dtype)
+
+   Other sequences (list, tuple, etc) are processed in chunks of CHUNK
+   elements.  Each chunk is checked in C with all(map(isinstance, ...)),
+   which stops at the first bad element, so per-element Python work
+   happens only within a chunk that actually contains a bad element.
+   Lists and tuples are chunked by index, without copying.
+
+   numpy is not required.  ndarray is recognized by its dtype attribute.
+
+Synopsis:
+
+   from array import array
+   from general_python.general.sequence import first_not_of
+
+   first_not_of(array('i', range(1000000)), int)    # -1, in O(1)
+   first_not_of([1, 2, 'x', 4], int)                # 2
+'''
+from array import array
+from itertools import islice, repeat
+
+OUR_VERSION = 100
+
+CHUNK = 4096
+
+_ARRAY_TYPES = {
+    'b': int, 'B': int, 'h': int, 'H': int, 'i': int, 'I': int,
+    'l': int, 'L': int, 'q': int, 'Q': int,
+    'f': float, 'd': float,
+    'u': str, 'w': str
+}
+_MEMORYVIEW_TYPES = {
+    'b': int, 'B': int, 'h': int, 'H': int, 'i': int, 'I': int,
+    'l': int, 'L': int, 'q': int, 'Q': int, 'n': int, 'N': int,
+    'e': float, 'f': float, 'd': float,
+    '?': bool
+}
+# numpy dtype.kind
+_DTYPE_KINDS = {'i': int, 'u': int, 'f': float, 'b': bool, 'U': str}
+
+def element_type(x):
+    '''
+    return the element type implied by the type of container x, or
+    None if x's elements can be of any type
+    '''
+    if isinstance(x, range):
+        return int
+    if isinstance(x, (bytes, bytearray)):
+        return int
+    if isinstance(x, array):
+        return _ARRAY_TYPES.get(x.typecode)
+    if isinstance(x, memoryview):
+        if x.ndim != 1:
+            return None
+        return _MEMORYVIEW_TYPES.get(x.format.lstrip('@=<>!'))
+    dtype = getattr(x, 'dtype', None)
+    kind = getattr(dtype, 'kind', None)
+    if kind is not None and getattr(x, 'ndim', None) == 1:
+        return _DTYPE_KINDS.get(kind)
+    return None
+
+def is_sequence(x):
+    '''
+    return True if x is a sequence that first_not_of() handles without
+    consuming it i.e. not a str, iterator, dict, or set
+    '''
+    if isinstance(x, (list, tuple, range, bytes, bytearray, array, memoryview)):
+        return True
+    return getattr(x, 'ndim', None) == 1 and hasattr(x, 'dtype')
+
+def _first_in_chunk(chunk, t, offset):
+    for index, element in enumerate(chunk):
+        if not isinstance(element, t):
+            return offset + index
+    return -1
+
+def first_not_of(x, t):
+    '''
+    return the index of the first element in sequence x which is not
+    an instance of t, or -1 if all elements are instances of t.
+    t is a type or a tuple of types, as with isinstance().
+    '''
+    known = element_type(x)
+    if known is not None:
+        if len(x) == 0 or issubclass(known, t):
+            return -1
+        return 0
+    iterator = iter(x)
+    if isinstance(x, (list, tuple)):
+        for start in range(0, len(x), CHUNK):
+            if not all(map(isinstance, islice(iterator, CHUNK), repeat(t))):
+                return _first_in_chunk(x[start:start + CHUNK], t, start)
+        return -1
+    offset = 0
+    for chunk in iter(lambda: list(islice(iterator, CHUNK)), []):
+        if not all(map(isinstance, chunk, repeat(t))):
+            return _first_in_chunk(chunk, t, offset)
+        offset += len(chunk)
+    return -1
@@ -0,0 +1,205 @@
+'''
+timers.py
+Summary: Process-wide registry of named Timers, with JSON and Prometheus exporters
+
+Description:
+
+   get_timers() returns the process's TimerRegistry, which holds one
+   util.Timer per name.  get_timers() creates the registry in concurrent
+   mode (a TimerRegistry created directly is not, by default), so a name
+   can be timed by several threads or asyncio tasks at once.  Calling
+   the registry with a name returns that name's Timer (created on first
+   use), which can be used as a context manager or as a decorator.
+
+   snapshot() returns every timer's statistics (count, total, last, avg,
+   min, max, p50, p90, p99, in seconds) as a dict.  write_json() and
+   write_prometheus() write a snapshot to a directory, replacing the
+   previous one atomically.  start_exporter() does both every interval
+   seconds in a background thread, and once more at exit.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.timers import get_timers
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   timers = get_timers(log)
+
+   with timers('arp_resolve'):
+       resolve_arp(dut)
+
+   @timers('bgp_converge')
+   def bgp_converge(dut):
+       ...
+
+   timers.start_exporter('/tmp/my_script_metrics', interval=10)
+   # /tmp/my_script_metrics/timers.json
+   # /tmp/my_script_metrics/timers.prom  (Prometheus text format e.g. for node_exporter's textfile collector)
+
+   print(timers('arp_resolve').p99)
+   print(timers.snapshot())
+'''
+import atexit
+import json
+import os
+import threading
+from general_python.general.util import Timer
+
+OUR_VERSION = 103
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_timers(log, concurrent=True):
+    '''
+    return the process-wide TimerRegistry, creating it (with log and
+    concurrent) on first call
+    '''
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TimerRegistry(log, concurrent=concurrent)
+    return _registry
+
+def _escape_label(x):
+    return x.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class TimerRegistry(object):
+    '''
+    Named Timers.  See module docstring.
+
+    log    - logging instance, mandatory
+    qlen   - rolling-average length of each Timer.  Default 10
+    prefix - basename of exported files, and Prometheus metric name prefix.
+             Default 'timers'
+    concurrent - create Timers in concurrent mode, so that the same name
+             can be timed from several threads or asyncio tasks at once.
+             Default False.  See util.Timer
+    sample_log - optional SampleLog (see samplelog.py).  Every sample of
+             every Timer is also appended to it.  Default None
+    '''
+    def __init__(self, log, qlen=10, prefix='timers', concurrent=False, sample_log=None):
+        self.lib_name = "TimerRegistry"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        self.qlen = qlen
+        self.prefix = prefix
+        self.concurrent = concurrent
+        self.sample_log = sample_log
+        self._timers = dict()
+        self._lock = threading.Lock()
+        self._exporter = None
+        self._stop = threading.Event()
+
+    def __call__(self, name):
+        '''return the Timer for name, creating it if needed'''
+        timer = self._timers.get(name)
+        if timer is None:
+            with self._lock:
+                timer = self._timers.get(name)
+                if timer is None:
+                    timer = Timer(self.log, self.qlen, concurrent=self.concurrent, name=name, sample_log=self.sample_log)
+                    self._timers[name] = timer
+        return timer
+
+    def __contains__(self, name):
+        return name in self._timers
+
+    def __len__(self):
+        return len(self._timers)
+
+    def names(self):
+        return sorted(self._timers)
+
+    def remove(self, name):
+        with self._lock:
+            self._timers.pop(name, None)
+
+    def clear(self):
+        '''clear every timer's statistics.  The timers remain registered'''
+        for timer in list(self._timers.values()):
+            timer.clear()
+
+    def snapshot(self):
+        '''return {name: Timer().snapshot()} for every timer'''
+        return {name: timer.snapshot() for name, timer in sorted(self._timers.items())}
+
+    # exporters
+
+    def _write(self, path, text):
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as fd:
+            fd.write(text)
+        os.replace(temporary, path)
+
+    def write_json(self, directory, snapshot=None):
+        '''write snapshot (default, a new snapshot) to directory/<prefix>.json.  return the path'''
+        if snapshot is None:
+            snapshot = self.snapshot()
+        path = os.path.join(directory, '{}.json'.format(self.prefix))
+        self._write(path, json.dumps(snapshot, indent=4, sort_keys=True) + '\n')
+        return path
+
+    def prometheus_text(self, snapshot=None):
+        '''return snapshot (default, a new snapshot) in Prometheus text exposition format'''
+        if snapshot is None:
+            snapshot = self.snapshot()
+        metric = '{}_seconds'.format(self.prefix)
+        lines = list()
+        lines.append('# HELP {} Duration of named timers'.format(metric))
+        lines.append('# TYPE {} summary'.format(metric))
+        for name, stats in snapshot.items():
+            label = 'name="{}"'.format(_escape_label(name))
+            for quantile, key in (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99')):
+                lines.append('{}{{{},quantile="{}"}} {!r}'.format(metric, label, quantile, stats[key]))
+            lines.append('{}_sum{{{}}} {!r}'.format(metric, label, stats['total']))
+            lines.append('{}_count{{{}}} {}'.format(metric, label, stats['count']))
+        for key in ('min', 'max', 'last', 'avg'):
+            gauge = '{}_{}'.format(metric, key)
+            lines.append('# TYPE {} gauge'.format(gauge))
+            for name, stats in snapshot.items():
+                lines.append('{}{{name="{}"}} {!r}'.format(gauge, _escape_label(name), stats[key]))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, directory, snapshot=None):
+        '''write snapshot (default, a new snapshot) to directory/<prefix>.prom.  return the path'''
+        path = os.path.join(directory, '{}.prom'.format(self.prefix))
+        self._write(path, self.prometheus_text(snapshot))
+        return path
+
+    def export(self, directory):
+        '''write one snapshot to directory in both formats'''
+        snapshot = self.snapshot()
+        try:
+            self.write_json(directory, snapshot)
+            self.write_prometheus(directory, snapshot)
+        except OSError as e:
+            self.log.warning(f"Unable to export timers to {directory}: {e}")
+
+    def start_exporter(self, directory, interval=10):
+        '''
+        export() to directory every interval seconds, from a background
+        thread, and once more at exit or stop_exporter()
+        '''
+        if self._exporter is not None:
+            self.log.debug("timer exporter already running")
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._stop.clear()
+        def run():
+            while not self._stop.wait(interval):
+                self.export(directory)
+            self.export(directory)
+        self._exporter = threading.Thread(target=run, name='timer-exporter', daemon=True)
+        self._exporter.start()
+        atexit.register(self.stop_exporter)
+
+    def stop_exporter(self):
+        '''stop the exporter thread, after a final export'''
+        exporter = self._exporter
+        if exporter is None:
+            return
+        self._exporter = None
+        self._stop.set()
+        exporter.join()
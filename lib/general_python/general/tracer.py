@@ -0,0 +1,227 @@
+'''
+tracer.py
+Summary: Nested span tracing, exported in Chrome/Perfetto trace format
+
+Description:
+
+   Tracer records spans, i.e. named, nested, timed regions, e.g. the
+   config push, ARP retries, traffic start and verification within a
+   convergence testcase.  write_chrome() writes them as Chrome trace
+   JSON, which chrome://tracing and https://ui.perfetto.dev display as a
+   timeline per thread, with nested spans stacked.
+
+   Spans are kept in preallocated arrays (start, duration, thread, name)
+   of capacity entries.  Claiming a slot is a single next() on an
+   itertools.count, so recording takes no lock.  A slot is marked
+   written, in a bytearray, after its fields are filled in, and only
+   marked slots are read, so spans being recorded by other threads are
+   never exported half-written.  Once capacity spans are recorded,
+   further spans are counted in self.dropped, not kept.
+
+   sample_rate (0.0 to 1.0) is the fraction of root (outermost) spans
+   traced.  Sampling is decided at the root, so a traced root has all of
+   its nested spans, and an untraced root costs its nested spans only a
+   ContextVar lookup.
+
+   If a TimerRegistry (see timers.py) is given, every span's duration,
+   sampled or not, is also recorded in the Timer of the same name, so
+   percentiles cover all runs while the trace covers a sample.
+
+Synopsis:
+
+   from general_python.general.log import get_logger
+   from general_python.general.timers import get_timers
+   from general_python.general.tracer import Tracer
+
+   log = get_logger('my_script', 'INFO', 'DEBUG')
+   tracer = Tracer(log, sample_rate=0.1, timers=get_timers(log))
+
+   with tracer.span('testcase'):
+       with tracer.span('config_push'):
+           push_config(dut)
+       with tracer.span('verify'):
+           verify(dut)
+
+   @tracer.traced('arp_resolve')
+   def arp_resolve(dut):
+       ...
+
+   tracer.write_chrome('/tmp/my_script.trace.json')
+'''
+import contextvars
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from array import array
+from itertools import count
+from json.encoder import encode_basestring
+
+OUR_VERSION = 101
+
+# ContextVar value while inside a root span: True if the root is traced
+_UNSAMPLED = False
+_SAMPLED = True
+
+class _Span(object):
+    '''context manager for one span.  See Tracer().span()'''
+    __slots__ = ('tracer', 'name', 'start_ns', 'token', 'sampled')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        tracer = self.tracer
+        state = tracer._state.get()
+        if state is None:
+            self.sampled = tracer.sample_rate >= 1.0 or random.random() < tracer.sample_rate
+            self.token = tracer._state.set(self.sampled)
+        else:
+            self.sampled = state
+            self.token = None
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        end_ns = time.perf_counter_ns()
+        tracer = self.tracer
+        if self.token is not None:
+            tracer._state.reset(self.token)
+        if tracer.timers is not None:
+            tracer.timers(self.name).record_ns(end_ns - self.start_ns)
+        if self.sampled:
+            tracer._record(self.name, self.start_ns, end_ns - self.start_ns)
+        return False
+
+class Tracer(object):
+    '''
+    Span tracer.  See module docstring.
+
+    log         - logging instance, mandatory
+    capacity    - maximum number of spans kept.  Default 100000
+    sample_rate - fraction of root spans traced.  Default 1.0
+    timers      - optional TimerRegistry.  Every span is also recorded there
+    '''
+    def __init__(self, log, capacity=100000, sample_rate=1.0, timers=None):
+        self.lib_name = "Tracer"
+        self.lib_version = OUR_VERSION
+        self.log = log
+        if not 0.0 <= sample_rate <= 1.0:
+            self.log.error(f"Exiting. Expected 0.0 <= sample_rate <= 1.0. Got {sample_rate}")
+            exit(1)
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.timers = timers
+        self._starts = array('q', bytes(8 * capacity))
+        self._durations = array('q', bytes(8 * capacity))
+        self._threads = array('Q', bytes(8 * capacity))
+        self._names = array('I', bytes(4 * capacity))
+        self._written = bytearray(capacity)
+        self._name_ids = dict()
+        self._name_list = list()
+        self._name_lock = threading.Lock()
+        self._state = contextvars.ContextVar('tracer_state', default=None)
+        self.clear()
+
+    def clear(self):
+        '''discard all recorded spans'''
+        self._next = count()
+        self._written[:] = bytes(self.capacity)
+        self._origin_ns = time.perf_counter_ns()
+        self.dropped = 0
+
+    def __len__(self):
+        '''number of spans recorded'''
+        return self._written.count(1)
+
+    def _slots(self):
+        '''return the indexes of the written slots, in order'''
+        written = self._written
+        end = written.rfind(1) + 1
+        if written.find(0, 0, end) == -1:
+            return range(end)
+        return [slot for slot in range(end) if written[slot]]
+
+    def _name_id(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            with self._name_lock:
+                name_id = self._name_ids.get(name)
+                if name_id is None:
+                    name_id = len(self._name_list)
+                    self._name_list.append(name)
+                    self._name_ids[name] = name_id
+        return name_id
+
+    def _record(self, name, start_ns, duration_ns):
+        slot = next(self._next)
+        if slot >= self.capacity:
+            self.dropped += 1
+            return
+        self._starts[slot] = start_ns
+        self._durations[slot] = duration_ns
+        self._threads[slot] = threading.get_native_id()
+        self._names[slot] = self._name_id(name)
+        self._written[slot] = 1
+
+    def span(self, name):
+        '''return a context manager which records a span called name'''
+        return _Span(self, name)
+
+    def traced(self, name=None):
+        '''decorator.  Record each call to the function as a span called name (default, the function's name)'''
+        def decorator(function):
+            span_name = name or function.__qualname__
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def traced_async(*args, **kwargs):
+                    with _Span(self, span_name):
+                        return await function(*args, **kwargs)
+                return traced_async
+            @functools.wraps(function)
+            def traced_function(*args, **kwargs):
+                with _Span(self, span_name):
+                    return function(*args, **kwargs)
+            return traced_function
+        return decorator
+
+    def spans(self):
+        '''generator yielding (name, start_ns, duration_ns, thread id) for each recorded span'''
+        for slot in self._slots():
+            yield self._name_list[self._names[slot]], self._starts[slot], self._durations[slot], self._threads[slot]
+
+    def write_chrome(self, path):
+        '''
+        write the recorded spans to path in Chrome trace (JSON object)
+        format, as complete ("X") events with times in microseconds
+        relative to the tracer's creation or clear().  return the number
+        of spans written.
+        '''
+        pid = os.getpid()
+        origin = self._origin_ns
+        # slots first: a slot is written after its name is added, so every
+        # name a written slot refers to is then in self._name_list
+        slots = self._slots()
+        names = [encode_basestring(name) for name in self._name_list]
+        threads = set()
+        with open(path, 'w') as fd:
+            fd.write('{"displayTimeUnit":"ms","traceEvents":[\n')
+            separator = ''
+            for slot in slots:
+                thread = self._threads[slot]
+                threads.add(thread)
+                fd.write('{}{{"name":{},"ph":"X","ts":{:.3f},"dur":{:.3f},"pid":{},"tid":{}}}'.format(
+                    separator, names[self._names[slot]],
+                    (self._starts[slot] - origin) / 1000, self._durations[slot] / 1000, pid, thread))
+                separator = ',\n'
+            for thread in sorted(threads):
+                fd.write('{}{{"name":"thread_name","ph":"M","pid":{},"tid":{},"args":{{"name":"thread {}"}}}}'.format(
+                    separator, pid, thread, thread))
+                separator = ',\n'
+            fd.write('\n]}\n')
+        if self.dropped:
+            self.log.warning(f"Tracer capacity {self.capacity} reached. {self.dropped} spans were not recorded")
+        return len(slots)
@@ -21,9 +21,23 @@ Usage:
    echo.p()    # This will print the last 30 messages from both echo.c and echo.d
                # Normally placed at the end of a script, or as part of an abort handler
 
+Changes:
+
+   144  Timer.q is a read-only view of the last qlen samples, in seconds.
+        It was a deque, which callers could append to or clear.  Use
+        Timer.clear() to discard samples
+   144  Timer.min is 0.0 when there are no samples
+   146  Timer(concurrent=True).  In concurrent mode Timer.q is empty, and
+        Timer.avg is the mean of all samples
+
 """
 import time  # localtime(), strftime()
 from collections import deque
+from collections.abc import Sequence # Timer.q
+import functools # Timer.__call__()
+import threading # Timer() concurrent mode
+import contextvars # Timer() concurrent mode
+import weakref # Timer() concurrent mode
 import pexpect # up()
 import inspect # inspect.stack()
 import json    # read_json()
@@ -33,8 +47,13 @@ import random, string
 import sys
 
 from general_python.general.verify_types import VerifyTypes # Timer()
+from general_python.general.histogram import Histogram # Timer()
+from general_python.general import memprof # Timer()
+
+OUR_VERSION = 150
 
-OUR_VERSION = 142
+# time.time_ns() - time.perf_counter_ns(), for Timer.time_start
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
 
 class ErrorMsg(object):
     '''
@@ -155,10 +174,13 @@ class NxTimer(object):
 class Timer(object):
     '''Timer which tracks last/min/max/avg/total elapsed time between start() and stop() calls
 
-      Takes two arguments:
+      Takes five arguments:
 
       1. log instance - mandatory
       2. the queue length for the last N samples.  Optional. Default is 10 samples.
+      3. concurrent - Optional. Default False.  See Example 5.
+      4. name - Optional. Default None.  See Examples 6 and 7.
+      5. sample_log - Optional. Default None.  See Example 7.
 
       Synopsis:
 
@@ -191,12 +213,96 @@ class Timer(object):
       print("Clearing all timer state and statistics")
       t.clear()
 
+      Example 3: percentiles
+
+      t = Timer(log)
+      for dut in duts:
+          t.start()
+          converge(dut)
+          t.stop()
+      print('p50 {} p90 {} p99 {} over {} samples'.format(t.p50, t.p90, t.p99, t.count))
+      print(t.percentile(99.9))
+
+      Durations are measured with time.perf_counter_ns().  Every sample is
+      recorded in t.histogram, a Histogram (see histogram.py) which gives
+      percentiles to within 1.6%, in fixed memory.  avg is the average of
+      the last qlen samples, maintained incrementally.  t.q is a
+      read-only view of those samples, in seconds (it was a deque, so
+      t.q.append() and t.q.clear() now raise AttributeError).  t.min is
+      0.0 when there are no samples.  t.time_start is the time.time() of
+      the latest start().  Timers can be combined with merge().
+
+      Example 4: context manager and decorator
+
+      t = Timer(log)
+      with t:
+          converge(dut)
+
+      @t
+      def converge(dut):
+          ...
+
+      See also timers.py, for a registry of named timers.
+
+      Example 5: concurrent mode
+
+      Normally a Timer times one interval at a time; start() while running
+      is ignored.  With concurrent=True, any number of intervals, from any
+      number of threads or asyncio tasks, can overlap.  start() returns a
+      token which is passed to stop().  `with t:` and the decorator
+      (including on async functions) also work concurrently.
+
+      t = Timer(log, concurrent=True)
+      def configure(dut):
+          token = t.start()
+          push_config(dut)
+          t.stop(token)
+      threads = [threading.Thread(target=configure, args=(dut,)) for dut in duts]
+      ...
+      print(t.count, t.p99)
+
+      Each thread records into its own shard (histogram and totals),
+      without locks.  Shards are merged when statistics are read.  When
+      a thread exits, its shard is folded into a single aggregate of
+      exited threads, so memory stays bounded with one thread per task.  In
+      concurrent mode, avg is the mean of all samples, running is always
+      False, and q is always empty, since shards don't keep the order of
+      samples.
+
+      Example 6: memory profiling
+
+      When memory profiling is on (see memprof.py), each interval of a
+      named Timer (start()/stop(), `with`, or a decorated call, in either
+      mode) is also a memory profiling region, which reports the
+      interval's peak and net allocation, and its top allocating lines,
+      under the Timer's name.  Timers from a TimerRegistry are named.
+      In concurrent mode, start() then returns a tuple token.
+
+      profiler = get_memprof(log)
+      t = Timer(log, name='parse_results')
+      with t:
+          results = parse(output)
+      profiler.log_report()
+
+      Example 7: keeping every sample
+
+      A Timer given a SampleLog (see samplelog.py) also appends every
+      sample, with its start time and the Timer's name (default 'timer'),
+      to the SampleLog's file, for later analysis with read_samples().
+
+      sample_log = SampleLog(log, '/tmp/my_script.samples')
+      t = Timer(log, name='converge', sample_log=sample_log)
     '''
-    def __init__(self,log, qlen=10):
-        self.lib_name = "Timer"
-        self.lib_version = OUR_VERSION
-        self.log_prefix = '{}_{}'.format(self.lib_name, self.lib_version)
+    lib_name = "Timer"
+    lib_version = OUR_VERSION
+    log_prefix = '{}_{}'.format(lib_name, lib_version)
+
+    def __init__(self,log, qlen=10, concurrent=False, name=None, sample_log=None):
         self.log = log
+        self.name = name
+        self._sample_log = sample_log
+        if sample_log is not None:
+            self._sample_id = sample_log.name_id(name or 'timer')
         self.verify = VerifyTypes(self.log)
 
         if not self.verify.is_int(qlen):
@@ -206,16 +312,30 @@ class Timer(object):
 
         self.qlen         = int(qlen)
         self._running      = False
-        self.time_start   = 0.0
-        # duration between lastest start/stop interval
-        self.time_last    = 0.0
-        self.time_total   = 0.0
-        # total of all time between start/stop intervals
-        self.time_elapsed = 0.0
-        self.time_max     = 0.0
-        self.time_min     = 9999999990.0
-        self.time_avg     = 0.0
-        self.q = deque(maxlen=self.qlen)
+        # samples in ns, and their sum, for the rolling average
+        self._q_ns = deque(maxlen=self.qlen)
+        self._q = _SecondsView(self._q_ns)
+        self._q_sum_ns = 0
+        # (profiler, region) of the running interval, if memory profiling
+        self._region = None
+        # concurrent mode: per-thread shards, and per-context tokens for `with`
+        self._local = None
+        self._shards = None
+        self._retired = None
+        self._shards_lock = None
+        self._tokens = None
+        if concurrent:
+            self._local = threading.local()
+            self._shards = list()
+            # the samples of threads which have exited
+            self._retired = _TimerShard(self.log)
+            self._shards_lock = threading.Lock()
+            self._tokens = contextvars.ContextVar('timer_tokens', default=())
+        self.clear()
+
+    @property
+    def concurrent(self):
+        return self._shards is not None
 
     @property
     def running(self):
@@ -227,19 +347,217 @@ class Timer(object):
         self._running = _x
 
     def start(self):
+        '''
+        start an interval.  In concurrent mode, return a token for stop()
+        '''
+        if self._shards is not None:
+            region = self._mem_enter()
+            if region is not None:
+                return time.perf_counter_ns(), region
+            return time.perf_counter_ns()
         if self._running:
             return
-        self.time_start = time.time()
-        self.running = True
+        self._running = True
+        self._region = self._mem_enter()
+        self._start_ns = time.perf_counter_ns()
 
-    def stop(self):
+    def stop(self, token=None):
+        '''
+        stop the interval.  In concurrent mode, token (from start()) is mandatory
+        '''
+        if self._shards is not None:
+            if token is None:
+                self.log.error("Exiting. Concurrent Timer stop() requires the token returned by start()")
+                exit(1)
+            if token.__class__ is tuple:
+                # start() entered a memprof region
+                self.record_ns(time.perf_counter_ns() - token[0])
+                self._mem_exit(token[1])
+                return
+            self.record_ns(time.perf_counter_ns() - token)
+            return
         if not self._running:
             return
-        self.running = False
-        self.time_last = (time.time() - self.time_start)
-        self.q.append(self.time_last)
-        # q will be at least 1 at this point so below is safe
-        self.time_avg = sum(self.q) / len(self.q)
+        self.record_ns(time.perf_counter_ns() - self._start_ns)
+        self._running = False
+        region = self._region
+        self._region = None
+        self._mem_exit(region)
+
+    def _mem_enter(self):
+        '''
+        if memory profiling (see memprof.py) and this timer is named, enter
+        a region for an interval.  return a handle for _mem_exit(), or None
+        '''
+        profiler = memprof.profiler
+        if profiler is None or self.name is None:
+            return None
+        return profiler, profiler.enter(self.name)
+
+    @staticmethod
+    def _mem_exit(region):
+        if region is not None:
+            region[0].exit(region[1])
+
+    def __enter__(self):
+        if self._tokens is not None:
+            region = self._mem_enter()
+            self._tokens.set(self._tokens.get() + ((time.perf_counter_ns(), region),))
+            return self
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        if self._tokens is not None:
+            tokens = self._tokens.get()
+            self._tokens.set(tokens[:-1])
+            start_ns, region = tokens[-1]
+            self.record_ns(time.perf_counter_ns() - start_ns)
+            self._mem_exit(region)
+            return False
+        self.stop()
+        return False
+
+    def __call__(self, function):
+        '''decorator.  Record the duration of each call to function'''
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_async(*args, **kwargs):
+                region = self._mem_enter()
+                start_ns = time.perf_counter_ns()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    self.record_ns(time.perf_counter_ns() - start_ns)
+                    self._mem_exit(region)
+            return timed_async
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            region = self._mem_enter()
+            start_ns = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record_ns(time.perf_counter_ns() - start_ns)
+                self._mem_exit(region)
+        return timed
+
+    def snapshot(self):
+        '''return a dict of the timer's statistics, in seconds'''
+        if self._shards is not None:
+            # from a merged copy, not from self, which other threads may re-sync
+            histogram, last_ns = self._merge_shards()
+            count = histogram.count
+            total = histogram.total / 1e9
+            return {
+                'count': count,
+                'total': total,
+                'last': last_ns / 1e9,
+                'avg': total / count if count else 0.0,
+                'min': histogram.min / 1e9 if count else 0.0,
+                'max': histogram.max / 1e9 if count else 0.0,
+                'p50': self._percentile(50, histogram),
+                'p90': self._percentile(90, histogram),
+                'p99': self._percentile(99, histogram)
+            }
+        histogram = self.histogram
+        count = histogram.count
+        return {
+            'count': count,
+            'total': self.time_total,
+            'last': self.time_last,
+            'avg': self.time_avg,
+            'min': self.time_min if count else 0.0,
+            'max': self.time_max,
+            'p50': self._percentile(50, histogram),
+            'p90': self._percentile(90, histogram),
+            'p99': self._percentile(99, histogram)
+        }
+
+    def _shard(self):
+        '''return this thread's shard, creating it on first use'''
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _TimerShard(self.log)
+            self._local.shard = shard
+            # The thread's locals are released when it exits, which
+            # retires its shard, so short-lived threads don't accumulate
+            owner = _ShardOwner()
+            self._local.owner = owner
+            weakref.finalize(owner, _retire_shard, weakref.ref(self), shard)
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _retire(self, shard):
+        '''fold shard, of a thread which has exited, into self._retired'''
+        with self._shards_lock:
+            self._shards.remove(shard)
+            self._retired.merge(shard)
+
+    def _merge_shards(self):
+        '''
+        concurrent mode.  Return a new Histogram of the samples of all
+        shards, and the last sample (ns)
+        '''
+        histogram = Histogram(self.log)
+        with self._shards_lock:
+            retired = self._retired
+            histogram.merge(retired.histogram)
+            last_at = retired.last_at
+            last_ns = retired.last_ns
+            for shard in self._shards:
+                histogram.merge(shard.histogram)
+                if shard.last_at > last_at:
+                    last_at = shard.last_at
+                    last_ns = shard.last_ns
+        return histogram, last_ns
+
+    def _sync(self):
+        '''
+        concurrent mode.  Merge the shards into a new Histogram, publish it
+        as self.histogram, and update this timer's statistics.  Return
+        the histogram (self.histogram, outside concurrent mode)
+
+        The shared histogram is replaced, never cleared and refilled, so
+        a thread reading it while another syncs sees a complete copy.
+        '''
+        if self._shards is None:
+            return self.histogram
+        histogram, last_ns = self._merge_shards()
+        self.histogram = histogram
+        self.time_total = histogram.total / 1e9
+        self.time_last = last_ns / 1e9
+        self.time_elapsed = self.time_last
+        if histogram.count:
+            self.time_avg = histogram.total / histogram.count / 1e9
+            self.time_min = histogram.min / 1e9
+            self.time_max = histogram.max / 1e9
+        return histogram
+
+    def record_ns(self, elapsed_ns):
+        '''
+        add a sample of elapsed_ns nanoseconds, as if measured by
+        start() and stop()
+        '''
+        if self._sample_log is not None:
+            self._sample_log.append(self._sample_id, time.perf_counter_ns() - elapsed_ns, elapsed_ns)
+        if self._shards is not None:
+            try:
+                shard = self._local.shard
+            except AttributeError:
+                shard = self._shard()
+            shard.record(elapsed_ns)
+            return
+        q = self._q_ns
+        if len(q) == self.qlen:
+            self._q_sum_ns -= q[0]
+        q.append(elapsed_ns)
+        self._q_sum_ns += elapsed_ns
+        self.histogram.record(elapsed_ns)
+        self.time_last = elapsed_ns / 1e9
+        self.time_avg = self._q_sum_ns / len(q) / 1e9
         self.time_total += self.time_last
         self.time_elapsed = self.time_last
         if self.time_last > self.time_max:
@@ -247,47 +565,189 @@ class Timer(object):
         if self.time_last < self.time_min:
             self.time_min = self.time_last
 
+    def merge(self, other):
+        '''
+        add the samples of Timer other to this timer's histogram, count,
+        total, min and max.  The rolling average and last sample are
+        unchanged.  Not supported in concurrent mode.
+        '''
+        if self._shards is not None:
+            self.log.error("Exiting. merge() is not supported for concurrent Timers")
+            exit(1)
+        self.histogram.merge(other._sync())
+        self.time_total += other.time_total
+        if other.time_max > self.time_max:
+            self.time_max = other.time_max
+        if other.time_min < self.time_min:
+            self.time_min = other.time_min
+
+    @property
+    def time_start(self):
+        '''time.time() at the latest start(), or 0.0'''
+        if self._start_ns == 0:
+            return 0.0
+        return (self._start_ns + _EPOCH_OFFSET_NS) / 1e9
+    @time_start.setter
+    def time_start(self, x):
+        '''set the start of the running interval, as a time.time() value'''
+        self._start_ns = int(x * 1e9) - _EPOCH_OFFSET_NS
+
+    @property
+    def q(self):
+        '''
+        read-only view of the last qlen samples, in seconds.  Always
+        empty in concurrent mode
+        '''
+        return self._q
+
+    @property
+    def count(self):
+        '''number of samples since the timer was created or cleared'''
+        return self._sync().count
+
+    def percentile(self, p):
+        '''
+        elapsed time (seconds) below which p percent of samples since the
+        timer was created or cleared fall.  0.0 if there are no samples
+        '''
+        return self._percentile(p, self._sync())
+
+    @staticmethod
+    def _percentile(p, histogram):
+        '''percentile() of histogram, in seconds'''
+        value = histogram.percentile(p)
+        if value is None:
+            return 0.0
+        return value / 1e9
+    @property
+    def p50(self):
+        return self.percentile(50)
+    @property
+    def p90(self):
+        return self.percentile(90)
+    @property
+    def p99(self):
+        return self.percentile(99)
+
     @property
     def total(self):
+        self._sync()
         return self.time_total
     @property
     def elapsed(self):
         '''
         the time period between each start() and stop() call
         '''
+        self._sync()
         return self.time_elapsed
     @property
     def max(self):
         '''
         the maximum elapsed time seen since the timer was created or cleared
         '''
+        self._sync()
         return self.time_max
     @property
     def min(self):
         '''
-        the minimum elapsed time seen since the timer was created or cleared
+        the minimum elapsed time seen since the timer was created or
+        cleared.  0.0 if there are no samples
         '''
+        if self._sync().count == 0:
+            return 0.0
         return self.time_min
     @property
     def avg(self):
         '''
         the average elapsed time seen since the timer was created or cleared
-        this is a rolling average, averaged over the entries in the q
+        this is a rolling average, averaged over the last qlen samples
+        (in concurrent mode, over all samples)
         '''
+        self._sync()
         return self.time_avg
     @property
     def last(self):
         '''
         the last elapsed time between start() and stop() calls
         '''
+        self._sync()
         return self.time_last
     def clear(self):
-        self.time_start   = 0.0
-        self.time_elapsed = 0.0
+        '''reset all samples and statistics'''
+        self._start_ns    = 0
+        # duration between lastest start/stop interval
         self.time_last    = 0.0
+        # total of all time between start/stop intervals
+        self.time_total   = 0.0
+        self.time_elapsed = 0.0
+        self.time_max     = 0.0
+        self.time_min     = 9999999990.0
         self.time_avg     = 0.0
-        self.time_min     = 9999999.0
-        self.q.clear()
+        self._q_ns.clear()
+        self._q_sum_ns = 0
+        # replaced rather than cleared, see _sync()
+        self.histogram = Histogram(self.log)
+        if self._shards is not None:
+            with self._shards_lock:
+                for shard in self._shards:
+                    shard.clear()
+                self._retired.clear()
+
+class _SecondsView(Sequence):
+    '''read-only view, in seconds, of a deque of samples in ns'''
+    __slots__ = ('_q_ns',)
+
+    def __init__(self, q_ns):
+        self._q_ns = q_ns
+
+    def __len__(self):
+        return len(self._q_ns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [x / 1e9 for x in list(self._q_ns)[index]]
+        return self._q_ns[index] / 1e9
+
+    def __iter__(self):
+        return (x / 1e9 for x in self._q_ns)
+
+    def __repr__(self):
+        return 'Timer.q({})'.format(list(self))
+
+class _TimerShard(object):
+    '''one thread's samples, for a concurrent Timer'''
+    __slots__ = ('log', 'histogram', 'last_ns', 'last_at')
+
+    def __init__(self, log):
+        self.log = log
+        self.clear()
+
+    def clear(self):
+        # replaced rather than cleared, as the owning thread may be recording
+        self.histogram = Histogram(self.log)
+        self.last_ns = 0
+        self.last_at = -1
+
+    def record(self, elapsed_ns):
+        self.histogram.record(elapsed_ns)
+        self.last_ns = elapsed_ns
+        self.last_at = time.perf_counter_ns()
+
+    def merge(self, other):
+        '''add the samples of _TimerShard other'''
+        self.histogram.merge(other.histogram)
+        if other.last_at > self.last_at:
+            self.last_at = other.last_at
+            self.last_ns = other.last_ns
+
+class _ShardOwner(object):
+    '''held only by a thread's locals.  Collected when the thread exits'''
+    __slots__ = ('__weakref__',)
+
+def _retire_shard(timer_ref, shard):
+    timer = timer_ref()
+    if timer is not None:
+        timer._retire(shard)
 
 class Constants(object):
     '''Provides constants for common values e.g. na_bool, na_str, na_int
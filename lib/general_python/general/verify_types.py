@@ -3,16 +3,283 @@ verify_types.py
 Summary: Methods for verifying types (e.g. int, str) and formats (mac address, ipv4 address)
 Author: Allen Robel
 Email: arobel@cisco.com
+
+Changes:
+
+   137  is_*_many() batch validators.  Each returns BatchResult(mask, failed),
+        whose mask agrees with the scalar validator for every value
+   141  is_mac_address() checks that the whole of x is a mac address, in
+        colon, dash or dotted (NX-OS) notation.  It searched for one
+        anywhere in x, so e.g. 'xx00:1a:2b:3c:4d:5e' and
+        '00:1a:2b:3c:4d:5e\n' passed, and 001a.2b3c.4d5e failed.
+        Non-str x fails rather than raising TypeError
+   143  is_digits() fails for '123\n', which its regex accepted, and
+        passes for bytes of ascii digits.  is_hex() passes for bytes
+   143  is_power() fails for x < 1 or b < 2, where it raised ValueError.
+        is_power(1, 1) still passes
 '''
 import sys
 import ipaddress
 import logging
-import math # is_power()
 import re
+from functools import partial # is_power_many()
+from collections import namedtuple # BatchResult
+from collections import OrderedDict # LruCache
+from enum import IntEnum # Reason
+try:
+    import numpy as np # *_many() masks
+except ImportError:
+    np = None
 # local libraries
 from general_python.general.constants import Constants
+from general_python.general import ipv4
+from general_python.general import mac
+from general_python.general import numeric
+from general_python.general import sequence
+
+OUR_VERSION = 145
+
+# Returned by the *_many() batch methods.
+#   mask   - one element per input value, True/1 if the value passed.
+#            numpy bool array if numpy is installed, else bytearray
+#   failed - indices of the values that did not pass
+BatchResult = namedtuple('BatchResult', ['mask', 'failed'])
+
+class Reason(IntEnum):
+    '''
+    reason codes carried by VerifyResult, and keys of
+    VerifyTypes().reason_counts
+    '''
+    OK = 0
+    NOT_IPV4_ADDRESS = 1
+    NOT_IPV4_ADDRESS_WITH_PREFIX = 2
+    NOT_IPV4_NETWORK = 3
+    NOT_IPV6_ADDRESS = 4
+    NOT_INT = 5
+    OUT_OF_RANGE = 6
+    MULTICAST = 7
+    LOOPBACK = 8
+    RESERVED = 9
+    UNSPECIFIED = 10
+    LINK_LOCAL = 11
+    SUBNET = 12
+    NOT_LIST = 13
+    NOT_LIST_OF_INT = 14
+    NOT_MAC_ADDRESS = 15
+    NOT_RANGE = 16
+    NOT_SEQUENCE = 17
+    NOT_SEQUENCE_OF = 18
 
-OUR_VERSION = 136
+class VerifyResult(object):
+    '''
+    Returned by VerifyTypes() validators when VerifyTypes().result_mode
+    is True.  Evaluates True if the value passed verification.
+
+    reason  - a Reason
+    message - human-readable detail.  Formatted on first access, so
+              failures nobody inspects cost no string formatting.
+    '''
+    __slots__ = ('reason', '_template', '_args')
+    def __init__(self, reason, template='', args=()):
+        self.reason = reason
+        self._template = template
+        self._args = args
+
+    def __bool__(self):
+        return self.reason == Reason.OK
+
+    @property
+    def message(self):
+        if self._args:
+            self._template = self._template % self._args
+            self._args = ()
+        return self._template
+
+    def __repr__(self):
+        return f"VerifyResult({self.reason.name})"
+
+VERIFY_OK = VerifyResult(Reason.OK)
+
+class LruCache(object):
+    '''
+    Bounded least-recently-used memoization of a one-argument function.
+    Only str arguments are cached.  Other arguments are passed through
+    to function uncached.
+
+    cache = LruCache(function, 1024)
+    cache('10.1.1.0/24')   # calls function
+    cache('10.1.1.0/24')   # dictionary lookup
+    cache.stats            # {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 1024}
+    '''
+    def __init__(self, function, maxsize):
+        self.function = function
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __call__(self, x):
+        if type(x) is not str:
+            return self.function(x)
+        data = self._data
+        try:
+            value = data[x]
+        except KeyError:
+            pass
+        else:
+            data.move_to_end(x)
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self.function(x)
+        data[x] = value
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize
+        }
+
+_IPV4_CLASS_REASONS = {
+    ipv4.MULTICAST: Reason.MULTICAST,
+    ipv4.LOOPBACK: Reason.LOOPBACK,
+    ipv4.RESERVED: Reason.RESERVED,
+    ipv4.UNSPECIFIED: Reason.UNSPECIFIED,
+    ipv4.LINK_LOCAL: Reason.LINK_LOCAL
+}
+
+_RE_MAC_ADDRESS = re.compile(r'([0-9A-F]{2}[:-]){5}([0-9A-F]{2}$)', re.I)
+
+# Silent predicates used by the *_many() batch methods.  These never log,
+# and return False (rather than raising) for values of the wrong type.
+def _ipv4_address(x):
+    if isinstance(x, str):
+        return ipv4.to_int(x) is not None
+    try:
+        ipaddress.IPv4Address(x)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+def _ipv4_address_with_prefix(x):
+    if not isinstance(x, str) or "/" not in x:
+        return False
+    return _ipv4_address(x.split('/', 1)[0])
+
+def _ipv4_network(x):
+    try:
+        ipaddress.IPv4Network(x)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+def _ipv4_int(x):
+    '''
+    return ipv4 address x (str, int, or bytes) as a 32-bit integer
+    return None if x is not a valid ipv4 address
+    '''
+    if isinstance(x, str):
+        return ipv4.to_int(x)
+    try:
+        return int(ipaddress.IPv4Address(x))
+    except (ValueError, TypeError):
+        return None
+
+def _ipv4_unicast_address(x):
+    address = _ipv4_int(x)
+    if address is None:
+        return False
+    return ipv4.classify(address) == ipv4.UNICAST
+
+def _ipv6_unicast_address(x):
+    try:
+        a = ipaddress.IPv6Address(x)
+    except (ValueError, TypeError):
+        return False
+    if a.is_multicast or a.is_loopback or a.is_reserved:
+        return False
+    if a.is_unspecified or a.is_link_local:
+        return False
+    if isinstance(x, str) and x.endswith('.0'):
+        return False
+    return True
+
+def _mac_address(x):
+    return mac.to_int(x) is not None
+
+def batch(predicate, values):
+    '''
+    apply predicate to every element of values in a single pass.
+    return BatchResult(mask, failed)
+
+    mask is a numpy bool array if numpy is installed, else a bytearray
+    (one byte per value, 1 == passed).  failed is the list (or numpy
+    array) of indices into values for which predicate returned False.
+    '''
+    return _batch_result(bytearray(map(predicate, values)))
+
+def _batch_result(mask):
+    '''return BatchResult for bytearray mask'''
+    if np is not None:
+        mask = np.frombuffer(mask, dtype=np.bool_)
+        return BatchResult(mask, np.flatnonzero(~mask))
+    failed = list()
+    index = mask.find(0)
+    while index != -1:
+        failed.append(index)
+        index = mask.find(0, index + 1)
+    return BatchResult(mask, failed)
+
+def _column_regex(pattern):
+    '''
+    return a regex whose findall(), over a newline-joined column of
+    str, returns one element per line: the line if it matches pattern
+    in full, else ''
+    '''
+    return re.compile(r'^(?:({})|.*)$'.format(pattern), re.M)
+
+_IPV4_ADDRESS_COLUMN = _column_regex(ipv4.ADDRESS_PATTERN)
+_IPV4_ADDRESS_WITH_PREFIX_COLUMN = _column_regex(ipv4.ADDRESS_PATTERN + '/.*')
+_IPV4_UNICAST_ADDRESS_COLUMN = _column_regex(ipv4.UNICAST_PATTERN)
+_MAC_ADDRESS_COLUMN = _column_regex(mac.ADDRESS_PATTERN)
+
+def batch_column(regex, predicate, values):
+    '''
+    as batch(), for a predicate which, for str values, is equivalent to
+    regex (from _column_regex()) matching.  A column of str is joined,
+    and verified by a single findall(), so no Python code runs per
+    value.  Columns which aren't all str, or which contain newlines,
+    fall back to batch(predicate, values).
+    '''
+    values = list(values)
+    try:
+        column = '\n'.join(values)
+    except TypeError:
+        return batch(predicate, values)
+    matches = regex.findall(column)
+    if len(matches) != len(values):
+        # a value contains a newline (or values is empty)
+        return batch(predicate, values)
+    return _batch_result(bytearray(map(bool, matches)))
+
+def batch_all_passed(count):
+    '''return BatchResult for count values which all passed'''
+    mask = bytearray(b'\x01') * count
+    if np is not None:
+        return BatchResult(np.frombuffer(mask, dtype=np.bool_), np.zeros(0, dtype=np.intp))
+    return BatchResult(mask, list())
 
 class VerifyTypes(Constants):
     '''
@@ -26,17 +293,164 @@ class VerifyTypes(Constants):
     if not verify.is_mac_address(mac):
         print(f"{mac} not a mac-address.")
 
+    Batch usage:
+
+    Several methods have a *_many() counterpart which verifies an entire
+    iterable in one pass, without logging per value.  These return a
+    BatchResult(mask, failed) namedtuple.  The ipv4 address and mac
+    address methods verify a column of str with a single regex pass.
+    is_digits_many() and is_hex_many() take a single str method call
+    when every value is valid.  Other methods, and columns which aren't
+    all str, call a predicate per value.
+
+    result = verify.is_ipv4_address_many(addresses)
+    for index in result.failed:
+        print(f"{addresses[index]} not an ipv4 address.")
+
+    Result mode:
+
+    By default, validators return True/False and log the reason for a
+    failure.  Log messages are formatted lazily i.e. only if the log
+    level is enabled.  If result_mode is set to True, validators which
+    log on failure instead return a VerifyResult, and don't log.
+    VerifyResult evaluates True/False, and carries a Reason code and
+    a lazily-formatted message.  In either mode, failures are counted
+    per Reason in reason_counts.
+
+    verify.result_mode = True
+    result = verify.is_ipv4_unicast_address('224.0.0.5')
+    if not result:
+        print(result.reason, result.message)
+    print(verify.reason_counts)   # {<Reason.MULTICAST: 7>: 1}
+
+    Memoization:
+
+    The methods listed in MEMOIZABLE can be individually memoized with a
+    bounded LRU cache.  Cached calls return the cached result without
+    logging, and without updating reason_counts.
+
+    verify.enable_cache('is_ipv4_network', 4096)
+    verify.is_ipv4_network('10.1.0.0/16')
+    print(verify.cache_stats)
+    # {'is_ipv4_network': {'hits': 0, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 4096}}
+    verify.disable_cache('is_ipv4_network')
+
     '''
+    # methods accepted by enable_cache()
+    MEMOIZABLE = (
+        'is_ipv4_address',
+        'is_ipv4_address_with_prefix',
+        'is_ipv4_network',
+        'is_ipv4_unicast_address',
+        'is_ipv6_unicast_address',
+        'is_mac_address'
+    )
+
+    # Shared, precompiled, state.  Per-instance state is limited to the
+    # slots below, so constructing a VerifyTypes is nearly free.
+    # (Constants provides a lazily-created __dict__, so callers can
+    # still set arbitrary attributes, and enable_cache() can shadow
+    # methods.)
+    lib_version = OUR_VERSION
+    lib_name = "VerifyTypes"
+    DEFAULT_LOGLEVEL = 'INFO'
+    ipv4_mask_range = range(0,33)
+    ipv6_mask_range = range(0,129)
+    re_digits = re.compile(r'^(\d+)$')
+    re_mac_address = _RE_MAC_ADDRESS
+
+    __slots__ = ('log', '_reason_counts', '_result_mode', '_pass', '_caches')
+
     def __init__(self, log):
-        super().__init__()
-        self.lib_version = OUR_VERSION
-        self.lib_name = "VerifyTypes"
         self.log = log
-        self.DEFAULT_LOGLEVEL = 'INFO'
-        self.ipv4_mask_range = range(0,33)
-        self.ipv6_mask_range = range(0,129)
-        self.re_digits = re.compile('^(\d+)$')
-        self.re_mac_address = re.compile(r'([0-9A-F]{2}[:-]){5}([0-9A-F]{2}$)', re.I)
+        # _reason_counts and _caches are allocated on first use
+        self._reason_counts = None
+        self._caches = None
+        self._result_mode = False
+        self._pass = True
+
+    @property
+    def result_mode(self):
+        '''
+        If True, validators which log on failure return VerifyResult
+        instead of True/False, and do not log.
+        '''
+        return self._result_mode
+    @result_mode.setter
+    def result_mode(self, x):
+        self._result_mode = bool(x)
+        self._pass = VERIFY_OK if self._result_mode else True
+        # cached results are of the previous mode's type
+        self.clear_caches()
+
+    def enable_cache(self, name, maxsize=1024):
+        '''
+        memoize method name, which must be in MEMOIZABLE, with a LRU
+        cache holding at most maxsize results.  If name is already
+        cached, its cache is replaced.
+        '''
+        if name not in self.MEMOIZABLE:
+            self.log.error(f"Cannot cache {name}. Expected one of {self.MEMOIZABLE}")
+            return False
+        if not isinstance(maxsize, int) or maxsize < 1:
+            self.log.error(f"Cannot cache {name}. Expected int > 0 for maxsize. Got {maxsize}")
+            return False
+        # Instance attribute shadows the method, so uncached methods
+        # pay nothing for this feature.
+        cache = LruCache(getattr(type(self), name).__get__(self), maxsize)
+        if self._caches is None:
+            self._caches = dict()
+        self._caches[name] = cache
+        setattr(self, name, cache)
+        return True
+
+    def disable_cache(self, name):
+        '''stop memoizing method name, and discard its cache'''
+        if self._caches is None or name not in self._caches:
+            return
+        del self._caches[name]
+        delattr(self, name)
+
+    def clear_caches(self):
+        '''discard cached results, keeping statistics'''
+        if self._caches is None:
+            return
+        for cache in self._caches.values():
+            cache.clear()
+
+    @property
+    def cache_stats(self):
+        '''dict, keyed on method name, of hits/misses/evictions/size/maxsize'''
+        if self._caches is None:
+            return dict()
+        return {name: cache.stats for name, cache in self._caches.items()}
+
+    @property
+    def reason_counts(self):
+        '''
+        dict of failure counts, keyed on Reason, since this instance
+        was created or clear_reason_counts() was called
+        '''
+        if self._reason_counts is None:
+            return dict()
+        return {Reason(r): c for r, c in enumerate(self._reason_counts) if c != 0}
+
+    def clear_reason_counts(self):
+        self._reason_counts = None
+
+    def _fail(self, reason, level, template, *args):
+        '''
+        count a failure and either return a VerifyResult (result_mode)
+        or log template % args, if level is enabled, and return False
+        '''
+        if self._reason_counts is None:
+            self._reason_counts = [0] * len(Reason)
+        self._reason_counts[reason] += 1
+        if self._result_mode:
+            return VerifyResult(reason, template, args)
+        if self.log.isEnabledFor(level):
+            self.log.log(level, template, *args)
+        return False
 
     def is_boolean(self,x):
         '''verify x is a boolean value'''
@@ -46,9 +460,7 @@ class VerifyTypes(Constants):
 
     def is_digits(self,x):
         '''verify x contains only digits i.e. is a positive integer'''
-        if not self.re_digits.search(str(x)):
-            return False
-        return True
+        return numeric.is_digits(x)
 
     def is_float(self,x):
         '''verify x is a float'''
@@ -60,9 +472,7 @@ class VerifyTypes(Constants):
         '''
         verify x contains only hexidecimal characters
         '''
-        if not self.HEX_DIGITS.issuperset(x):
-            return False
-        return True
+        return numeric.is_hex(x)
 
     def is_int(self,x):
         '''verify x is a integer'''
@@ -72,67 +482,54 @@ class VerifyTypes(Constants):
 
     def is_ipv4_address(self,x):
         '''verify x is an ipv4 address'''
-        try:
-            a = ipaddress.IPv4Address(x)
-            return True
-        except:
-            self.log.debug(f"Not a valid ipv4 address: {x}. Should be in the form A.B.C.D")
-            return False
+        if _ipv4_address(x):
+            return self._pass
+        return self._fail(Reason.NOT_IPV4_ADDRESS, logging.DEBUG,
+            "Not a valid ipv4 address: %s. Should be in the form A.B.C.D", x)
 
     def is_ipv4_address_with_prefix(self,x):
         '''
         verify x is an ipv4 address with prefix of the form X.X.X.X/Y
         '''
-        if not self.is_ipv4_address(re.sub('\/.*','',x)):
-            self.log.debug(f"Not a valid ipv4 address with prefix: {x}. Should be in the form A.B.C.D/M")
-            return False
-        if "/" not in x:
-            self.log.debug(f"Not a valid ipv4 address with prefix: {x}. Should be in the form A.B.C.D/M")
-            return False
-        return True
+        if _ipv4_address_with_prefix(x):
+            return self._pass
+        return self._fail(Reason.NOT_IPV4_ADDRESS_WITH_PREFIX, logging.DEBUG,
+            "Not a valid ipv4 address with prefix: %s. Should be in the form A.B.C.D/M", x)
 
     def is_ipv4_network(self,x):
         try:
             ipaddress.IPv4Network(x)
-            return True
+            return self._pass
         except Exception as e:
-            self.log.debug(f"Not a valid ipv4 network: {x} -> {e}")
-            return False
+            return self._fail(Reason.NOT_IPV4_NETWORK, logging.DEBUG,
+                "Not a valid ipv4 network: %s -> %s", x, e)
 
     def is_ipv4_mask(self,x):
         if not isinstance(x, int):
-            self.log.debug(f"bad ipv4 network mask. Expected an integer. Got {x}")
-            return False
+            return self._fail(Reason.NOT_INT, logging.DEBUG,
+                "bad ipv4 network mask. Expected an integer. Got %s", x)
         if x not in self.ipv4_mask_range:
-            msg = f"bad ipv4 network mask {x}."
-            msg += f" Should be an int {self.ipv4_mask_range.start}"
-            msg += f" >= x <= {self.ipv4.mask_range.stop -1}"
-            self.log.debug(msg)
-            return False
-        return True
+            return self._fail(Reason.OUT_OF_RANGE, logging.DEBUG,
+                "bad ipv4 network mask %s. Should be an int %d >= x <= %d",
+                x, self.ipv4_mask_range.start, self.ipv4_mask_range.stop - 1)
+        return self._pass
 
     def is_ipv4_unicast_address(self,x):
-        '''verify x is an ipv4 unicast address'''
-        if self.is_ipv4_address(x) is False:
-            return False
-        _test = ipaddress.IPv4Address(x)
-        bad_type = ''
-        if _test.is_multicast:
-            bad_type = 'is_multicast'
-        elif _test.is_loopback:
-            bad_type = 'is_loopback'
-        elif _test.is_reserved:
-            bad_type = 'is_reserved'
-        elif _test.is_unspecified:
-            bad_type = 'is_unspecified'
-        elif _test.is_link_local:
-            bad_type = 'is_link_local'
-        elif re.search('\/', x):
-            bad_type = 'is_subnet'
-        if bad_type != '':
-            self.log.debug(f"{x} not a unicast ipv4 address -> {bad_type}")
-            return False
-        return True
+        '''
+        verify x is an ipv4 unicast address
+
+        x is parsed once, directly to a 32-bit integer, and classified
+        using the range table in general_python.general.ipv4
+        '''
+        address = _ipv4_int(x)
+        if address is None:
+            return self._fail(Reason.NOT_IPV4_ADDRESS, logging.DEBUG,
+                "Not a valid ipv4 address: %s. Should be in the form A.B.C.D", x)
+        address_class = ipv4.classify(address)
+        if address_class != ipv4.UNICAST:
+            return self._fail(_IPV4_CLASS_REASONS[address_class], logging.DEBUG,
+                "%s not a unicast ipv4 address -> %s", x, ipv4.CLASS_NAMES[address_class])
+        return self._pass
 
     def is_ipv6_network(self,x):
         if isinstance(x, ipaddress.IPv6Network):
@@ -141,24 +538,22 @@ class VerifyTypes(Constants):
 
     def is_ipv6_mask(self,x):
         if not isinstance(x, int):
-            self.log.debug(f"bad ipv6 network mask. Expected int(). Got {x}.")
-            return False
+            return self._fail(Reason.NOT_INT, logging.DEBUG,
+                "bad ipv6 network mask. Expected int(). Got %s.", x)
         if x not in self.ipv6_mask_range:
-            msg = f"bad ipv6 network mask {x}."
-            msg += f" Should be an int {self.ipv6_mask_range.start}"
-            msg += f" >= x <= {self.ipv6.mask_range.stop -1}"
-            self.log.debug(msg)
-            return False
-        return True
+            return self._fail(Reason.OUT_OF_RANGE, logging.DEBUG,
+                "bad ipv6 network mask %s. Should be an int %d >= x <= %d",
+                x, self.ipv6_mask_range.start, self.ipv6_mask_range.stop - 1)
+        return self._pass
 
     def is_ipv6_address(self, x):
         '''
         verify x is an ipv6 address
         '''
         if isinstance(x, ipaddress.IPv6Address):
-            return True
-        self.log.debug(f"Not a valid ipv6 address: {x}")
-        return False
+            return self._pass
+        return self._fail(Reason.NOT_IPV6_ADDRESS, logging.DEBUG,
+            "Not a valid ipv6 address: %s", x)
 
 
     def is_ipv6_link_local_address(self, x):
@@ -179,29 +574,25 @@ class VerifyTypes(Constants):
         try:
             _test = ipaddress.IPv6Address(x)
         except ipaddress.AddressValueError as exception:
-            message = (
-                f"{x} is not a valid ipv6 address."
-                f"Exception detail: {exception}"
-            )
-            self.log.error(message)
-            return False
-        bad_type = ''
+            return self._fail(Reason.NOT_IPV6_ADDRESS, logging.ERROR,
+                "%s is not a valid ipv6 address. Exception detail: %s", x, exception)
+        reason = None
         if _test.is_multicast:
-            bad_type = 'is_multicast'
+            reason = Reason.MULTICAST
         elif _test.is_loopback:
-            bad_type = 'is_loopback'
+            reason = Reason.LOOPBACK
         elif _test.is_reserved:
-            bad_type = 'is_reserved'
+            reason = Reason.RESERVED
         elif _test.is_unspecified:
-            bad_type = 'is_unspecified'
+            reason = Reason.UNSPECIFIED
         elif _test.is_link_local:
-            bad_type = 'is_link_local'
+            reason = Reason.LINK_LOCAL
         elif re.search('\.0$', x):
-            bad_type = 'is_subnet'
-        if bad_type != '':
-            self.log.error(f"{x} not a unicast ipv6 address -> {bad_type}")
-            return False
-        return True
+            reason = Reason.SUBNET
+        if reason is not None:
+            return self._fail(reason, logging.ERROR,
+                "%s not a unicast ipv6 address -> is_%s", x, reason.name.lower())
+        return self._pass
 
     def is_logging_instance(self, x):
         '''
@@ -232,39 +623,118 @@ class VerifyTypes(Constants):
     def is_list_of_int(self, x):
         '''verify x is a list containing only integers'''
         if not isinstance(x, list):
-            return False
-        for e in x:
-            if not isinstance(e, int):
-                self.log.error(f"One or more elements of list are not integers: {x}")
-                return False
-        return True
+            return self._fail(Reason.NOT_LIST, logging.DEBUG,
+                "Not a list: %s", x)
+        index = sequence.first_not_of(x, int)
+        if index != -1:
+            return self._fail(Reason.NOT_LIST_OF_INT, logging.ERROR,
+                "Element %d of list is not an integer. Got %r", index, x[index])
+        return self._pass
+
+    def is_sequence_of(self, x, t):
+        '''
+        verify x is a sequence (list, tuple, range, array.array, bytes,
+        memoryview, numpy array, etc) whose elements are all instances
+        of t, a type or tuple of types.
+
+        For typed containers (array.array, range, numpy, etc) the answer
+        comes from the container's type, in O(1).  Other sequences are
+        checked in chunks.  See general_python.general.sequence
+        '''
+        if not sequence.is_sequence(x):
+            return self._fail(Reason.NOT_SEQUENCE, logging.DEBUG,
+                "Not a sequence: %s", type(x).__name__)
+        index = sequence.first_not_of(x, t)
+        if index != -1:
+            return self._fail(Reason.NOT_SEQUENCE_OF, logging.DEBUG,
+                "Element %d of %s is not %s. Got %r",
+                index, type(x).__name__, t, x[index])
+        return self._pass
+
+    def is_sequence_of_float(self, x):
+        '''verify x is a sequence containing only floats'''
+        return self.is_sequence_of(x, float)
+
+    def is_sequence_of_int(self, x):
+        '''verify x is a sequence containing only integers'''
+        return self.is_sequence_of(x, int)
+
+    def is_sequence_of_str(self, x):
+        '''verify x is a sequence containing only strings'''
+        return self.is_sequence_of(x, str)
 
 
     def is_mac_address(self, x):
-        '''verify x is a mac address'''
-        m = self.re_mac_address.search(x)
-        if m:
-            return True
-        return False
+        '''
+        verify x is a mac address in colon, dash, or dotted (NX-OS) notation
+        e.g. 00:1a:2b:3c:4d:5e, 00-1a-2b-3c-4d-5e, 001a.2b3c.4d5e
+        See general_python.general.mac to normalize or store mac addresses.
+        '''
+        if mac.to_int(x) is not None:
+            return self._pass
+        return self._fail(Reason.NOT_MAC_ADDRESS, logging.DEBUG,
+            "Not a valid mac address: %s", x)
 
     def is_power(self, x, b):
         '''
-        verify x is a power of b
+        verify x is a power of b.  Exact for int x and b of any size.
         Examples:
             is_power(8,2)  # True
             is_power(7,2)  # False
         '''
-        if b == 1:
-            return x == 1
-        return b**int(math.log(x, b)+.5) == x
+        return numeric.is_power(x, b)
 
     def is_range(self, x):
         if isinstance(x, range):
-            return True
-        self.log.error(f"Not a python range() type. Expected range(x,y). Got {x}")
-        return False
+            return self._pass
+        return self._fail(Reason.NOT_RANGE, logging.ERROR,
+            "Not a python range() type. Expected range(x,y). Got %s", x)
 
     def is_tuple(self, x):
         if isinstance(x, tuple):
             return True
         return False
+
+    # Batch methods.  See BatchResult and batch() above.
+
+    def is_ipv4_address_many(self, x):
+        '''verify each element of iterable x is an ipv4 address'''
+        return batch_column(_IPV4_ADDRESS_COLUMN, _ipv4_address, x)
+
+    def is_ipv4_address_with_prefix_many(self, x):
+        '''verify each element of iterable x is of the form X.X.X.X/Y'''
+        return batch_column(_IPV4_ADDRESS_WITH_PREFIX_COLUMN, _ipv4_address_with_prefix, x)
+
+    def is_ipv4_network_many(self, x):
+        '''verify each element of iterable x is an ipv4 network'''
+        return batch(_ipv4_network, x)
+
+    def is_ipv4_unicast_address_many(self, x):
+        '''verify each element of iterable x is an ipv4 unicast address'''
+        return batch_column(_IPV4_UNICAST_ADDRESS_COLUMN, _ipv4_unicast_address, x)
+
+    def is_ipv6_unicast_address_many(self, x):
+        '''verify each element of iterable x is an ipv6 unicast address'''
+        return batch(_ipv6_unicast_address, x)
+
+    def is_mac_address_many(self, x):
+        '''verify each element of iterable x is a mac address'''
+        return batch_column(_MAC_ADDRESS_COLUMN, _mac_address, x)
+
+    def is_digits_many(self, x):
+        '''verify each element of iterable x contains only digits'''
+        x = list(x)
+        if numeric.all_digits(x):
+            return batch_all_passed(len(x))
+        return batch(numeric.is_digits, x)
+
+    def is_hex_many(self, x):
+        '''verify each element of iterable x contains only hexidecimal characters'''
+        x = list(x)
+        if numeric.all_hex(x):
+            return batch_all_passed(len(x))
+        return batch(numeric.is_hex, x)
+
+    def is_power_many(self, x, b):
+        '''verify each element of iterable x is a power of b'''
+        return batch(partial(numeric.is_power, b=b), x)
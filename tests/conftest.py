@@ -0,0 +1,12 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# the package lives under lib/, and isn't installed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+
+@pytest.fixture
+def log():
+    return logging.getLogger('general_python_tests')
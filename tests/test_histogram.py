@@ -0,0 +1,76 @@
+import math
+import random
+
+import pytest
+
+from general_python.general.histogram import Histogram
+
+def exact_percentile(values, p):
+    '''the value percentile() approximates: the ceil(p% * n)th smallest value'''
+    ordered = sorted(values)
+    if p <= 0:
+        return ordered[0]
+    return ordered[max(math.ceil(p * len(ordered) / 100), 1) - 1]
+
+def random_values(rng, n):
+    # spread over many powers of two, with some exact small values and repeats
+    values = [int(rng.lognormvariate(12, 3)) for _ in range(n)]
+    values += [rng.randint(0, 200) for _ in range(n // 10)]
+    values += [values[0]] * (n // 10)
+    rng.shuffle(values)
+    return values
+
+def test_empty(log):
+    h = Histogram(log)
+    assert h.count == 0 and h.mean is None and h.percentile(50) is None
+    assert list(h.buckets()) == []
+
+@pytest.mark.parametrize('sub_bucket_bits', [2, 7, 10])
+def test_percentiles_match_sorted_values(log, sub_bucket_bits):
+    rng = random.Random(sub_bucket_bits)
+    values = random_values(rng, 5000)
+    h = Histogram(log, sub_bucket_bits=sub_bucket_bits)
+    for value in values:
+        h.record(value)
+    assert h.count == len(values)
+    assert h.total == sum(values)
+    assert h.min == min(values) and h.max == max(values)
+    assert h.mean == sum(values) / len(values)
+    assert sum(count for _, _, count in h.buckets()) == len(values)
+    precision = 1 / 2**(sub_bucket_bits - 1)
+    for p in [0, 0.1, 1, 10, 25, 50, 75, 90, 99, 99.9, 100] + [rng.uniform(0, 100) for _ in range(50)]:
+        exact = exact_percentile(values, p)
+        assert abs(h.percentile(p) - exact) <= exact * precision, p
+
+def test_buckets_hold_their_values(log):
+    h = Histogram(log, sub_bucket_bits=4, max_value=2**20)
+    for value in range(2**20):
+        index = h._index(value)
+        low, high = h._bounds(index)
+        assert low <= value <= high
+    assert h.overflow == 0
+
+def test_overflow(log):
+    h = Histogram(log, sub_bucket_bits=4, max_value=1000)
+    h.record(5000)
+    h.record(10)
+    assert h.overflow == 1
+    assert h.max == 5000 and h.percentile(100) == 5000
+    assert h.percentile(99) == 5000
+
+def test_merge_equals_recording_everything(log):
+    rng = random.Random(3)
+    values = random_values(rng, 3000)
+    combined = Histogram(log)
+    parts = [Histogram(log) for _ in range(4)]
+    for n, value in enumerate(values):
+        combined.record(value)
+        parts[n % 4].record(value)
+    merged = Histogram(log)
+    merged.merge(Histogram(log))
+    for part in parts:
+        merged.merge(part)
+    assert (merged.count, merged.total, merged.min, merged.max) == \
+        (combined.count, combined.total, combined.min, combined.max)
+    assert list(merged.buckets()) == list(combined.buckets())
+    assert merged.percentiles((1, 50, 99.9)) == combined.percentiles((1, 50, 99.9))
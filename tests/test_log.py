@@ -0,0 +1,179 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+import pytest
+
+from general_python.general.log import AsyncQueueHandler, AsyncQueueListener, LogAggregator, Logger, dropped_records, get_logger, handler_graph, remove_logger
+
+class ListHandler(logging.Handler):
+    def __init__(self, delay=None):
+        super().__init__()
+        self.messages = list()
+        self.delay = delay
+
+    def emit(self, record):
+        if self.delay is not None:
+            self.delay.wait()
+        self.messages.append(record.getMessage())
+
+@pytest.fixture
+def new_logger(tmp_path):
+    '''
+    return a function which creates a logger with Logger().new(), logging
+    to a file in tmp_path.  The loggers are removed afterwards
+    '''
+    names = list()
+
+    def new(name, filename='test.log', file_level='DEBUG', **kwargs):
+        logger = Logger()
+        logger.logfile = str(tmp_path / filename)
+        log = logger.new(name, **kwargs)
+        logger.file_loglevel = file_level
+        logger.console_loglevel = 'CRITICAL'
+        # pytest's handlers on the root logger would see every record
+        log.propagate = False
+        names.append(name)
+        return logger, log
+
+    yield new
+    for name in names:
+        remove_logger(name)
+
+def record(n):
+    return logging.makeLogRecord({'msg': 'record %d', 'args': (n,), 'levelno': logging.INFO})
+
+def lines(path):
+    with open(path) as fd:
+        return fd.read().splitlines()
+
+def test_async_writes_every_record_in_order(new_logger):
+    logger, log = new_logger('test_async', _async=True, _queue_size=100, _queue_full='block')
+
+    def worker(n):
+        for i in range(2000):
+            log.debug('thread %d record %d', n, i)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert remove_logger('test_async')
+    messages = [line.split(' ', 5)[5] for line in lines(logger.logfile)]
+    for n in range(4):
+        assert [m for m in messages if m.startswith('thread {} '.format(n))] == \
+            ['thread {} record {}'.format(n, i) for i in range(2000)]
+    assert dropped_records(log) == 0
+
+def test_async_snapshots_arguments(new_logger):
+    logger, log = new_logger('test_async_args', _async=True)
+    peers = ['leaf1']
+    log.info('peers %s', peers)
+    peers.append('leaf2')
+    remove_logger('test_async_args')
+    assert lines(logger.logfile)[-1].endswith(" peers ['leaf1']")
+
+def test_drop_policy():
+    handler = AsyncQueueHandler(queue.Queue(maxsize=5), 'drop')
+    for n in range(12):
+        handler.handle(record(n))
+    assert handler.dropped == 7
+    assert [handler.queue.get_nowait().msg for _ in range(5)] == ['record {}'.format(n) for n in range(5)]
+
+def test_block_policy_and_stop():
+    release = threading.Event()
+    target = ListHandler(delay=release)
+    handler = AsyncQueueHandler(queue.Queue(maxsize=2), 'block')
+    listener = AsyncQueueListener(handler.queue, target)
+    handler.listener = listener
+    listener.start()
+
+    def caller():
+        for n in range(20):
+            handler.handle(record(n))
+
+    thread = threading.Thread(target=caller)
+    thread.start()
+    # the listener is stuck, so the caller waits for space instead of dropping
+    thread.join(0.2)
+    assert thread.is_alive()
+    release.set()
+    thread.join()
+    listener.stop()
+    assert handler.dropped == 0
+    assert target.messages == ['record {}'.format(n) for n in range(20)]
+    # after stop(), records are handled synchronously
+    handler.handle(logging.makeLogRecord({'msg': 'late', 'levelno': logging.INFO}))
+    assert target.messages[-1] == 'late'
+
+def test_get_logger_is_idempotent():
+    name = 'test_get_logger_{}'.format(os.getpid())
+    try:
+        log = get_logger(name, 'CRITICAL', 'DEBUG')
+        again = get_logger(name, 'CRITICAL', 'INFO')
+        assert again is log
+        assert len(log.handlers) == 2
+        assert handler_graph()['loggers'][name]['file_level'] == 'INFO'
+    finally:
+        remove_logger(name)
+        os.remove('/tmp/{}.log'.format(name))
+
+def test_loggers_share_a_file_handler(new_logger):
+    logger_a, log_a = new_logger('test_share_a', file_level='INFO')
+    logger_b, log_b = new_logger('test_share_b', file_level='DEBUG')
+    assert logger_a.fh.target is logger_b.fh.target
+    destination = handler_graph()['destinations'][logger_a.file_key]
+    assert destination['loggers'] == ['test_share_a', 'test_share_b']
+    # each logger keeps its own level
+    log_a.debug('a debug')
+    log_a.info('a info')
+    log_b.debug('b debug')
+    # removing one logger leaves the shared handler open for the other
+    assert remove_logger('test_share_a')
+    assert not remove_logger('test_share_a')
+    assert log_a.handlers == []
+    assert handler_graph()['destinations'][logger_a.file_key]['loggers'] == ['test_share_b']
+    log_b.info('b info')
+    handler = logger_b.fh.target
+    assert remove_logger('test_share_b')
+    assert logger_a.file_key not in handler_graph()['destinations']
+    assert handler.stream is None
+    messages = [line.split(' ', 5)[5] for line in lines(logger_a.logfile) if ' test_log.' in line]
+    assert messages == ['a info', 'b debug', 'b info']
+    # a removed logger is created afresh
+    logger_a, log_a = new_logger('test_share_a', file_level='INFO')
+    assert len(log_a.handlers) == 2 and log_a.handlers[1].target is not handler
+
+def aggregated_worker(log, n):
+    for i in range(1000):
+        log.info('worker %d line %d', n, i)
+
+def test_aggregator_writes_every_line_once(new_logger, tmp_path):
+    aggregator = LogAggregator(str(tmp_path / 'aggregate.log'), delay=2)
+    aggregator.start()
+    try:
+        logger, log = new_logger('test_aggregate', _aggregate=aggregator)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=aggregated_worker, args=(log, n)) for n in range(4)]
+        for worker in workers:
+            worker.start()
+        log.info('parent line')
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+    finally:
+        aggregator.stop()
+    log.info('after stop')
+    remove_logger('test_aggregate')
+    written = [line for line in lines(aggregator.logfile) if ' test_log.' in line]
+    expected = ['worker {} line {}'.format(n, i) for n in range(4) for i in range(1000)]
+    assert sorted(line.split(' ', 5)[5] for line in written[:-1]) == sorted(expected + ['parent line'])
+    assert written[-1].endswith(' after stop')
+    # in timestamp order
+    stamps = [line[:23] for line in written]
+    assert stamps == sorted(stamps)
+    # every line but the last went through the writer process
+    assert aggregator.written == aggregator.received == len(lines(aggregator.logfile)) - 1
@@ -0,0 +1,95 @@
+import json
+import random
+import time
+
+import pytest
+
+from general_python.general.log_reader import LogReader, LEVELS
+
+BASE = time.mktime(time.strptime('2026-10-16 10:00:00', '%Y-%m-%d %H:%M:%S'))
+
+def text_line(created, level, message):
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))
+    return '{},{:03d} {} {}\n'.format(stamp, round(created * 1000) % 1000, level, message)
+
+def json_line(created, level, message):
+    return '{"time":%.3f,"level":"%s","message":%s}\n' % (created, level, json.dumps(message))
+
+def write(path, records, line=text_line):
+    with open(path, 'w') as fd:
+        for created, level, message in records:
+            fd.write(line(created, level, message))
+
+def brute_force(records, first=None, last=None, levels=None, contains=None):
+    '''the messages query() should return, by a linear scan'''
+    return [message for created, level, message in records
+            if (first is None or round(created, 3) >= first)
+            and (last is None or round(created, 3) <= last)
+            and (levels is None or level in levels)
+            and (contains is None or contains in message)]
+
+def messages(reader, **kwargs):
+    return [entry.text.split(' ', 3)[3] if not entry.text.startswith('{') else json.loads(entry.text)['message']
+            for entry in reader.query(**kwargs)]
+
+def test_duplicate_timestamps_across_blocks(log, tmp_path):
+    path = str(tmp_path / 'dup.log')
+    records = [(BASE, 'INFO', 'a {:04d}'.format(n)) for n in range(3000)]
+    records += [(BASE + 1, 'INFO', 'b {:04d}'.format(n)) for n in range(3000)]
+    write(path, records)
+    reader = LogReader(log, path, stride=4096)
+    assert len(messages(reader, start='2026-10-16 10:00:00')) == 6000
+    assert len(messages(reader, start='2026-10-16 10:00:01')) == 3000
+    assert len(messages(reader, start=BASE, end=BASE)) == 3000
+
+@pytest.mark.parametrize('ordered', [True, False])
+@pytest.mark.parametrize('line', [text_line, json_line])
+def test_query_matches_linear_scan(log, tmp_path, ordered, line):
+    rng = random.Random(7)
+    created = BASE
+    records = list()
+    for n in range(4000):
+        # runs of equal timestamps, as from a busy logger
+        created += rng.choice((0, 0, 0, 0.001, 0.25))
+        records.append((created, rng.choice(LEVELS), 'message {} {}'.format(n, rng.choice('xyz'))))
+    if not ordered:
+        # a ring buffer dump: older DEBUG records written after newer ones
+        dump = [(BASE + rng.uniform(0, 5), 'DEBUG', 'dumped {}'.format(n)) for n in range(200)]
+        records[2500:2500] = dump
+    path = str(tmp_path / 'q.log')
+    write(path, records, line)
+    reader = LogReader(log, path, stride=2048)
+    reader.refresh()
+    span = created - BASE
+    for _ in range(50):
+        first = round(BASE + rng.uniform(-1, span), 3) if rng.random() < 0.8 else None
+        last = round(first + rng.uniform(0, span / 4), 3) if first is not None and rng.random() < 0.8 else None
+        levels = rng.sample(LEVELS, rng.randint(1, 3)) if rng.random() < 0.5 else None
+        contains = rng.choice((None, 'x', 'dumped 1'))
+        assert messages(reader, start=first, end=last, levels=levels, contains=contains) == \
+            brute_force(records, first, last, levels, contains)
+
+def test_ring_dump_time_range(log, tmp_path):
+    path = str(tmp_path / 'ring.log')
+    # later records first, then a dump of 50 older DEBUG records
+    records = [(BASE + 100 + n, 'INFO', 'later {}'.format(n)) for n in range(2000)]
+    records += [(BASE + n / 10, 'DEBUG', 'dumped {}'.format(n)) for n in range(50)]
+    write(path, records)
+    reader = LogReader(log, path, stride=4096)
+    assert len(messages(reader, start=BASE, end=BASE + 10)) == 50
+    assert len(messages(reader, levels='DEBUG')) == 50
+
+def test_index_grows_with_the_file(log, tmp_path):
+    path = str(tmp_path / 'grow.log')
+    records = [(BASE + n, 'INFO', 'first {}'.format(n)) for n in range(1000)]
+    write(path, records)
+    reader = LogReader(log, path, stride=1024)
+    assert messages(reader, start=BASE + 990) == brute_force(records, BASE + 990)
+    # append older records, so the last block goes out of order
+    more = [(BASE + n, 'WARNING', 'more {}'.format(n)) for n in range(500)]
+    with open(path, 'a') as fd:
+        for record in more:
+            fd.write(text_line(*record))
+    records += more
+    reader = LogReader(log, path, stride=1024)
+    assert messages(reader, start=BASE + 100, end=BASE + 200) == brute_force(records, BASE + 100, BASE + 200)
@@ -0,0 +1,41 @@
+import gzip
+import logging
+import os
+
+from general_python.general.log import CompressingRotatingFileHandler
+
+def write(handler, count):
+    for n in range(count):
+        handler.handle(logging.makeLogRecord({'msg': 'message %d %s', 'args': (n, 'x' * 50)}))
+
+def test_backup_count_with_compression(tmp_path, capsys):
+    logfile = str(tmp_path / 'rot.log')
+    # backups of a RotatingFileHandler, from an earlier run
+    for n in (1, 2, 3):
+        with open('{}.{}'.format(logfile, n), 'w') as fd:
+            fd.write('old backup\n')
+    handler = CompressingRotatingFileHandler(logfile, max_bytes=2000, backup_count=2)
+    write(handler, 3000)
+    handler.close()
+    captured = capsys.readouterr()
+    assert captured.out == '' and captured.err == ''
+    segments = handler.segments()
+    assert len(segments) == 2
+    assert all(path.endswith('.gz') for path in segments)
+    for n in (1, 2, 3):
+        assert os.path.exists('{}.{}'.format(logfile, n))
+    # the newest segments are kept, so the last rotated record survives
+    with gzip.open(segments[-1], 'rt') as fd:
+        last = fd.read().splitlines()[-1]
+    with open(logfile) as fd:
+        first = fd.readline()
+    assert int(last.split()[1]) + 1 == int(first.split()[1])
+
+def test_segments_sort_oldest_first(tmp_path):
+    logfile = str(tmp_path / 'order.log')
+    handler = CompressingRotatingFileHandler(logfile, max_bytes=0)
+    names = ['20261016-100000.gz', '20261016-100000.1.gz', '20261016-100000.10', '20261016-100001']
+    for name in names + ['1', '20261016-100000.gz.tmp', 'idx']:
+        open('{}.{}'.format(logfile, name), 'w').close()
+    handler.close()
+    assert handler.segments() == ['{}.{}'.format(logfile, name) for name in names]
@@ -0,0 +1,28 @@
+import random
+
+from general_python.general.numeric import int_log, is_power
+
+def brute_force_log(x, b):
+    k = 0
+    while b**(k + 1) <= x:
+        k += 1
+    return k
+
+def test_int_log_and_is_power_match_brute_force():
+    rng = random.Random(9)
+    for _ in range(3000):
+        b = rng.randint(2, 40)
+        k = rng.randint(0, 200)
+        for x in (b**k - 1, b**k, b**k + 1, rng.randint(1, b**k + 1)):
+            if x < 1:
+                continue
+            assert int_log(x, b) == brute_force_log(x, b)
+            assert is_power(x, b) == (b**brute_force_log(x, b) == x)
+
+def test_is_power_edge_cases():
+    assert is_power(1, 1) and not is_power(2, 1)
+    assert is_power(1, 7)
+    for x, b in ((0, 2), (-8, 2), (9, -3), (0, 0), (1, 0)):
+        assert is_power(x, b) is False
+    assert is_power(2**4000, 4) and not is_power(2**4001, 4)
+    assert is_power(3**5000, 9) and not is_power(3**5001, 9) and is_power(3**5001, 3)
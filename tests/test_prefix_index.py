@@ -0,0 +1,86 @@
+import ipaddress
+import random
+
+import pytest
+
+from general_python.general.prefix_index import PrefixIndex, _EMPTY
+
+WIDTH = {4: 32, 6: 128}
+NETWORK = {4: ipaddress.IPv4Network, 6: ipaddress.IPv6Network}
+ADDRESS = {4: ipaddress.IPv4Address, 6: ipaddress.IPv6Address}
+
+def brute_force(networks, address):
+    '''the (prefix, value) lookup() should return, by checking every network'''
+    best = None
+    for network, value in networks.items():
+        if address in network and (best is None or network.prefixlen > best[0].prefixlen):
+            best = (network, value)
+    if best is None:
+        return None
+    return best[0].compressed, best[1]
+
+def glue_nodes_are_collapsed(index):
+    '''True if every node without a value (glue) has two children, as delete() keeps them'''
+    stack = [index._root] if index._root is not None else []
+    while stack:
+        node = stack.pop()
+        children = [child for child in node.children if child is not None]
+        if node.value is _EMPTY and len(children) != 2:
+            return False
+        stack.extend(children)
+    return True
+
+def test_synopsis(log):
+    index = PrefixIndex(log, 4)
+    assert index.load([('10.0.0.0/8', 'default'), ('10.1.0.0/16', 'TENANT_1')]) == 2
+    assert index.insert('10.1.1.1/24', 'TENANT_2')
+    assert index.lookup('10.1.1.5') == ('10.1.1.0/24', 'TENANT_2')
+    assert index.lookup('10.1.2.5') == ('10.1.0.0/16', 'TENANT_1')
+    assert index.lookup('11.1.1.1') is None
+    assert index.lookup_many(['10.1.1.5', '10.9.9.9', 'bogus']) == \
+        [('10.1.1.0/24', 'TENANT_2'), ('10.0.0.0/8', 'default'), None]
+    assert index.delete('10.1.1.0/24')
+    assert not index.delete('10.1.1.0/24')
+    assert index.lookup('10.1.1.5') == ('10.1.0.0/16', 'TENANT_1')
+    assert not index.insert('10.0.0.0/33')
+    assert '10.0.0.0/8' in index and '10.0.0.0/9' not in index
+
+@pytest.mark.parametrize('family', [4, 6])
+def test_matches_ipaddress_containment(log, family):
+    width = WIDTH[family]
+    rng = random.Random(family)
+    # most networks and addresses share a few leading bits, so that
+    # networks nest and overlap
+    base = rng.getrandbits(width)
+
+    def random_int(bits):
+        if rng.random() < 0.8:
+            return base ^ rng.getrandbits(bits) << (width - bits)
+        return rng.getrandbits(width)
+
+    def random_network():
+        length = rng.choice((0, 1, width // 2, width - 1, width, rng.randint(0, 12)))
+        mask = ((1 << length) - 1) << (width - length)
+        return NETWORK[family]((random_int(10) & mask, length))
+
+    index = PrefixIndex(log, family)
+    networks = dict()
+    for step in range(1500):
+        network = random_network()
+        if rng.random() < 0.6:
+            assert index.insert(str(network), step)
+            networks[network] = step
+        else:
+            assert index.delete(str(network)) == (network in networks)
+            networks.pop(network, None)
+        assert len(index) == len(networks)
+        assert glue_nodes_are_collapsed(index)
+        other = random_network()
+        assert index.get(str(other), 'missing') == networks.get(other, 'missing')
+        addresses = [ADDRESS[family](random_int(12)) for _ in range(5)]
+        assert index.lookup_many([str(address) for address in addresses]) == \
+            [brute_force(networks, address) for address in addresses]
+    for network, value in networks.items():
+        assert index.get(str(network)) == value
+    expected = sorted(networks.items(), key=lambda item: (int(item[0].network_address), item[0].prefixlen))
+    assert list(index.items()) == [(network.compressed, value) for network, value in expected]
@@ -0,0 +1,107 @@
+import logging
+
+from general_python.general.log import Logger, RingBufferHandler, read_ring_file, remove_logger, RING_HEADER, RING_SLOT
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = list()
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+class Opaque(object):
+    def __str__(self):
+        return 'opaque'
+
+class Counted(object):
+    formatted = 0
+    def __str__(self):
+        Counted.formatted += 1
+        return 'counted'
+
+def logger(handler):
+    log = logging.getLogger('test_ring_buffer')
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    log.handlers = [handler]
+    return log
+
+def test_dump_shows_arguments_at_call_time(tmp_path):
+    for path in (None, str(tmp_path / 'ring')):
+        target = ListHandler()
+        log = logger(RingBufferHandler(10, target, path=path))
+        peers = ['leaf1']
+        counts = {'up': 1}
+        log.debug('peers %s counts %r', peers, counts)
+        log.debug('mapping %(peers)s', {'peers': peers})
+        peers.append('leaf2')
+        counts['up'] = 2
+        log.error('boom')
+        assert target.messages[1:3] == ["peers ['leaf1'] counts {'up': 1}", "mapping ['leaf1']"]
+
+def test_ring_file(tmp_path):
+    path = str(tmp_path / 'ring')
+    handler = RingBufferHandler(4, ListHandler(), path=path, slot_size=96)
+    log = logger(handler)
+    for n in range(6):
+        log.debug('sample %d of %s', n, [n])
+    log.debug('object %s', Opaque())
+    log.debug('long %s', 'x' * 200)
+    log.getChild('y' * 200).debug('long name')
+    lines = read_ring_file(path)
+    assert len(lines) == 4
+    assert lines[0].split(' ', 4)[1:] == ['DEBUG', 'test_ring_buffer', lines[0].split()[3], 'sample 5 of [5]']
+    assert lines[1].endswith(' object opaque')
+    assert 'long xxxxx' in lines[2] and len(lines[2]) < 96 + 40
+    assert 'test_ring_buffer.yyy' in lines[3]
+    handler.close()
+
+def test_torn_slots(tmp_path):
+    path = str(tmp_path / 'ring')
+    handler = RingBufferHandler(4, ListHandler(), path=path, slot_size=96)
+    log = logger(handler)
+    for n in range(4):
+        log.debug('sample %d of %s', n, [n])
+    handler.close()
+    with open(path, 'r+b') as fd:
+        data = bytearray(fd.read())
+        # slot 1: header with lengths which don't match its data, as when
+        # the data was rewritten but not the header
+        offset = RING_HEADER.size + 96
+        fields = list(RING_SLOT.unpack_from(data, offset))
+        fields[5] -= 3
+        RING_SLOT.pack_into(data, offset, *fields)
+        # slot 2: emptied, but not yet rewritten
+        RING_SLOT.pack_into(data, RING_HEADER.size + 2 * 96, 0, 0.0, 0, 0, 0, 0, False)
+        fd.seek(0)
+        fd.write(data)
+    lines = read_ring_file(path)
+    assert len(lines) == 3
+    assert lines[0].endswith(' sample 0 of [0]')
+    assert lines[1] == '<corrupt slot>'
+    assert lines[2].endswith(' sample 3 of [3]')
+
+def test_async_ring_buffer_formats_only_on_dump(tmp_path):
+    logger = Logger()
+    logger.logfile = str(tmp_path / 'async.log')
+    log = logger.new('test_async_ring_buffer', _async=True, _ring_buffer=100)
+    logger.file_loglevel = 'INFO'
+    logger.console_loglevel = 'CRITICAL'
+    # pytest's handlers on the root logger format every record
+    log.propagate = False
+    try:
+        peers = ['leaf1']
+        for n in range(50):
+            log.debug('%s %d %s', Counted(), n, peers)
+        peers.append('leaf2')
+        logger.qh.queue.join()
+        assert Counted.formatted == 0
+        log.error('boom')
+        logger.qh.queue.join()
+    finally:
+        remove_logger('test_async_ring_buffer')
+    with open(logger.logfile) as fd:
+        lines = fd.read().splitlines()
+    assert sum(line.endswith(" counted 49 ['leaf1']") for line in lines) == 1
+    assert lines[-1].endswith(' boom')
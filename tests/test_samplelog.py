@@ -0,0 +1,113 @@
+import logging
+import multiprocessing
+import random
+import threading
+
+from general_python.general.samplelog import SampleLog, read_samples, SAMPLE_HEADER, SAMPLE_RECORD
+from general_python.general.util import Timer
+
+def read(path):
+    '''read_samples(path) as a sorted list of (name, start_ns, duration_ns)'''
+    samples = read_samples(path)
+    return sorted(zip([samples.names[name_id] for name_id in samples.name_id],
+                      [int(x) for x in samples.start_ns], [int(x) for x in samples.duration_ns]))
+
+def append_random(sample_log, rng, names, n):
+    '''append n random samples, returning them as (name, start_ns, duration_ns)'''
+    expected = list()
+    for _ in range(n):
+        name = rng.choice(names)
+        start_ns = rng.getrandbits(62) - 2**61
+        duration_ns = rng.getrandbits(40)
+        sample_log.append(sample_log.name_id(name), start_ns, duration_ns)
+        expected.append((name, start_ns, duration_ns))
+    return expected
+
+def test_round_trip(log, tmp_path):
+    path = str(tmp_path / 'run.samples')
+    rng = random.Random(1)
+    names = ['converge', 'config_push', 'ping sweep', 'verify']
+    sample_log = SampleLog(log, path, buffer_records=64)
+    expected = append_random(sample_log, rng, names, 1000)
+    # 1000 isn't a multiple of 64, so some samples are still buffered
+    assert len(read(path)) == 1000 // 64 * 64
+    sample_log.close()
+    assert read(path) == sorted(expected)
+    samples = read_samples(path)
+    assert sorted(samples.names) == sorted(names)
+    # appending to an existing file keeps its header and names
+    sample_log = SampleLog(log, path)
+    expected += append_random(sample_log, rng, names + ['new'], 100)
+    sample_log.close()
+    assert read(path) == sorted(expected)
+    assert read_samples(path)[4:] == samples[4:]    # epoch_ns, perf_ns
+
+def test_empty_and_truncated(log, tmp_path):
+    path = str(tmp_path / 'run.samples')
+    SampleLog(log, path).close()
+    samples = read_samples(path)
+    assert samples.names == [] and len(samples.start_ns) == 0
+    sample_log = SampleLog(log, path)
+    sample_log.append(sample_log.name_id('a'), 1, 2)
+    sample_log.append(sample_log.name_id('b'), 3, 4)
+    sample_log.close()
+    # as after a crash part way through a write
+    with open(path, 'ab') as fd:
+        fd.write(SAMPLE_RECORD.pack(5, 6, 0, 0)[:10])
+    assert read(path) == [('a', 1, 2), ('b', 3, 4)]
+
+def test_threads(log, tmp_path):
+    path = str(tmp_path / 'run.samples')
+    sample_log = SampleLog(log, path, buffer_records=100)
+    expected = [None] * 4
+
+    def worker(n):
+        rng = random.Random(n)
+        expected[n] = append_random(sample_log, rng, ['t{}_{}'.format(n, i) for i in range(20)] + ['shared'], 2000)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sample_log.close()
+    assert read(path) == sorted(sum(expected, []))
+    assert len(set(read_samples(path).names)) == len(read_samples(path).names) == 81
+
+def process(path, seed, queue):
+    sample_log = SampleLog(logging.getLogger('general_python_tests'), path, buffer_records=50)
+    rng = random.Random(seed)
+    queue.put(append_random(sample_log, rng, ['p{}'.format(seed), 'shared', 'common{}'.format(seed % 2)], 3000))
+    sample_log.close()
+
+def test_processes_share_a_file(log, tmp_path):
+    path = str(tmp_path / 'run.samples')
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [context.Process(target=process, args=(path, seed, queue)) for seed in range(4)]
+    for p in processes:
+        p.start()
+    expected = sum((queue.get() for _ in processes), [])
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+    with open(path, 'rb') as fd:
+        assert len(fd.read()) == SAMPLE_HEADER.size + len(expected) * SAMPLE_RECORD.size
+    assert read(path) == sorted(expected)
+    assert sorted(read_samples(path).names) == ['common0', 'common1', 'p0', 'p1', 'p2', 'p3', 'shared']
+
+def test_timer(log, tmp_path):
+    path = str(tmp_path / 'run.samples')
+    sample_log = SampleLog(log, path)
+    timer = Timer(log, name='converge', sample_log=sample_log)
+    rng = random.Random(2)
+    durations = [rng.randint(1, 10**9) for _ in range(50)]
+    for duration in durations:
+        timer.record_ns(duration)
+    sample_log.close()
+    samples = read_samples(path)
+    assert samples.names == ['converge']
+    assert list(samples.duration_ns) == durations
+    # record_ns() is called at the end of each sample
+    ends = [start + duration for start, duration in zip(samples.start_ns, samples.duration_ns)]
+    assert ends == sorted(ends)
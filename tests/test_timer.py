@@ -0,0 +1,109 @@
+import asyncio
+import gc
+import random
+import threading
+
+from general_python.general.util import Timer
+
+def test_threads_intervals(log):
+    t = Timer(log, concurrent=True)
+
+    @t
+    def decorated():
+        pass
+
+    def worker():
+        for n in range(1000):
+            if n % 3 == 0:
+                token = t.start()
+                t.stop(token)
+            elif n % 3 == 1:
+                with t:
+                    pass
+            else:
+                decorated()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert t.count == 8000
+    assert t.snapshot()['count'] == 8000
+    assert t.running is False and len(t.q) == 0
+
+def test_threads_match_brute_force(log):
+    t = Timer(log, concurrent=True)
+    rng = random.Random(1)
+    samples = [[rng.randint(1, 10**9) for _ in range(2000)] for _ in range(8)]
+
+    def worker(n):
+        for elapsed_ns in samples[n]:
+            t.record_ns(elapsed_ns)
+
+    snapshots = list()
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            snapshots.append(t.snapshot())
+
+    watcher = threading.Thread(target=reader)
+    watcher.start()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    watcher.join()
+    # statistics read while threads record (and exit) are consistent
+    counts = [snapshot['count'] for snapshot in snapshots]
+    assert counts == sorted(counts)
+    assert all(snapshot['min'] <= snapshot['p50'] <= snapshot['max'] for snapshot in snapshots if snapshot['count'])
+    everything = sum(samples, [])
+    assert t.count == len(everything)
+    assert t.histogram.total == sum(everything)
+    assert t.histogram.min == min(everything) and t.histogram.max == max(everything)
+    assert t.min == min(everything) / 1e9 and t.max == max(everything) / 1e9
+
+def test_exited_threads_are_retired(log):
+    t = Timer(log, concurrent=True)
+
+    def worker():
+        t.record_ns(1000)
+
+    for _ in range(5):
+        threads = [threading.Thread(target=worker) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    gc.collect()
+    assert len(t._shards) == 0
+    assert t.count == 250 and t.histogram.total == 250000
+    # the main thread's shard stays until it exits
+    t.record_ns(1000)
+    assert len(t._shards) == 1 and t.count == 251
+    t.clear()
+    assert t.count == 0
+
+def test_asyncio_overlapping_tasks(log):
+    t = Timer(log, concurrent=True)
+
+    @t
+    async def decorated():
+        await asyncio.sleep(0.001)
+
+    async def task():
+        with t:
+            await asyncio.sleep(0.001)
+            await decorated()
+
+    async def main():
+        await asyncio.gather(*(task() for _ in range(200)))
+
+    asyncio.run(main())
+    assert t.count == 400
+    # each `with` interval contains a decorated call
+    assert t.max >= 0.002
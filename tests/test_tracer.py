@@ -0,0 +1,133 @@
+import json
+import random
+import threading
+
+from general_python.general.timers import TimerRegistry
+from general_python.general.tracer import Tracer
+
+def run(tracer, rng, depth, expected):
+    '''
+    enter a random tree of nested spans, appending each span's name to
+    expected as it exits, which is the order spans are recorded in
+    '''
+    name = 'depth{}_{}'.format(depth, rng.randint(0, 3))
+    with tracer.span(name):
+        if depth < 3:
+            for _ in range(rng.randint(0, 3)):
+                run(tracer, rng, depth + 1, expected)
+    expected.append(name)
+
+def micros(ns):
+    '''ns as write_chrome() writes it'''
+    return float('{:.3f}'.format(ns / 1000))
+
+def chrome_events(path):
+    with open(path) as fd:
+        trace = json.load(fd)
+    return [event for event in trace['traceEvents'] if event['ph'] == 'X']
+
+def test_spans_match_what_was_entered(log, tmp_path):
+    rng = random.Random(1)
+    tracer = Tracer(log, capacity=10000)
+    expected = list()
+    for _ in range(50):
+        run(tracer, rng, 0, expected)
+    spans = list(tracer.spans())
+    assert [name for name, _, _, _ in spans] == expected
+    assert len(tracer) == len(expected) and tracer.dropped == 0
+    # each span lies within the next shallower span recorded after it
+    for n, (name, start, duration, thread) in enumerate(spans):
+        assert duration >= 0 and thread == threading.get_native_id()
+        depth = int(name[5])
+        if depth:
+            parent = next(span for span in spans[n + 1:] if int(span[0][5]) == depth - 1)
+            assert parent[1] <= start and start + duration <= parent[1] + parent[2]
+    path = str(tmp_path / 'trace.json')
+    assert tracer.write_chrome(path) == len(expected)
+    events = chrome_events(path)
+    assert [event['name'] for event in events] == expected
+    for event, (_, start, duration, _) in zip(events, spans):
+        assert event['ts'] == micros(start - tracer._origin_ns)
+        assert event['dur'] == micros(duration)
+
+def test_capacity_and_clear(log, tmp_path):
+    tracer = Tracer(log, capacity=10)
+    for n in range(25):
+        with tracer.span('span{}'.format(n)):
+            pass
+    assert [name for name, _, _, _ in tracer.spans()] == ['span{}'.format(n) for n in range(10)]
+    assert tracer.dropped == 15
+    tracer.clear()
+    assert len(tracer) == 0 and tracer.dropped == 0
+    assert tracer.write_chrome(str(tmp_path / 'empty.json')) == 0
+    assert chrome_events(str(tmp_path / 'empty.json')) == []
+
+def test_sampling_is_per_root(log):
+    rng = random.Random(2)
+    tracer = Tracer(log, sample_rate=0.5)
+    random.seed(2)
+    roots = list()
+    for n in range(200):
+        expected = list()
+        with tracer.span('root'):
+            for _ in range(rng.randint(1, 4)):
+                with tracer.span('child'):
+                    with tracer.span('grandchild'):
+                        pass
+                expected += ['grandchild', 'child']
+        roots.append(expected + ['root'])
+    names = [name for name, _, _, _ in tracer.spans()]
+    # every root is traced with all of its nested spans, or not at all
+    traced = 0
+    for expected in roots:
+        if names[:len(expected)] == expected:
+            names = names[len(expected):]
+            traced += 1
+    assert names == []
+    assert 50 < traced < 150
+    tracer = Tracer(log, sample_rate=0.0)
+    with tracer.span('root'):
+        with tracer.span('child'):
+            pass
+    assert len(tracer) == 0
+
+def test_timers_see_unsampled_spans(log):
+    timers = TimerRegistry(log)
+    tracer = Tracer(log, sample_rate=0.0, timers=timers)
+    for _ in range(20):
+        with tracer.span('outer'):
+            with tracer.span('inner'):
+                pass
+    assert len(tracer) == 0
+    assert timers('outer').count == 20 and timers('inner').count == 20
+
+def test_export_while_recording(log, tmp_path):
+    tracer = Tracer(log, capacity=200000)
+    stop = threading.Event()
+
+    def worker(n):
+        count = 0
+        while not stop.is_set() and count < 5000:
+            # new names keep appearing while write_chrome() runs
+            with tracer.span('worker{}_{}'.format(n, count % 500)):
+                pass
+            count += 1
+        counts[n] = count
+
+    counts = [0] * 4
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    path = str(tmp_path / 'trace.json')
+    try:
+        for _ in range(10):
+            written = tracer.write_chrome(path)
+            assert len(chrome_events(path)) == written
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert tracer.write_chrome(path) == sum(counts) == len(tracer)
+    spans = sorted((name, start) for name, start, _, _ in tracer.spans())
+    assert sorted((event['name'], event['ts']) for event in chrome_events(path)) == \
+        sorted((name, micros(start - tracer._origin_ns)) for name, start in spans)
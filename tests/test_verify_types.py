@@ -0,0 +1,92 @@
+import pytest
+
+from general_python.general.verify_types import VerifyTypes
+
+@pytest.fixture
+def verify(log):
+    return VerifyTypes(log)
+
+MAC_ADDRESSES = [
+    ('00:1a:2b:3c:4d:5e', True),
+    ('00-1a-2b-3c-4d-5e', True),
+    ('00:1A:2b:3C:4d:5E', True),
+    ('001a.2b3c.4d5e', True),
+    # mixed separators were accepted before 141, and still are
+    ('00:1a-2b:3c:4d:5e', True),
+    ('xx00:1a:2b:3c:4d:5e', False),
+    ('00:1a:2b:3c:4d:5e\n', False),
+    ('00:1a:2b:3c:4d:5e:77', False),
+    ('0:1a:2b:3c:4d:5e', False),
+    ('001a2b3c4d5e', False),
+    (b'00:1a:2b:3c:4d:5e', False),
+    (5, False),
+]
+
+@pytest.mark.parametrize('x, expected', MAC_ADDRESSES)
+def test_is_mac_address(verify, x, expected):
+    assert bool(verify.is_mac_address(x)) is expected
+
+DIGITS = [
+    ('0123', True),
+    (b'12', True),
+    ('123\n', False),
+    ('12a', False),
+    ('', False),
+]
+
+@pytest.mark.parametrize('x, expected', DIGITS)
+def test_is_digits(verify, x, expected):
+    assert bool(verify.is_digits(x)) is expected
+
+HEX = [
+    ('deadBEEF', True),
+    (b'1f', True),
+    ('0x1f', False),
+    ('1g', False),
+]
+
+@pytest.mark.parametrize('x, expected', HEX)
+def test_is_hex(verify, x, expected):
+    assert bool(verify.is_hex(x)) is expected
+
+POWERS = [
+    (8, 2, True),
+    (7, 2, False),
+    (1, 2, True),
+    (27, 3, True),
+    (28, 3, False),
+    (3**1000, 3, True),
+    (3**1000 + 1, 3, False),
+    (1, 1, True),
+    (0, 2, False),
+    (-8, 2, False),
+    (9, -3, False),
+    (-27, -3, False),
+    (0, 0, False),
+    (1, 0, False),
+]
+
+@pytest.mark.parametrize('x, b, expected', POWERS)
+def test_is_power(verify, x, b, expected):
+    assert verify.is_power(x, b) is expected
+
+BATCHES = [
+    ('is_mac_address', [x for x, _ in MAC_ADDRESSES], ()),
+    ('is_mac_address', ['00:1a:2b:3c:4d:5e', 'xx00:1a:2b:3c:4d:5e', '001a.2b3c.4d5e', '00:1a:2b:3c:4d:5e\n'], ()),
+    ('is_digits', [x for x, _ in DIGITS], ()),
+    ('is_digits', ['0', '123', '4567'], ()),
+    ('is_hex', [x for x, _ in HEX], ()),
+    ('is_hex', ['0', 'ff', 'DeadBeef'], ()),
+    ('is_power', [0, 1, 7, 8, -8, 2**200, 2**200 + 1], (2,)),
+    ('is_power', [x for x, b, _ in POWERS if b == 3], (3,)),
+    ('is_ipv4_address', ['1.2.3.4', '1.2.3.4\n', '1.2.3', 'x1.2.3.4', '256.1.1.1', ' 1.2.3.4', '10.0.0.255'], ()),
+    ('is_ipv4_unicast_address', ['1.2.3.4', '224.0.0.1', '0.0.0.0', '10.1.1.1'], ()),
+]
+
+@pytest.mark.parametrize('name, values, args', BATCHES)
+def test_many_matches_scalar(verify, name, values, args):
+    # the mask and failed indices are the scalar validator's results
+    expected = [bool(getattr(verify, name)(x, *args)) for x in values]
+    mask, failed = getattr(verify, name + '_many')(values, *args)
+    assert [bool(m) for m in mask] == expected
+    assert list(failed) == [n for n, passed in enumerate(expected) if not passed]